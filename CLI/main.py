@@ -1,178 +1,266 @@
-import datetime
-from typing import Dict
-from tabulate import tabulate
-
-
-ASSEMBLY_INPUT_FILE = 'assembly_input.txt'
-MACHINE_OUTPUT_FILE = 'machine_output.txt'
-MACHINE_INPUT_FILE = 'machine_input.txt'
-ASSEMBLY_OUTPUT_FILE = 'assembly_output.txt'
-LOG_FILE = 'register_log.txt'
-
-
-REGISTER_INITIAL_VALUES = {
-    'AR': 0,
-    'PC': 0,
-    'DR': 0,
-    'AC': 0,
-    'IR': 0,
-}
-
-
-assembly_to_machine = {
-    "AND": "8",
-    "ADD": "9",
-    "LDA": "A",
-    "STA": "B",
-    "BUN": "C",
-    "BSA": "D",
-    "ISZ": "E",
-    "CLA": "7800",
-    "CLE": "7400",
-    "CMA": "7200",
-    "CME": "7100",
-    "CIR": "7080",
-    "CIL": "7040",
-    "INC": "7020",
-    "SPA": "7010",
-    "SNA": "7008",
-    "SZA": "7004",
-    "SZE": "7002",
-    "HLT": "7001"
-}
-machine_to_assembly = {v: k for k, v in assembly_to_machine.items()}
-
-
-registers = REGISTER_INITIAL_VALUES.copy()
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Iterable, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mano.batch import ASSEMBLE, DISASSEMBLE, DEFAULT_CHUNK_SIZE, expand_patterns, plan_tasks, run_batch
+from mano.cache import CACHE_DIR_ENV
+from mano.decoder import decode_table
+from mano.image import ImageError, convert_image
+from mano.machine import DEFAULT_STEP_LIMIT, MachineError
+from mano.pager import LineIndex, parse_range
+from mano.pipeline import PipelineResult
+from mano.rewind import Rewinder
+from mano.session import (
+    ASSEMBLY_INPUT_FILE, ASSEMBLY_OUTPUT_FILE, LOG_FILE, MACHINE_INPUT_FILE, MACHINE_OUTPUT_FILE, Session,
+)
+from mano.stats import Stats
+from mano.tables import ASSEMBLY_TO_MACHINE
+from mano.trace_store import EVENT_HEADERS, TraceQuery, TraceStore, event_table, parse_event_range
+from mano.trace_log import LOG_LEVELS, level_name, parse_level
+
+
+PAGE_SIZE = 20
+FOLLOW_INTERVAL = 0.5
+TRACE_LIMIT = 100
+
+
+session = Session()
+registers = session.registers
+register_log = session.register_log
+collect_stats = False
+profile_conversions = False
+stats_json_path: Optional[str] = None
+
+def tabulate(*args, **kwargs) -> str:
+    """Render a table, importing tabulate on first use to keep startup fast."""
+    from tabulate import tabulate as render
+    return render(*args, **kwargs)
 
 def initialize_files() -> None:
-    """Initialize the input and output files."""
-    for file in [ASSEMBLY_INPUT_FILE, MACHINE_INPUT_FILE, MACHINE_OUTPUT_FILE, ASSEMBLY_OUTPUT_FILE]:
-        with open(file, 'w') as f:
-            f.write("")
-
-def initialize_log_file() -> None:
-    """Initialize the log file."""
-    with open(LOG_FILE, 'w') as log_file:
-        log_file.write("")
-
-def log_register_operation(operation: str, register: str, value: int) -> None:
-    """Log register operations with timestamps."""
-    timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    memory_state = {k: v for k, v in registers.items()}
-    log_entry = {
-        "Timestamp": timestamp,
-        "Operation": operation,
-        "Register": register,
-        "Value": value,
-        "Registers": memory_state
-    }
-    with open(LOG_FILE, 'a') as log_file:
-        log_file.write(f"{log_entry}\n")
-
-def update_register(register: str, value: int, memory_address: str = None) -> None:
-    """Update a register and log the operation."""
-    registers[register] = value
-    log_register_operation("UPDATE", register, value)
+    """Initialize the input and output files and the log file."""
+    session.reset_files()
+
+def run_conversion(convert: Callable[[Optional[Stats]], PipelineResult], input_file: str, file_description: str, success_message: str) -> None:
+    """Run one conversion of ``input_file`` and report its outcome."""
+    stats = Stats(profile_conversions) if collect_stats else None
+    log_bytes = register_log.bytes_written
+    if stats is not None:
+        stats.start()
+    try:
+        result = convert(stats)
+    except FileNotFoundError:
+        print_in_table(f"Error: {input_file} not found.")
+        return
+    except Exception as e:
+        print_in_table(f"Error converting {input_file}: {e}")
+        return
+    finally:
+        if stats is not None:
+            finish_stats(stats, log_bytes)
+
+    if not result.lines:
+        print_in_table(f"Error: {file_description} file is empty.")
+    elif not result.ok:
+        print_in_table(result.error_report())
+    else:
+        print_in_table(success_message)
+
+def finish_stats(stats: Stats, log_bytes: int) -> None:
+    """Flush the log, stop the timers and show (and optionally save) the numbers."""
+    with stats.stage("log"):
+        register_log.flush()
+    stats.stop()
+    stats.count("log bytes", register_log.bytes_written - log_bytes)
+    print_stats(stats)
+    if stats_json_path:
+        try:
+            stats.write_json(stats_json_path)
+        except OSError as e:
+            print_in_table(f"Error writing {stats_json_path}: {e}")
+
+def print_stats(stats: Stats) -> None:
+    """Print stage timings, counters and the profile (if any) as tables."""
+    print(tabulate(stats.stage_rows(), headers=["Stage", "Seconds", "Share", "Calls"], tablefmt="grid"))
+    print(tabulate(stats.counter_rows(), headers=["Counter", "Value"], tablefmt="grid"))
+    if stats.profile_rows:
+        rows = [[function, calls, f"{own:.4f}", f"{cumulative:.4f}"] for function, calls, own, cumulative in stats.profile_rows]
+        print(tabulate(rows, headers=["Function", "Calls", "Own (s)", "Cumulative (s)"], tablefmt="grid"))
 
 def convert_assembly_to_machine() -> None:
     """Convert assembly code to machine code."""
-    assembly_code = read_file_lines(ASSEMBLY_INPUT_FILE, "Assembly Input")
-    if assembly_code is None:
-        return
+    run_conversion(
+        lambda stats: session.assemble(stats=stats),
+        ASSEMBLY_INPUT_FILE,
+        "Assembly input",
+        "Assembly code has been converted to machine language.",
+    )
+
+def convert_machine_to_assembly() -> None:
+    """Convert machine code to assembly code."""
+    run_conversion(
+        lambda stats: session.disassemble(stats=stats),
+        MACHINE_INPUT_FILE,
+        "Machine input",
+        "Machine code has been converted to assembly language.",
+    )
+
+def ask_program_input(image_path: str):
+    """Return a device bus with typed input if the program uses INP/OUT, else None."""
+    from mano.devices import DeviceBus, image_uses_devices
+    if not image_uses_devices(image_path, ASSEMBLY_INPUT_FILE, session.assembly_to_machine):
+        return None
+    return DeviceBus(input("Input for the program's INP instructions: ").encode())
 
-    machine_code = []
-    for line in assembly_code:
-        parts = line.strip().split()
-        if len(parts) == 1:  
-            instruction = parts[0]
-            if instruction in assembly_to_machine:
-                machine_code.append(f"{assembly_to_machine[instruction]}\n")
-                update_register('IR', int(assembly_to_machine[instruction], 16)) 
-            else:
-                print_in_table(f"Error: Invalid instruction {instruction}")
-                return
-        else:  
-            instruction, operand = parts
-            if instruction in assembly_to_machine:
-                opcode = assembly_to_machine[instruction]
-                machine_code.append(f"{opcode}{operand}\n")
-                update_register('IR', int(f"{opcode}{operand}", 16)) 
-                update_register('AR', int(operand, 16))
-            else:
-                print_in_table(f"Error: Invalid instruction {instruction}")
-                return
-
-        registers['PC'] += 1
-        log_register_operation("INCREMENT", 'PC', registers['PC'])
-
-    write_file_lines(MACHINE_OUTPUT_FILE, machine_code, "Machine Output")
-    print_in_table("Assembly code has been converted to machine language.")
-
-def convert_machine_to_assembly():
+def run_machine_program() -> None:
+    """Execute the assembled program in the Mano Basic Computer simulator."""
     try:
-        with open(MACHINE_INPUT_FILE, 'r') as mach_file:
-            machine_code = mach_file.readlines()
+        devices = ask_program_input(MACHINE_OUTPUT_FILE)
+        executed = session.run_program(MACHINE_OUTPUT_FILE, devices=devices)
     except FileNotFoundError:
-        print_in_table(f"Error: {MACHINE_INPUT_FILE} not found.")
+        print_in_table(f"Error: {MACHINE_OUTPUT_FILE} not found.")
         return
-    except Exception as e:
-        print_in_table(f"Error reading {MACHINE_INPUT_FILE}: {e}")
+    except MachineError as e:
+        print_in_table(f"Error: {e}")
+        return
+
+    machine = session.machine
+    if devices is not None and devices.starved:
+        status = "is waiting for more input"
+    else:
+        status = "halted" if machine.halted else "stopped at the step limit"
+    print_in_table(f"Program {status} after {executed} instructions.")
+    if devices is not None:
+        print(f"Output: {devices.output.decode('latin-1')}")
+    table = [[k, f"{v:X}"] for k, v in machine.state().items()]
+    print(tabulate(table, headers=["Register", "Value (hex)"]))
+
+def print_profile(profile, memory, source_path: Optional[str], top: int, listing_path: Optional[str] = None) -> None:
+    """Print the hot spots and loops of a profiled run; write an annotated listing if asked."""
+    from mano.pipeline import read_lines
+    from mano.profiler import HOT_SPOT_HEADERS, LISTING_HEADERS, LOOP_HEADERS, source_addresses
+    lines = texts = None
+    if source_path and os.path.exists(source_path):
+        lines = source_addresses(lambda: read_lines(source_path), ASSEMBLY_TO_MACHINE)
+        texts = dict(read_lines(source_path))
+    print_in_table(profile.summary())
+    print(tabulate(profile.hot_spots(memory, top, lines, texts), headers=HOT_SPOT_HEADERS, tablefmt="grid"))
+    loops = profile.loop_rows(memory, top)
+    if loops:
+        print(tabulate(loops, headers=LOOP_HEADERS, tablefmt="grid"))
+    if not listing_path:
         return
-    
-    if not machine_code:
-        print_in_table("Error: Machine input file is empty.")
+    if lines is None:
+        print_in_table(f"Error: {source_path} not found; no listing written.")
         return
-    
-    assembly_code = []
-    for line in machine_code:
-        line = line.strip()
-        if len(line) == 4 and line in machine_to_assembly:
-            instruction = machine_to_assembly[line]
-            assembly_code.append(f"{instruction}\n")
-            update_register('IR', int(line, 16))
-        else:
-            opcode = line[0]
-            operand = line[1:]
-            instruction = [key for key, value in assembly_to_machine.items() if value == opcode]
-            if instruction:
-                assembly_code.append(f"{instruction[0]} {operand}\n")
-                update_register('IR', int(f"{opcode}{operand}", 16))
-                update_register('AR', int(operand, 16))
-            else:
-                print_in_table(f"Error: Invalid machine code {line}")
-                return
-        
-        registers['PC'] += 1
-        log_register_operation("INCREMENT", 'PC', registers['PC'])
-    
+    listing = tabulate(profile.listing(read_lines(source_path), lines, memory), headers=LISTING_HEADERS)
+    if listing_path == "-":
+        print(listing)
+    else:
+        write_file_lines(listing_path, [listing, "\n"], "Listing")
+
+def profile_machine_program() -> None:
+    """Run the assembled program while counting where it spends its time."""
+    from mano.profiler import HOT_SPOT_ROWS
     try:
-        with open(ASSEMBLY_OUTPUT_FILE, 'w') as asm_file:
-            asm_file.writelines(assembly_code)
-    except Exception as e:
-        print_in_table(f"Error writing {ASSEMBLY_OUTPUT_FILE}: {e}")
+        devices = ask_program_input(MACHINE_OUTPUT_FILE)
+        profile = session.profile_program(MACHINE_OUTPUT_FILE, devices=devices)
+    except FileNotFoundError:
+        print_in_table(f"Error: {MACHINE_OUTPUT_FILE} not found.")
+        return
+    except MachineError as e:
+        print_in_table(f"Error: {e}")
+        return
+    show_listing = input("Show the annotated source listing too? (y/N): ").strip().lower() == "y"
+    print_profile(profile, session.machine.memory, ASSEMBLY_INPUT_FILE, HOT_SPOT_ROWS, "-" if show_listing else None)
+
+DEBUG_HELP = (
+    "Commands: s [N] step forward, b [N] step back, g K go to step K, "
+    "c continue to HLT, r show registers, q quit"
+)
+
+def print_debugger_state(debugger: Rewinder) -> None:
+    """Print the current step, the next instruction and the registers."""
+    machine = debugger.machine
+    word = machine.memory[machine.PC]
+    status = "halted" if debugger.halted else f"next {machine.PC:03X}: {word:04X}  {decode_table(ASSEMBLY_TO_MACHINE)[word][0]}"
+    print_in_table(f"Step {debugger.step} ({status})")
+    cells = [f"{k}={v:X}" for k, v in machine.state().items()]
+    print(tabulate([cells[i:i + 5] for i in range(0, len(cells), 5)], tablefmt="plain"))
+
+def debug_machine_program() -> None:
+    """Step through the assembled program, forward and back."""
+    try:
+        debugger = session.debug_program(MACHINE_OUTPUT_FILE)
+    except FileNotFoundError:
+        print_in_table(f"Error: {MACHINE_OUTPUT_FILE} not found.")
+        return
+    except MachineError as e:
+        print_in_table(f"Error: {e}")
         return
-    
-    print_in_table("Machine code has been converted to assembly language.")
+    print(DEBUG_HELP)
+    print_debugger_state(debugger)
+    while True:
+        command, *arguments = input("debug> ").strip().lower().split() or ["s"]
+        try:
+            amount = int(arguments[0].replace(",", "").replace("_", "")) if arguments else 1
+            if command == "s":
+                debugger.forward(amount)
+            elif command == "b":
+                debugger.back(amount)
+            elif command == "g" and arguments:
+                debugger.goto(amount)
+            elif command == "c":
+                debugger.forward(DEFAULT_STEP_LIMIT)
+            elif command == "q":
+                break
+            elif command != "r":
+                print(DEBUG_HELP)
+                continue
+        except ValueError:
+            print(DEBUG_HELP)
+            continue
+        except MachineError as e:
+            print_in_table(f"Error: {e}")
+        print_debugger_state(debugger)
+    session.sync_registers()
 
+def export_machine_image() -> None:
+    """Save the assembled program as a binary, Intel HEX or text image."""
+    file_path = input("Enter image file name (.bin, .hex or .txt): ").strip()
+    if not file_path:
+        print_in_table("Error: No file name entered.")
+        return
+    try:
+        count = convert_image(MACHINE_OUTPUT_FILE, file_path)
+    except FileNotFoundError:
+        print_in_table(f"Error: {MACHINE_OUTPUT_FILE} not found.")
+        return
+    except (ImageError, OSError) as e:
+        print_in_table(f"Error: {e}")
+        return
+    print_in_table(f"{count} words have been exported to {file_path}.")
 
-def read_file_lines(file_path: str, file_description: str) -> list:
-    """Read lines from a file and return them."""
+def import_machine_image() -> None:
+    """Load a binary, Intel HEX or text image into the machine input file."""
+    file_path = input("Enter image file name (.bin, .hex or .txt): ").strip()
+    if not file_path:
+        print_in_table("Error: No file name entered.")
+        return
     try:
-        with open(file_path, 'r') as file:
-            contents = file.readlines()
-        if not contents:
-            print_in_table(f"{file_description} file is empty.")
-            return None
-        return contents
+        count = convert_image(file_path, MACHINE_INPUT_FILE)
     except FileNotFoundError:
         print_in_table(f"Error: {file_path} not found.")
-        return None
-    except Exception as e:
-        print_in_table(f"Error reading {file_path}: {e}")
-        return None
+        return
+    except (ImageError, OSError) as e:
+        print_in_table(f"Error: {e}")
+        return
+    print_in_table(f"{count} words have been imported into {MACHINE_INPUT_FILE}.")
+
 
-def write_file_lines(file_path: str, lines: list, file_description: str) -> None:
+def write_file_lines(file_path: str, lines: Iterable[str], file_description: str) -> None:
     """Write lines to a file."""
     try:
         with open(file_path, 'w') as file:
@@ -187,23 +275,61 @@ def view_register_state() -> None:
 
 def display_log_file() -> None:
     """Display the contents of the log file."""
-    log_contents = read_file_lines(LOG_FILE, "Log")
-    if log_contents is None:
-        return
-
-    print_in_table("Log File Contents:")
-    for line in log_contents:
-        print(line.strip())
+    register_log.flush()
+    page_file(LOG_FILE, "Log")
 
 def display_file_contents(file_path: str, file_description: str) -> None:
     """Display the contents of a specified file."""
-    contents = read_file_lines(file_path, file_description)
-    if contents is None:
-        return
+    page_file(file_path, file_description)
+
+def open_line_index(file_path: str, file_description: str) -> Optional[LineIndex]:
+    """Index a file for paging, or report why it cannot be shown."""
+    try:
+        index = LineIndex(file_path)
+    except FileNotFoundError:
+        print_in_table(f"Error: {file_path} not found.")
+        return None
+    except OSError as e:
+        print_in_table(f"Error reading {file_path}: {e}")
+        return None
+    if not len(index):
+        print_in_table(f"{file_description} file is empty.")
+        return None
+    return index
+
+def print_lines(index: LineIndex, start: int, count: int) -> None:
+    """Print ``count`` lines from zero-based ``start`` with line numbers."""
+    for number, line in enumerate(index.read(start, count), start + 1):
+        print(f"{number:>8}  {line}")
 
-    print_in_table(f"{file_description} File Contents:")
-    for line in contents:
-        print(line.strip())
+def page_file(file_path: str, file_description: str) -> None:
+    """Show a file one page at a time, reading only the lines on screen."""
+    index = open_line_index(file_path, file_description)
+    if index is None:
+        return
+    start = 0
+    while True:
+        total = len(index)
+        start = max(0, min(start, total - 1))
+        print_in_table(f"{file_description} File Contents (lines {start + 1}-{min(start + PAGE_SIZE, total)} of {total})")
+        print_lines(index, start, PAGE_SIZE)
+        command = input("[Enter] next  [b] back  [g N] go to line  [t] tail  [q] quit: ").strip().lower()
+        if command == "":
+            if start + PAGE_SIZE >= total:
+                break
+            start += PAGE_SIZE
+        elif command == "b":
+            start -= PAGE_SIZE
+        elif command == "t":
+            index.refresh()
+            start = len(index) - PAGE_SIZE
+        elif command.startswith("g"):
+            try:
+                start = int(command[1:]) - 1
+            except ValueError:
+                print_in_table("Error: Enter a line number after g.")
+        elif command == "q":
+            break
 
 def add_code_to_file(file_path: str, file_description: str) -> None:
     """Add code to a specified file."""
@@ -216,6 +342,79 @@ def add_code_to_file(file_path: str, file_description: str) -> None:
             file.write(code + "\n")
     print_in_table(f"{file_description} code has been added.")
 
+def report_watch_update(update) -> None:
+    """Print what one reassembly of a watched file did."""
+    stamp = time.strftime("%H:%M:%S")
+    if update.empty:
+        print(f"[{stamp}] no statements, output left unchanged")
+        return
+    if update.ok:
+        print(f"[{stamp}] {update.lines} lines reassembled, {update.written} output lines written in {update.seconds * 1000:.1f} ms")
+        return
+    print(f"[{stamp}] {update.error_count} errors, output left unchanged:")
+    for error in update.errors:
+        print(f"    {error}")
+
+def watch_assembly_file(source_path: str, target_path: str, interval: float = None) -> None:
+    """Reassemble the changed lines of a source file whenever it is saved, until Ctrl+C."""
+    from mano.watch import POLL_INTERVAL, SourceWatcher
+    watcher = SourceWatcher(source_path, target_path, ASSEMBLY_TO_MACHINE, interval or POLL_INTERVAL)
+    print_in_table(f"Watching {source_path} -> {target_path} (Ctrl+C to stop)")
+    try:
+        watcher.watch(report_watch_update)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print_in_table(f"Error: {e}")
+
+def parse_hex(text: str) -> int:
+    """Parse a hexadecimal register value such as ``1F`` or ``0x1F``."""
+    return int(text, 16)
+
+def search_trace(log_path: str, query: TraceQuery, limit: int = TRACE_LIMIT, offset: int = 0) -> None:
+    """Bring the trace index up to date and print the matching events."""
+    register_log.flush()
+    with TraceStore(log_path) as store:
+        store.refresh()
+        total = store.count(query)
+        events = store.query(query, limit, offset)
+    if not events:
+        print_in_table("No matching register events.")
+        return
+    print(tabulate(event_table(events), headers=EVENT_HEADERS, tablefmt="grid"))
+    print_in_table(f"Showing {offset + 1}-{offset + len(events)} of {total} matching events.")
+
+def search_register_log() -> None:
+    """Ask for filters and search the register log through its index."""
+    print("Leave a field empty to match everything.")
+    register = input("Register (e.g. AR): ").strip() or None
+    events = input("Event numbers (A:B): ").strip()
+    pc = input("PC value (hex): ").strip()
+    value = input("Register value (hex): ").strip()
+    try:
+        first, last = parse_event_range(events) if events else (None, None)
+        query = TraceQuery(
+            register, first, last,
+            parse_hex(pc) if pc else None,
+            parse_hex(value) if value else None,
+        )
+        search_trace(LOG_FILE, query)
+    except ValueError as e:
+        print_in_table(f"Error: {e}")
+    except OSError as e:
+        print_in_table(f"Error reading {LOG_FILE}: {e}")
+
+def set_log_level() -> None:
+    """Choose how much register activity is written to the log file."""
+    print(f"Current log level: {level_name(register_log.level)}")
+    choice = input(f"Enter log level ({'/'.join(LOG_LEVELS)}): ")
+    try:
+        register_log.set_level(parse_level(choice))
+    except ValueError as e:
+        print_in_table(f"Error: {e}")
+        return
+    print_in_table(f"Log level set to {level_name(register_log.level)}.")
+
 def print_in_table(message: str) -> None:
     """Print a message in a formatted table."""
     print("\n" + tabulate([[message]], tablefmt="grid") + "\n")
@@ -235,7 +434,6 @@ def print_welcome_message() -> None:
 def main_menu() -> None:
     """Display the main menu and handle user input."""
     initialize_files()
-    initialize_log_file()
     print_welcome_message()
     menu_options = [
         "Convert Assembly to Machine Language",
@@ -248,7 +446,15 @@ def main_menu() -> None:
         "Display Machine Output File",
         "Add Assembly Code",
         "Add Machine Code",
-        "Exit"
+        "Exit",  # kept at 11 so existing answers and scripts still exit
+        "Set Log Level",
+        "Run Machine Program",
+        "Export Machine Image",
+        "Import Machine Image",
+        "Search Register Log",
+        "Debug Machine Program",
+        "Watch Assembly Input",
+        "Profile Machine Program"
     ]
     while True:
         print(tabulate(enumerate(menu_options, 1), tablefmt="fancy_grid", stralign="center"))
@@ -282,9 +488,270 @@ def main_menu() -> None:
         elif choice == '11' or choice == '0':
             print_in_table("Exiting the program. Good luck, Goodbye!")
             break
+        elif choice == '12':
+            set_log_level()
+        elif choice == '13':
+            run_machine_program()
+        elif choice == '14':
+            export_machine_image()
+        elif choice == '15':
+            import_machine_image()
+        elif choice == '16':
+            search_register_log()
+        elif choice == '17':
+            debug_machine_program()
+        elif choice == '18':
+            watch_assembly_file(ASSEMBLY_INPUT_FILE, MACHINE_OUTPUT_FILE)
+        elif choice == '19':
+            profile_machine_program()
         else:
             print_in_table("Invalid choice. Please try again.")
 
+def parse_arguments(argv: list) -> argparse.Namespace:
+    """Parse the command line of a non-interactive batch run."""
+    parser = argparse.ArgumentParser(
+        description="Mano assembler. Run without a command for the interactive menu."
+    )
+    parser.add_argument("--stats", action="store_true", help="print per-stage timings and counters of every conversion")
+    parser.add_argument("--stats-json", metavar="FILE", help="also save the statistics as JSON (implies --stats)")
+    parser.add_argument("--profile", action="store_true", help="add a cProfile summary to the statistics (implies --stats)")
+    subparsers = parser.add_subparsers(dest="command")
+    for command, help_text in (
+        (ASSEMBLE, "assemble source files into machine code"),
+        (DISASSEMBLE, "disassemble machine code or image files"),
+    ):
+        sub = subparsers.add_parser(command, help=help_text)
+        sub.add_argument("patterns", nargs="+", help="input files or glob patterns (** is allowed)")
+        sub.add_argument("-o", "--output-dir", help="directory for output files (default: next to each input)")
+        sub.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+        sub.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="files handed to a worker at a time")
+        sub.add_argument("--log-level", default="off", choices=list(LOG_LEVELS), help="per-file register log (default: off)")
+        sub.add_argument("--extension", help="output file extension, e.g. .bin or .hex for assemble")
+        sub.add_argument("--cache-dir", help=f"build cache directory (default: ${CACHE_DIR_ENV} or ~/.cache/mano)")
+        sub.add_argument("--no-cache", action="store_true", help="always reassemble, ignoring the build cache")
+    view = subparsers.add_parser("view", help="print part of a large file (e.g. the register log)")
+    view.add_argument("file", nargs="?", default=LOG_FILE, help=f"file to show (default: {LOG_FILE})")
+    part = view.add_mutually_exclusive_group()
+    part.add_argument("--head", type=int, metavar="N", help="first N lines")
+    part.add_argument("--tail", type=int, metavar="N", help="last N lines")
+    part.add_argument("--range", metavar="A:B", help="lines A to B (one-based, inclusive)")
+    view.add_argument("-f", "--follow", action="store_true", help="keep printing lines as the file grows")
+    trace = subparsers.add_parser("trace", help="search the register log through its sidecar index")
+    trace.add_argument("--log", default=LOG_FILE, help=f"register log to search (default: {LOG_FILE})")
+    trace.add_argument("-r", "--register", help="only writes to this register, e.g. AR")
+    trace.add_argument("--events", metavar="A:B", help="inclusive range of event numbers (the log's Step field, one per register write); either end may be omitted")
+    trace.add_argument("--pc", type=parse_hex, help="only events where PC has this hex value")
+    trace.add_argument("--value", type=parse_hex, help="only events writing this hex value")
+    trace.add_argument("--since", metavar="TIME", help='events from this minute on, e.g. "2024-05-01 10:30"')
+    trace.add_argument("--until", metavar="TIME", help="events up to and including this minute")
+    trace.add_argument("--limit", type=int, default=TRACE_LIMIT, help=f"events to print (default: {TRACE_LIMIT})")
+    trace.add_argument("--offset", type=int, default=0, help="matching events to skip first")
+    trace.add_argument("--count", action="store_true", help="only print the number of matching events")
+    serve = subparsers.add_parser("serve", help="run the assembler daemon for repeated requests")
+    serve.add_argument("--address", help="Unix socket path or host:port (default: a socket in the temp directory)")
+    run = subparsers.add_parser("run", help="run machine code with INP/OUT connected to streams")
+    run.add_argument("image", nargs="?", default=MACHINE_OUTPUT_FILE, help=f"machine code file (default: {MACHINE_OUTPUT_FILE})")
+    run.add_argument("--input", default="-", help="INP source: - for stdin, socket:ADDRESS or a file (default: -)")
+    run.add_argument("--output", default="-", help="OUT target: - for stdout, socket:ADDRESS or a file (default: -)")
+    run.add_argument("--max-steps", type=int, default=DEFAULT_STEP_LIMIT, help=f"instruction limit (default: {DEFAULT_STEP_LIMIT})")
+    link = subparsers.add_parser("link", help="assemble modules into relocatable objects and link them into one image")
+    link.add_argument("sources", nargs="+", help="assembly modules or .obj files, in link order (glob patterns are allowed)")
+    link.add_argument("-o", "--output", default=MACHINE_OUTPUT_FILE, help=f"image to write: .txt, .bin or .hex (default: {MACHINE_OUTPUT_FILE})")
+    link.add_argument("--objects", metavar="DIR", help="directory for object files (default: next to each source)")
+    link.add_argument("--origin", type=parse_hex, default=0x100, help="hex address of the first module (default: 100)")
+    link.add_argument("--map", metavar="FILE", help="also write a link map of module and symbol addresses")
+    link.add_argument("-j", "--jobs", type=int, default=None, help="worker processes for stale modules (default: CPU count)")
+    profile = subparsers.add_parser("profile", help="run machine code and report where it spends its time")
+    profile.add_argument("image", nargs="?", default=MACHINE_OUTPUT_FILE, help=f"machine code file (default: {MACHINE_OUTPUT_FILE})")
+    profile.add_argument("--source", default=ASSEMBLY_INPUT_FILE, help=f"assembly source to map addresses to (default: {ASSEMBLY_INPUT_FILE})")
+    profile.add_argument("--top", type=int, default=20, help="rows in the hot-spot and loop tables (default: 20)")
+    profile.add_argument("--listing", metavar="FILE", help="write the annotated source listing to FILE (- for stdout)")
+    profile.add_argument("--input", metavar="FILE", help="characters for the program's INP instructions")
+    profile.add_argument("--max-steps", type=int, default=DEFAULT_STEP_LIMIT, help=f"instruction limit (default: {DEFAULT_STEP_LIMIT})")
+    watch = subparsers.add_parser("watch", help="reassemble a source file incrementally whenever it changes")
+    watch.add_argument("source", nargs="?", default=ASSEMBLY_INPUT_FILE, help=f"assembly file to watch (default: {ASSEMBLY_INPUT_FILE})")
+    watch.add_argument("-o", "--output", default=MACHINE_OUTPUT_FILE, help=f"machine code file to keep up to date (default: {MACHINE_OUTPUT_FILE})")
+    watch.add_argument("--interval", type=float, help="seconds between checks of the source file (default: 0.2)")
+    return parser.parse_args(argv)
+
+def run_view_command(args: argparse.Namespace) -> int:
+    """Print the requested lines of a file using its line index."""
+    try:
+        index = LineIndex(args.file)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    total = len(index)
+    if args.range:
+        try:
+            first, last = parse_range(args.range)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+        start, count = first - 1, (total if last is None else last) - first + 1
+    elif args.head is not None:
+        start, count = 0, args.head
+    else:
+        count = PAGE_SIZE if args.tail is None else args.tail
+        start = max(0, total - count)
+    print_lines(index, start, count)
+    if args.follow:
+        shown = total
+        try:
+            while True:
+                time.sleep(FOLLOW_INTERVAL)
+                if index.refresh():
+                    print_lines(index, shown, len(index) - shown)
+                    shown = len(index)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+def run_trace_command(args: argparse.Namespace) -> int:
+    """Search a register log by event number, register, PC, value or time."""
+    try:
+        first, last = parse_event_range(args.events) if args.events else (None, None)
+        query = TraceQuery(args.register, first, last, args.pc, args.value, args.since, args.until)
+        if args.count:
+            with TraceStore(args.log) as store:
+                store.refresh()
+                print(store.count(query))
+        else:
+            search_trace(args.log, query, args.limit, args.offset)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    return 0
+
+def run_serve_command(args: argparse.Namespace) -> int:
+    """Serve assemble/disassemble requests until a shutdown request arrives."""
+    import asyncio
+    from mano.daemon import AssemblerDaemon
+    daemon = AssemblerDaemon(args.address)
+    try:
+        asyncio.run(daemon.serve(lambda: print(f"Listening on {daemon.address}", flush=True)))
+    except KeyboardInterrupt:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print(f"Served {daemon.requests} requests.")
+    return 0
+
+def run_run_command(args: argparse.Namespace) -> int:
+    """Run machine code with its input and output devices on streams."""
+    try:
+        executed = session.run_with_devices(args.image, args.input, args.output, args.max_steps)
+    except (OSError, MachineError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        return 130
+    machine = session.machine
+    if machine.devices.starved:
+        status = "stopped waiting for input"
+    else:
+        status = "halted" if machine.halted else "stopped at the step limit"
+    print(f"Program {status} after {executed} instructions.", file=sys.stderr)
+    return 0 if machine.halted and not machine.devices.starved else 1
+
+def run_link_command(args: argparse.Namespace) -> int:
+    """Bring the object files of the modules up to date and link them."""
+    from mano.linker import build
+    sources = []
+    for pattern in args.sources:
+        for path in expand_patterns([pattern]) or [pattern]:
+            if path not in sources:
+                sources.append(path)
+    try:
+        summary = build(sources, args.output, args.objects, args.origin, args.jobs, ASSEMBLY_TO_MACHINE, args.map)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    for result in summary.results:
+        if not result.ok:
+            print(f"FAILED {result.source}", file=sys.stderr)
+            for error in result.errors:
+                print(f"    {error}", file=sys.stderr)
+    if summary.error:
+        print(f"Error: {summary.error}", file=sys.stderr)
+    print(summary.report())
+    return 0 if summary.ok else 1
+
+def run_profile_command(args: argparse.Namespace) -> int:
+    """Profile a machine code file and print its hot spots, loops and listing."""
+    try:
+        devices = None
+        if args.input:
+            from mano.devices import DeviceBus
+            with open(args.input, "rb") as file:
+                devices = DeviceBus(file.read())
+        profile = session.profile_program(args.image, args.max_steps, devices=devices)
+    except (OSError, MachineError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    print_profile(profile, session.machine.memory, args.source, args.top, args.listing)
+    return 0
+
+def run_batch_command(args: argparse.Namespace) -> int:
+    """Translate every file matched by the command line and print a summary."""
+    sources = expand_patterns(args.patterns)
+    if not sources:
+        print("No input files matched.", file=sys.stderr)
+        return 2
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    try:
+        tasks = plan_tasks(
+            args.command, sources, args.output_dir, ASSEMBLY_TO_MACHINE,
+            parse_level(args.log_level), args.extension,
+            use_cache=not args.no_cache, cache_dir=args.cache_dir,
+            stats=collect_stats, profile=profile_conversions,
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    summary = run_batch(tasks, args.jobs, args.chunk_size)
+    for result in summary.results:
+        if not result.ok:
+            print(f"FAILED {result.source}", file=sys.stderr)
+            for error in result.errors:
+                print(f"    {error}", file=sys.stderr)
+    print(summary.report())
+    if summary.stats is not None:
+        print_stats(summary.stats)
+        if stats_json_path:
+            summary.stats.write_json(stats_json_path)
+    return 1 if summary.failed else 0
+
+def main(argv: list = None) -> int:
+    """Run the interactive menu, or a batch command if one is given."""
+    global collect_stats, profile_conversions, stats_json_path
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_arguments(argv)
+    collect_stats = args.stats or args.profile or bool(args.stats_json)
+    profile_conversions = args.profile
+    stats_json_path = args.stats_json
+    if args.command is None:
+        main_menu()
+        return 0
+    if args.command == "view":
+        return run_view_command(args)
+    if args.command == "trace":
+        return run_trace_command(args)
+    if args.command == "serve":
+        return run_serve_command(args)
+    if args.command == "run":
+        return run_run_command(args)
+    if args.command == "link":
+        return run_link_command(args)
+    if args.command == "profile":
+        return run_profile_command(args)
+    if args.command == "watch":
+        watch_assembly_file(args.source, args.output, args.interval)
+        return 0
+    return run_batch_command(args)
+
 if __name__ == "__main__":
-    main_menu()
+    sys.exit(main())
 
@@ -1,209 +1,604 @@
-import datetime
 import os
+import queue
+import sys
+import threading
 from tkinter import *
-from tkinter import messagebox, scrolledtext, simpledialog
-from tabulate import tabulate
-
-ASSEMBLY_INPUT_FILE = "assembly_input.txt"
-MACHINE_OUTPUT_FILE = "machine_output.txt"
-MACHINE_INPUT_FILE = "machine_input.txt"
-ASSEMBLY_OUTPUT_FILE = "assembly_output.txt"
-LOG_FILE = "register_log.txt"
-
-registers = {
-    "AR": 0,
-    "PC": 0,
-    "DR": 0,
-    "AC": 0,
-    "IR": 0,
-}
-
-assembly_to_machine = {
-    "AND": "8",
-    "ADD": "9",
-    "LDA": "A",
-    "STA": "B",
-    "BUN": "C",
-    "BSA": "D",
-    "ISZ": "E",
-    "CLA": "7800",
-    "CLE": "7400",
-    "CMA": "7200",
-    "CME": "7100",
-    "CIR": "7080",
-    "CIL": "7040",
-    "INC": "7020",
-    "SPA": "7010",
-    "SNA": "7008",
-    "SZA": "7004",
-    "SZE": "7002",
-    "HLT": "7001",
-}
-
-machine_to_assembly = {v: k for k, v in assembly_to_machine.items()}
+from tkinter import filedialog, font, messagebox, scrolledtext, simpledialog, ttk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mano.decoder import decode_table
+from mano.image import ImageError, convert_image
+from mano.machine import DEFAULT_STEP_LIMIT, MEMORY_SIZE, MachineError
+from mano.pager import LineIndex
+from mano.pipeline import Cancelled, ProgressMonitor
+from mano.session import (
+    ASSEMBLY_INPUT_FILE,
+    ASSEMBLY_OUTPUT_FILE,
+    LOG_FILE,
+    MACHINE_INPUT_FILE,
+    MACHINE_OUTPUT_FILE,
+    Session,
+)
+from mano.stats import Stats
+from mano.tables import ASSEMBLY_TO_MACHINE
+from mano.trace_store import EVENT_HEADERS, TraceQuery, TraceStore, event_table, parse_event_range
+from mano.trace_log import LOG_LEVELS, level_name
+
+POLL_INTERVAL_MS = 50
+FOLLOW_INTERVAL_MS = 500
+WATCH_INTERVAL_MS = 200
+TRACE_LIMIT = 1000
+PANEL_FRAME_MS = 66  # the live panel redraws at most about 15 times a second
+MEMORY_ROW_WORDS = 8
+CHANGED_COLOR = "#FFB74D"
+PC_COLOR = "#4CAF50"
+HEAT_COLORS = ["#FFF3E0", "#FFCC80", "#FF8A65", "#E53935"]  # background of executed lines, coolest first
+
+session = Session()
+registers = session.registers
+register_log = session.register_log
+performance = {"stats": False, "profile": False}
+last_stats = None
+
+
+def tabulate(*args, **kwargs):
+    from tabulate import tabulate as render
+
+    return render(*args, **kwargs)
 
 
 def initialize_files():
-    for file in [
+    session.reset_files()
+
+
+def run_conversion(convert, input_file, file_description, success_message):
+    global last_stats
+    stats = Stats(performance["profile"]) if performance["stats"] or performance["profile"] else None
+    log_bytes = register_log.bytes_written
+    if stats is not None:
+        stats.start()
+    try:
+        result = convert(stats)
+    except FileNotFoundError:
+        return f"Error: {input_file} not found."
+    finally:
+        if stats is not None:
+            with stats.stage("log"):
+                register_log.flush()
+            stats.stop()
+            stats.count("log bytes", register_log.bytes_written - log_bytes)
+            last_stats = stats
+
+    if not result.lines:
+        message = f"Error: {file_description} file is empty."
+    elif not result.ok:
+        message = result.error_report()
+    else:
+        message = success_message
+    if stats is not None:
+        message += f"\n\nTook {stats.total:.3f} s. See Performance > Show Statistics for the breakdown."
+    return message
+
+
+def convert_assembly_to_machine(monitor=None):
+    return run_conversion(
+        lambda stats: session.assemble(monitor=monitor, stats=stats),
         ASSEMBLY_INPUT_FILE,
+        "Assembly input",
+        "Assembly code has been converted to machine language.",
+    )
+
+
+def convert_machine_to_assembly(monitor=None):
+    return run_conversion(
+        lambda stats: session.disassemble(monitor=monitor, stats=stats),
         MACHINE_INPUT_FILE,
-        MACHINE_OUTPUT_FILE,
-        ASSEMBLY_OUTPUT_FILE,
-        LOG_FILE,
-    ]:
-        with open(file, "w") as f:
-            f.write("")
-
-
-def log_register_operation(operation, register, value):
-    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    memory_state = {k: v for k, v in registers.items()}
-    log_entry = {
-        "Timestamp": timestamp,
-        "Operation": operation,
-        "Register": register,
-        "Value": value,
-        "Registers": memory_state,
-    }
-    with open(LOG_FILE, "a") as log_file:
-        log_file.write(f"{log_entry}\n")
-
-
-def update_register(register, value):
-    registers[register] = value
-    log_register_operation("UPDATE", register, value)
-
-
-def convert_assembly_to_machine():
+        "Machine input",
+        "Machine code has been converted to assembly language.",
+    )
+
+
+def show_statistics():
+    if last_stats is None:
+        messagebox.showinfo(
+            "Performance", "No statistics yet. Enable Performance > Collect Statistics and run a conversion."
+        )
+        return
+    PerformancePanel(last_stats)
+
+
+class PerformancePanel(Toplevel):
+    def __init__(self, stats):
+        super().__init__()
+        self.title("Performance")
+        self.geometry("900x600")
+        self.stats = stats
+        self.add_table("Stages", ["Stage", "Seconds", "Share", "Calls"], stats.stage_rows())
+        self.add_table("Counters", ["Counter", "Value"], stats.counter_rows())
+        if stats.profile_rows:
+            rows = [
+                [function, calls, f"{own:.4f}", f"{cumulative:.4f}"]
+                for function, calls, own, cumulative in stats.profile_rows
+            ]
+            self.add_table("Profile (top functions)", ["Function", "Calls", "Own (s)", "Cumulative (s)"], rows)
+        Button(
+            self, text="Export JSON...", command=self.export, font=("Arial", 12, "bold"), bg="#4CAF50", fg="white"
+        ).pack(pady=10)
+
+    def add_table(self, title, headers, rows):
+        Label(self, text=title, font=("Arial", 12, "bold")).pack(anchor=W, padx=10, pady=(10, 0))
+        tree = ttk.Treeview(self, columns=headers, show="headings", height=min(len(rows), 10))
+        for index, header in enumerate(headers):
+            tree.heading(header, text=header)
+            tree.column(header, width=420 if index == 0 and len(headers) == 4 else 150, anchor=W if index == 0 else E)
+        for row in rows:
+            tree.insert("", END, values=row)
+        tree.pack(fill=X, padx=10)
+
+    def export(self):
+        file_path = filedialog.asksaveasfilename(
+            parent=self, defaultextension=".json", filetypes=[("JSON", "*.json"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        try:
+            self.stats.write_json(file_path)
+        except OSError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+
+
+def run_machine_program(monitor=None, devices=None):
     try:
-        with open(ASSEMBLY_INPUT_FILE, "r") as asm_file:
-            assembly_code = asm_file.readlines()
+        executed = session.run_program(MACHINE_OUTPUT_FILE, monitor=monitor, devices=devices)
     except FileNotFoundError:
-        display_message(f"Error: {ASSEMBLY_INPUT_FILE} not found.")
-        return
-    except Exception as e:
-        display_message(f"Error reading {ASSEMBLY_INPUT_FILE}: {e}")
-        return
+        return f"Error: {MACHINE_OUTPUT_FILE} not found."
+    except MachineError as e:
+        return f"Error: {e}"
 
-    if not assembly_code:
-        display_message("Error: Assembly input file is empty.")
-        return
+    machine = session.machine
+    if devices is not None and devices.starved:
+        status = "is waiting for more input"
+    else:
+        status = "halted" if machine.halted else "stopped at the step limit"
+    output = f"Output: {devices.output.decode('latin-1')}\n\n" if devices is not None else ""
+    table = [[k, f"{v:X}"] for k, v in machine.state().items()]
+    return f"Program {status} after {executed} instructions.\n\n" + output + tabulate(
+        table, headers=["Register", "Value (hex)"]
+    )
 
-    machine_code = []
-    for line in assembly_code:
-        parts = line.strip().split()
-        if len(parts) == 1:
-            instruction = parts[0]
-            if instruction in assembly_to_machine:
-                machine_code.append(f"{assembly_to_machine[instruction]}\n")
-                update_register("IR", int(assembly_to_machine[instruction], 16))
-            else:
-                display_message(f"Error: Invalid instruction {instruction}")
-                return
-        else:
-            instruction, operand = parts
-            if instruction in assembly_to_machine:
-                opcode = assembly_to_machine[instruction]
-                machine_code.append(f"{opcode}{operand}\n")
-                update_register("IR", int(f"{opcode}{operand}", 16))
-                update_register("AR", int(operand, 16))
-            else:
-                display_message(f"Error: Invalid instruction {instruction}")
-                return
 
-        registers["PC"] += 1
-        log_register_operation("INCREMENT", "PC", registers["PC"])
+def profile_machine_program(monitor=None, devices=None):
+    from mano.pipeline import read_lines
+    from mano.profiler import source_addresses
 
     try:
-        with open(MACHINE_OUTPUT_FILE, "w") as mach_file:
-            mach_file.writelines(machine_code)
-    except Exception as e:
-        display_message(f"Error writing {MACHINE_OUTPUT_FILE}: {e}")
-        return
+        profile = session.profile_program(MACHINE_OUTPUT_FILE, monitor=monitor, devices=devices)
+    except FileNotFoundError:
+        return f"Error: {MACHINE_OUTPUT_FILE} not found."
+    except MachineError as e:
+        return f"Error: {e}"
+
+    memory = session.machine.memory
+    lines = texts = listing = None
+    if os.path.exists(ASSEMBLY_INPUT_FILE):
+        lines = source_addresses(lambda: read_lines(ASSEMBLY_INPUT_FILE), ASSEMBLY_TO_MACHINE)
+        texts = dict(read_lines(ASSEMBLY_INPUT_FILE))
+        listing = profile.listing(read_lines(ASSEMBLY_INPUT_FILE), lines, memory)
+    hot_spots = profile.hot_spots(memory, lines=lines, texts=texts)
+    loops = profile.loop_rows(memory)
+    return lambda: ProfileWindow(profile.summary(), hot_spots, loops, listing, max(profile.cycles))
+
 
-    display_message("Assembly code has been converted to machine language.")
+class ProfileWindow(Toplevel):
+    """Hot spots and loops of a profiled run, and the source listing as a heat map."""
 
+    def __init__(self, summary, hot_spots, loops, listing, peak):
+        from mano.profiler import HOT_SPOT_HEADERS, LISTING_HEADERS, LOOP_HEADERS
 
-def convert_machine_to_assembly():
+        super().__init__()
+        self.title("Profile Machine Program")
+        self.geometry("1100x800")
+        Label(self, text=summary, font=("Arial", 12, "bold")).pack(anchor=W, padx=10, pady=(10, 0))
+        notebook = ttk.Notebook(self)
+        notebook.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        if listing is not None:
+            levels = [len(HEAT_COLORS) * row[3] // (peak + 1) + 1 if row[3] else 0 for row in listing]
+            tree = self.add_table(notebook, "Source Listing", LISTING_HEADERS, listing, levels)
+            for level, color in enumerate(HEAT_COLORS, 1):
+                tree.tag_configure(f"heat{level}", background=color)
+        self.add_table(notebook, "Hot Spots", HOT_SPOT_HEADERS, hot_spots)
+        self.add_table(notebook, "Loops", LOOP_HEADERS, loops)
+
+    def add_table(self, notebook, title, headers, rows, levels=None):
+        frame = Frame(notebook)
+        notebook.add(frame, text=title)
+        tree = ttk.Treeview(frame, columns=headers, show="headings")
+        scrollbar = ttk.Scrollbar(frame, orient=VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        for header in headers:
+            tree.heading(header, text=header)
+            tree.column(header, width=360 if header == "Source" else 90, anchor=W if header in ("Source", "Heat") else E)
+        for index, row in enumerate(rows):
+            tags = (f"heat{levels[index]}",) if levels is not None and levels[index] else ()
+            tree.insert("", END, values=row, tags=tags)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        tree.pack(fill=BOTH, expand=True)
+        return tree
+
+
+def start_machine_program(app, run=run_machine_program):
+    from mano.devices import DeviceBus, image_uses_devices
+
+    devices = None
     try:
-        with open(MACHINE_INPUT_FILE, "r") as mach_file:
-            machine_code = mach_file.readlines()
+        if image_uses_devices(MACHINE_OUTPUT_FILE, ASSEMBLY_INPUT_FILE, session.assembly_to_machine):
+            text = simpledialog.askstring("Program Input", "Input for the program's INP instructions:", parent=app)
+            if text is None:
+                return
+            devices = DeviceBus(text.encode())
     except FileNotFoundError:
-        display_message(f"Error: {MACHINE_INPUT_FILE} not found.")
+        display_message(f"Error: {MACHINE_OUTPUT_FILE} not found.")
         return
-    except Exception as e:
-        display_message(f"Error reading {MACHINE_INPUT_FILE}: {e}")
+    except MachineError as e:
+        display_message(f"Error: {e}")
         return
+    app.run_in_background(lambda monitor: run(monitor, devices))
+
 
-    if not machine_code:
-        display_message("Error: Machine input file is empty.")
+def debug_machine_program(app):
+    try:
+        debugger = session.debug_program(MACHINE_OUTPUT_FILE)
+    except FileNotFoundError:
+        display_message(f"Error: {MACHINE_OUTPUT_FILE} not found.")
+        return
+    except MachineError as e:
+        display_message(f"Error: {e}")
         return
+    DebuggerWindow(app, debugger)
+
+
+class DebuggerWindow(Toplevel):
+    """Steps a program forward and back; long moves run on the app's worker thread."""
+
+    def __init__(self, app, debugger):
+        super().__init__(app)
+        self.title("Debug Machine Program")
+        self.app = app
+        self.debugger = debugger
+        toolbar = Frame(self)
+        toolbar.pack(fill=X, padx=10, pady=10)
+        Label(toolbar, text="Steps:", font=("Arial", 11)).pack(side=LEFT)
+        self.count = Entry(toolbar, width=8, font=("Arial", 11))
+        self.count.insert(0, "1")
+        self.count.pack(side=LEFT, padx=(0, 10))
+        for text, command in [
+            ("Step Back", lambda: self.move(debugger.back)),
+            ("Step", lambda: self.move(debugger.forward)),
+            ("Continue", lambda: self.execute(lambda monitor: debugger.forward(DEFAULT_STEP_LIMIT, monitor))),
+        ]:
+            Button(toolbar, text=text, command=command, font=("Arial", 11, "bold"), bg="#4CAF50", fg="white").pack(side=LEFT, padx=2)
+        Label(toolbar, text="Go to step:", font=("Arial", 11)).pack(side=LEFT, padx=(10, 0))
+        self.target = Entry(toolbar, width=10, font=("Arial", 11))
+        self.target.pack(side=LEFT)
+        self.target.bind("<Return>", lambda event: self.go_to())
+        Button(toolbar, text="Go", command=self.go_to, font=("Arial", 11)).pack(side=LEFT, padx=2)
+        self.status = Label(self, font=("Courier", 12), anchor=W)
+        self.status.pack(fill=X, padx=10)
+        self.registers = ttk.Treeview(self, columns=["Register", "Value (hex)"], show="headings", height=15)
+        for header in ["Register", "Value (hex)"]:
+            self.registers.heading(header, text=header)
+            self.registers.column(header, width=150, anchor=CENTER)
+        self.registers.pack(fill=BOTH, expand=True, padx=10, pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    def amount(self, entry):
+        return int(entry.get().strip().replace(",", "").replace("_", "") or "1")
+
+    def move(self, method):
+        try:
+            count = self.amount(self.count)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+            return
+        self.execute(lambda monitor: method(count, monitor))
+
+    def go_to(self):
+        try:
+            step = self.amount(self.target)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+            return
+        self.execute(lambda monitor: self.debugger.goto(step, monitor))
+
+    def execute(self, action):
+        """Run ``action(monitor)`` on the worker thread; entries must be read before."""
+        def work(monitor):
+            try:
+                action(monitor)
+            except Cancelled:
+                def cancelled():
+                    self.refresh()
+                    display_message("Operation cancelled.")
+
+                return cancelled
+            return self.refresh
 
-    assembly_code = []
-    for line in machine_code:
-        line = line.strip()
-        if len(line) == 4 and line in machine_to_assembly:
-            instruction = machine_to_assembly[line]
-            assembly_code.append(f"{instruction}\n")
-            update_register("IR", int(line, 16))
+        self.app.run_in_background(work)
+
+    def refresh(self):
+        machine = self.debugger.machine
+        word = machine.memory[machine.PC]
+        if self.debugger.halted:
+            status = "halted"
         else:
-            opcode = line[0]
-            operand = line[1:]
-            instruction = [
-                key for key, value in assembly_to_machine.items() if value == opcode
-            ]
-            if instruction:
-                assembly_code.append(f"{instruction[0]} {operand}\n")
-                update_register("IR", int(f"{opcode}{operand}", 16))
-                update_register("AR", int(operand, 16))
-            else:
-                display_message(f"Error: Invalid machine code {line}")
-                return
+            status = f"next {machine.PC:03X}: {word:04X}  {decode_table(ASSEMBLY_TO_MACHINE)[word][0]}"
+        self.status.config(text=f"Step {self.debugger.step} ({status})")
+        self.registers.delete(*self.registers.get_children())
+        for name, value in machine.state().items():
+            self.registers.insert("", END, values=[name, f"{value:X}"])
+
+    def close(self):
+        session.sync_registers()
+        self.destroy()
+
 
-        registers["PC"] += 1
-        log_register_operation("INCREMENT", "PC", registers["PC"])
+IMAGE_FILE_TYPES = [
+    ("Binary image", "*.bin"),
+    ("Intel HEX", "*.hex"),
+    ("Hex text", "*.txt"),
+]
 
+
+def export_machine_image():
+    file_path = filedialog.asksaveasfilename(
+        title="Export Machine Image", defaultextension=".bin", filetypes=IMAGE_FILE_TYPES
+    )
+    if not file_path:
+        return
     try:
-        with open(ASSEMBLY_OUTPUT_FILE, "w") as asm_file:
-            asm_file.writelines(assembly_code)
-    except Exception as e:
-        display_message(f"Error writing {ASSEMBLY_OUTPUT_FILE}: {e}")
+        count = convert_image(MACHINE_OUTPUT_FILE, file_path)
+    except FileNotFoundError:
+        display_message(f"Error: {MACHINE_OUTPUT_FILE} not found.")
+        return
+    except (ImageError, OSError) as e:
+        display_message(f"Error: {e}")
         return
+    display_message(f"{count} words have been exported to {file_path}.")
 
-    display_message("Machine code has been converted to assembly language.")
 
+def link_assembly_modules(app):
+    sources = filedialog.askopenfilenames(
+        title="Link Assembly Modules", filetypes=[("Assembly modules", "*.asm *.txt"), ("Object files", "*.obj"), ("All files", "*.*")]
+    )
+    if sources:
+        app.run_in_background(lambda monitor: link_modules(list(sources)))
+
+
+def link_modules(sources):
+    from mano.linker import build
+
+    summary = build(sources, MACHINE_OUTPUT_FILE)
+    lines = []
+    for result in summary.results:
+        if not result.ok:
+            lines.append(f"FAILED {result.source}")
+            lines.extend(f"    {error}" for error in result.errors)
+    if summary.error:
+        lines.append(f"Error: {summary.error}")
+    if summary.ok:
+        lines.append(f"Modules have been linked into {MACHINE_OUTPUT_FILE}.")
+    lines.append(summary.report())
+    return "\n".join(lines)
+
+
+def import_machine_image():
+    file_path = filedialog.askopenfilename(title="Import Machine Image", filetypes=IMAGE_FILE_TYPES)
+    if not file_path:
+        return
+    try:
+        count = convert_image(file_path, MACHINE_INPUT_FILE)
+    except (ImageError, OSError) as e:
+        display_message(f"Error: {e}")
+        return
+    display_message(f"{count} words have been imported into {MACHINE_INPUT_FILE}.")
 
-def view_register_state():
+
+def view_register_state(monitor=None):
     table = [[k, v] for k, v in registers.items()]
-    display_message(tabulate(table, headers=["Register", "Value"]))
+    return tabulate(table, headers=["Register", "Value"])
+
+
+def display_log_file(monitor=None):
+    register_log.flush()
+    return display_file_contents(LOG_FILE, "Log", monitor)
 
 
-def display_log_file():
+def display_file_contents(file_path, file_description, monitor=None):
     try:
-        with open(LOG_FILE, "r") as log_file:
-            log_contents = log_file.readlines()
-        if not log_contents:
-            display_message("Log file is empty.")
-            return
-        display_message("Log File Contents:\n" + "".join(log_contents))
+        index = LineIndex(file_path)
     except FileNotFoundError:
-        display_message(f"Error: {LOG_FILE} not found.")
-    except Exception as e:
-        display_message(f"Error reading {LOG_FILE}: {e}")
+        return f"Error: {file_path} not found."
+    if not len(index):
+        return f"{file_description} file is empty."
+    return lambda: FileViewer(index, f"{file_description} File Contents")
 
 
-def display_file_contents(file_path, file_description):
-    try:
-        with open(file_path, "r") as file:
-            contents = file.readlines()
-        if not contents:
-            display_message(f"{file_description} file is empty.")
+class FileViewer(Toplevel):
+    """Shows the visible window of a large file, reading only those lines from disk."""
+
+    def __init__(self, index, title):
+        super().__init__()
+        self.title(title)
+        self.geometry("1000x600")
+        self.index = index
+        self.first = 0
+        self.font = font.Font(family="Courier", size=11)
+
+        toolbar = Frame(self)
+        toolbar.pack(fill=X, padx=5, pady=5)
+        Label(toolbar, text="Go to line:", font=("Arial", 11)).pack(side=LEFT)
+        self.line_entry = Entry(toolbar, width=12, font=("Arial", 11))
+        self.line_entry.pack(side=LEFT, padx=5)
+        self.line_entry.bind("<Return>", self.jump)
+        Button(toolbar, text="Go", command=self.jump, font=("Arial", 11)).pack(side=LEFT)
+        self.follow = BooleanVar(value=False)
+        Checkbutton(
+            toolbar, text="Follow (tail)", variable=self.follow, command=self.poll, font=("Arial", 11)
+        ).pack(side=LEFT, padx=15)
+        self.status = Label(toolbar, font=("Arial", 11))
+        self.status.pack(side=RIGHT)
+
+        body = Frame(self)
+        body.pack(fill=BOTH, expand=True)
+        self.scrollbar = Scrollbar(body, orient=VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.text = Text(body, wrap=NONE, font=self.font, bg="#1E1E1E", fg="white")
+        self.text.pack(side=LEFT, fill=BOTH, expand=True)
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", lambda event: self.scroll_lines(-event.delta // 120 * 3))
+        self.text.bind("<Button-4>", lambda event: self.scroll_lines(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_lines(3))
+        self.bind("<Prior>", lambda event: self.scroll_lines(-self.visible_lines()))
+        self.bind("<Next>", lambda event: self.scroll_lines(self.visible_lines()))
+        self.bind("<Home>", lambda event: self.scroll_to(0))
+        self.bind("<End>", lambda event: self.scroll_to(len(self.index)))
+        self.render()
+
+    def visible_lines(self):
+        return max(1, self.text.winfo_height() // self.font.metrics("linespace"))
+
+    def render(self):
+        total = len(self.index)
+        rows = self.visible_lines()
+        self.first = max(0, min(self.first, total - rows))
+        lines = self.index.read(self.first, rows)
+        width = len(str(total))
+        self.text.config(state=NORMAL)
+        self.text.delete("1.0", END)
+        self.text.insert(
+            END, "\n".join(f"{number:>{width}}  {line}" for number, line in enumerate(lines, self.first + 1))
+        )
+        self.text.config(state=DISABLED)
+        if total:
+            self.scrollbar.set(self.first / total, (self.first + len(lines)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+        self.status.config(text=f"Lines {self.first + 1}-{self.first + len(lines)} of {total}")
+
+    def scroll_to(self, line):
+        self.first = line
+        self.render()
+
+    def scroll_lines(self, count):
+        self.scroll_to(self.first + count)
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.index)))
+        elif unit == "pages":
+            self.scroll_lines(int(amount) * self.visible_lines())
+        else:
+            self.scroll_lines(int(amount))
+
+    def jump(self, event=None):
+        try:
+            line = int(self.line_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Enter a line number.", parent=self)
             return
-        display_message(f"{file_description} File Contents:\n" + "".join(contents))
-    except FileNotFoundError:
-        display_message(f"Error: {file_path} not found.")
-    except Exception as e:
-        display_message(f"Error reading {file_path}: {e}")
+        self.follow.set(False)
+        self.scroll_to(line - 1)
+
+    def poll(self):
+        if not self.follow.get() or not self.winfo_exists():
+            return
+        try:
+            self.index.refresh()
+        except OSError:
+            pass
+        self.scroll_to(len(self.index))
+        self.after(FOLLOW_INTERVAL_MS, self.poll)
+
+
+def search_register_log(query, monitor=None):
+    register_log.flush()
+    with TraceStore(LOG_FILE) as store:
+        store.refresh(monitor)
+        total = store.count(query)
+        events = store.query(query, TRACE_LIMIT)
+    if not events:
+        return "No matching register events."
+    return lambda: TraceResults(event_table(events), total)
+
+
+class TraceSearchDialog(Toplevel):
+    """Collects trace filters and runs the search on the app's worker thread."""
+
+    FIELDS = [
+        ("register", "Register (e.g. AR)"),
+        ("events", "Event numbers (A:B)"),
+        ("pc", "PC value (hex)"),
+        ("value", "Register value (hex)"),
+        ("since", "Since (YYYY-MM-DD HH:MM)"),
+        ("until", "Until (YYYY-MM-DD HH:MM)"),
+    ]
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.title("Search Register Log")
+        self.app = app
+        self.entries = {}
+        for row, (name, label) in enumerate(self.FIELDS):
+            Label(self, text=label, font=("Arial", 11)).grid(row=row, column=0, sticky=W, padx=10, pady=4)
+            entry = Entry(self, width=30, font=("Arial", 11))
+            entry.grid(row=row, column=1, padx=10, pady=4)
+            self.entries[name] = entry
+        Label(self, text="Leave a field empty to match everything.", font=("Arial", 10)).grid(
+            row=len(self.FIELDS), column=0, columnspan=2, pady=4
+        )
+        Button(
+            self, text="Search", command=self.search, font=("Arial", 12, "bold"), bg="#4CAF50", fg="white"
+        ).grid(row=len(self.FIELDS) + 1, column=0, columnspan=2, pady=10)
+        self.bind("<Return>", lambda event: self.search())
+
+    def search(self):
+        values = {name: entry.get().strip() or None for name, entry in self.entries.items()}
+        try:
+            first, last = parse_event_range(values["events"]) if values["events"] else (None, None)
+            query = TraceQuery(
+                values["register"],
+                first,
+                last,
+                int(values["pc"], 16) if values["pc"] else None,
+                int(values["value"], 16) if values["value"] else None,
+                values["since"],
+                values["until"],
+            )
+        except ValueError as e:
+            messagebox.showerror("Error", str(e), parent=self)
+            return
+        self.app.run_in_background(lambda monitor: search_register_log(query, monitor))
+
+
+class TraceResults(Toplevel):
+    def __init__(self, rows, total):
+        super().__init__()
+        self.title("Register Log Search Results")
+        self.geometry("900x500")
+        Label(self, text=f"Showing {len(rows)} of {total} matching events", font=("Arial", 11)).pack(pady=5)
+        frame = Frame(self)
+        frame.pack(fill=BOTH, expand=True)
+        tree = ttk.Treeview(frame, columns=EVENT_HEADERS, show="headings")
+        for header in EVENT_HEADERS:
+            tree.heading(header, text=header)
+            tree.column(header, width=200 if header == "Timestamp" else 100, anchor=CENTER)
+        scrollbar = Scrollbar(frame, orient=VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=RIGHT, fill=Y)
+        tree.pack(side=LEFT, fill=BOTH, expand=True)
+        for row in rows:
+            tree.insert("", END, values=row)
 
 
 def add_assembly_code():
@@ -245,6 +640,201 @@ def input_window(title, prompt, file_path):
     ).pack(pady=10)
 
 
+def watch_message(update):
+    if update.empty:
+        return f"{ASSEMBLY_INPUT_FILE} has no statements, {MACHINE_OUTPUT_FILE} left unchanged."
+    if update.ok:
+        return f"{ASSEMBLY_INPUT_FILE} reassembled: {update.lines} lines encoded, {update.written} output lines written in {update.seconds * 1000:.1f} ms"
+    errors = "\n".join(f"Error: {error}" for error in update.errors)
+    return f"{ASSEMBLY_INPUT_FILE} has {update.error_count} errors, {MACHINE_OUTPUT_FILE} left unchanged:\n{errors}"
+
+
+def reassemble_watched(watcher):
+    update = watcher.poll()
+    if update is None:
+        return f"Watching {ASSEMBLY_INPUT_FILE}; no changes to reassemble."
+    return watch_message(update)
+
+
+class MemoryGrid(Frame):
+    """The 4096 memory words, eight per row; only the visible rows exist as canvas items."""
+
+    def __init__(self, master, rows=24):
+        super().__init__(master)
+        self.font = font.Font(family="Courier", size=11)
+        self.rows = rows
+        self.first = 0
+        self.memory = None
+        self.changed = set()
+        self.pc = None
+        self.highlighted = set()
+        char = self.font.measure("0")
+        line = self.font.metrics("linespace")
+        self.canvas = Canvas(
+            self, width=char * (5 + 5 * MEMORY_ROW_WORDS), height=line * rows, bg="#1E1E1E", highlightthickness=0
+        )
+        self.scrollbar = Scrollbar(self, orient=VERTICAL, command=self.on_scroll)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.canvas.pack(side=LEFT, fill=BOTH, expand=True)
+        self.labels = []
+        self.cells = []
+        for row in range(rows):
+            y = row * line
+            self.labels.append(self.canvas.create_text(0, y, anchor=NW, font=self.font, fill="#9E9E9E"))
+            self.cells.append([
+                self.canvas.create_text(char * (5 + 5 * column), y, anchor=NW, font=self.font, fill="white")
+                for column in range(MEMORY_ROW_WORDS)
+            ])
+        self.canvas.bind("<MouseWheel>", lambda event: self.scroll_lines(-event.delta // 120 * 3))
+        self.canvas.bind("<Button-4>", lambda event: self.scroll_lines(-3))
+        self.canvas.bind("<Button-5>", lambda event: self.scroll_lines(3))
+
+    def total_rows(self):
+        return MEMORY_SIZE // MEMORY_ROW_WORDS
+
+    def update_memory(self, memory, dirty_words, pc):
+        """Show new memory contents; only rows with dirty words (or old highlights) are redrawn."""
+        self.memory = memory
+        self.changed = set(dirty_words or ())
+        rows = None
+        if dirty_words is not None:
+            rows = {address // MEMORY_ROW_WORDS for address in self.changed} | self.highlighted
+            for address in (self.pc, pc):
+                if address is not None:
+                    rows.add(address // MEMORY_ROW_WORDS)
+        self.pc = pc
+        self.render(rows)
+
+    def render(self, rows=None):
+        if self.memory is None:
+            return
+        self.first = max(0, min(self.first, self.total_rows() - self.rows))
+        highlighted = set()
+        for index in range(self.rows):
+            row = self.first + index
+            if rows is not None and row not in rows:
+                if row in self.highlighted:
+                    highlighted.add(row)
+                continue
+            base = row * MEMORY_ROW_WORDS
+            self.canvas.itemconfigure(self.labels[index], text=f"{base:03X}")
+            for column, item in enumerate(self.cells[index]):
+                address = base + column
+                if address == self.pc:
+                    color = PC_COLOR
+                elif address in self.changed:
+                    color = CHANGED_COLOR
+                else:
+                    color = "white"
+                if color != "white":
+                    highlighted.add(row)
+                self.canvas.itemconfigure(item, text=f"{self.memory[address]:04X}", fill=color)
+        self.highlighted = highlighted
+        total = self.total_rows()
+        self.scrollbar.set(self.first / total, (self.first + self.rows) / total)
+
+    def scroll_to(self, row):
+        self.first = row
+        self.highlighted = set()
+        self.render()
+
+    def scroll_lines(self, count):
+        self.scroll_to(self.first + count)
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.total_rows()))
+        elif unit == "pages":
+            self.scroll_lines(int(amount) * self.rows)
+        else:
+            self.scroll_lines(int(amount))
+
+
+class LivePanel(Frame):
+    """Registers and memory, redrawn from coalesced changes at most every PANEL_FRAME_MS."""
+
+    def __init__(self, app):
+        from mano.live import LIVE_REGISTERS, LiveState
+
+        super().__init__(app, bd=2, relief=GROOVE)
+        self.app = app
+        self.live = LiveState(session)
+        self.pending = None  # the scheduled tick while the panel is shown
+        self.docked = True
+        header = Frame(self)
+        header.pack(fill=X, padx=5, pady=5)
+        Label(header, text="Registers and Memory", font=("Arial", 12, "bold")).pack(side=LEFT)
+        self.dock_button = Button(header, text="Undock", command=self.toggle_dock, font=("Arial", 10))
+        self.dock_button.pack(side=RIGHT)
+        self.registers = ttk.Treeview(self, columns=["Register", "Trace", "Machine"], show="headings", height=len(LIVE_REGISTERS))
+        for header_text in ["Register", "Trace", "Machine"]:
+            self.registers.heading(header_text, text=header_text)
+            self.registers.column(header_text, width=90, anchor=CENTER)
+        for name in LIVE_REGISTERS:
+            self.registers.insert("", END, iid=name, values=[name, "", ""])
+        self.registers.tag_configure("changed", background=CHANGED_COLOR)
+        self.registers.pack(fill=X, padx=5)
+        self.changed_registers = set()
+        toolbar = Frame(self)
+        toolbar.pack(fill=X, padx=5, pady=5)
+        Label(toolbar, text="Go to address:", font=("Arial", 10)).pack(side=LEFT)
+        self.address = Entry(toolbar, width=6, font=("Arial", 10))
+        self.address.pack(side=LEFT, padx=5)
+        self.address.bind("<Return>", self.jump)
+        self.memory = MemoryGrid(self)
+        self.memory.pack(fill=BOTH, expand=True, padx=5, pady=(0, 5))
+
+    def start(self):
+        if self.pending is None:
+            self.tick()
+
+    def stop(self):
+        if self.pending is not None:
+            self.after_cancel(self.pending)
+            self.pending = None
+
+    def tick(self):
+        changes = self.live.poll()
+        if changes is not None:
+            self.show(changes)
+        self.pending = self.after(PANEL_FRAME_MS, self.tick)
+
+    def show(self, changes):
+        dirty = changes.dirty_registers | changes.dirty_machine
+        for name in dirty | self.changed_registers:
+            if not self.registers.exists(name):
+                continue
+            trace = changes.registers.get(name)
+            self.registers.item(
+                name,
+                values=[name, "" if trace is None else f"{trace:X}", f"{changes.machine[name]:X}"],
+                tags=("changed",) if name in dirty else (),
+            )
+        self.changed_registers = dirty
+        self.memory.update_memory(changes.memory, changes.dirty_words, changes.machine["PC"])
+
+    def jump(self, event=None):
+        try:
+            address = int(self.address.get(), 16)
+        except ValueError:
+            messagebox.showerror("Error", "Enter a hexadecimal address.", parent=self)
+            return
+        self.memory.scroll_to((address & 0xFFF) // MEMORY_ROW_WORDS)
+
+    def toggle_dock(self):
+        if self.docked:
+            self.pack_forget()
+            self.app.wm_manage(self)
+            self.tk.call("wm", "title", self._w, "Registers and Memory")
+            self.tk.call("wm", "protocol", self._w, "WM_DELETE_WINDOW", self.register(self.toggle_dock))
+            self.dock_button.config(text="Dock")
+        else:
+            self.app.wm_forget(self)
+            self.app.place_panel()
+            self.dock_button.config(text="Undock")
+        self.docked = not self.docked
+
+
 def display_message(message):
     text_area.delete("1.0", END)
     text_area.insert(END, message)
@@ -255,22 +845,154 @@ class ManoAssemblerApp(Tk):
         super().__init__()
         self.title("Maurice Mano GUI Assembler")
         self.state("zoomed")
+        self.updates = queue.Queue()
+        self.monitor = None
+        self.watcher = None
         initialize_files()
         self.create_widgets()
+        self.panel = LivePanel(self)
+        self.toggle_panel()
 
     def create_widgets(self):
         self.create_menu()
         self.create_welcome_message()
         self.create_main_buttons()
+        self.create_progress_bar()
         self.create_text_area()
 
+    def run_in_background(self, work, passes=1):
+        """Run ``work(monitor)`` on a worker thread and show the message it returns.
+
+        ``work`` may instead return a callable, which is then run on the Tk thread.
+        """
+        if self.monitor is not None:
+            messagebox.showinfo("Busy", "Another operation is still running.")
+            return
+        updates = self.updates
+        monitor = self.monitor = ProgressMonitor(lambda fraction: updates.put(("progress", fraction)), passes)
+
+        def worker():
+            try:
+                message = work(monitor)
+            except Cancelled:
+                message = "Operation cancelled."
+            except Exception as e:
+                message = f"Error: {e}"
+            updates.put(("done", message))
+
+        self.progress["value"] = 0
+        self.cancel_button.config(state=NORMAL)
+        display_message("Working...")
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(POLL_INTERVAL_MS, self.poll_worker)
+
+    def poll_worker(self):
+        fraction = message = None
+        try:
+            while True:
+                kind, value = self.updates.get_nowait()
+                if kind == "progress":
+                    fraction = value
+                else:
+                    message = value
+        except queue.Empty:
+            pass
+        if fraction is not None:
+            self.progress["value"] = fraction
+        if message is None:
+            self.after(POLL_INTERVAL_MS, self.poll_worker)
+            return
+        self.monitor = None
+        self.progress["value"] = 0
+        self.cancel_button.config(state=DISABLED)
+        if callable(message):
+            display_message("")
+            message()
+        else:
+            display_message(message)
+
+    def cancel_work(self):
+        if self.monitor is not None:
+            self.monitor.cancel()
+
+    def toggle_watch(self):
+        if not self.watching.get():
+            self.watcher = None
+            display_message(f"Stopped watching {ASSEMBLY_INPUT_FILE}.")
+            return
+        from mano.watch import SourceWatcher
+        self.watcher = SourceWatcher(ASSEMBLY_INPUT_FILE, MACHINE_OUTPUT_FILE, ASSEMBLY_TO_MACHINE)
+        display_message(f"Watching {ASSEMBLY_INPUT_FILE}; saved changes are reassembled into {MACHINE_OUTPUT_FILE}.")
+        self.poll_watch(self.watcher)
+
+    def poll_watch(self, watcher):
+        if watcher is not self.watcher:
+            return  # watching was switched off (or restarted) since this poll was scheduled
+        # Only the file status is checked here; a change is reassembled on a worker thread.
+        if self.monitor is None and watcher.changed():
+            self.run_in_background(lambda monitor: reassemble_watched(watcher))
+        self.after(WATCH_INTERVAL_MS, self.poll_watch, watcher)
+
+    def place_panel(self):
+        self.panel.pack(side=RIGHT, fill=Y, padx=(0, 10), pady=10, before=self.pack_slaves()[0])
+
+    def toggle_panel(self):
+        if self.showing_panel.get():
+            if self.panel.docked:
+                self.place_panel()
+            self.panel.start()
+            return
+        if not self.panel.docked:
+            self.panel.toggle_dock()
+        self.panel.pack_forget()
+        self.panel.stop()
+
     def create_menu(self):
         menubar = Menu(self)
         filemenu = Menu(menubar, tearoff=0)
         filemenu.add_command(label="Clear Files", command=initialize_files)
+        filemenu.add_command(label="Export Machine Image...", command=export_machine_image)
+        filemenu.add_command(label="Import Machine Image...", command=import_machine_image)
+        filemenu.add_command(label="Link Assembly Modules...", command=lambda: link_assembly_modules(self))
+        filemenu.add_separator()
+        self.watching = BooleanVar(value=False)
+        filemenu.add_checkbutton(label="Watch Assembly Input", variable=self.watching, command=self.toggle_watch)
         filemenu.add_separator()
         filemenu.add_command(label="Exit", command=self.quit)
         menubar.add_cascade(label="File", menu=filemenu)
+
+        self.log_level = StringVar(value=level_name(register_log.level))
+        logmenu = Menu(menubar, tearoff=0)
+        for name in LOG_LEVELS:
+            logmenu.add_radiobutton(
+                label=name.capitalize(),
+                variable=self.log_level,
+                value=name,
+                command=lambda: register_log.set_level(self.log_level.get()),
+            )
+        menubar.add_cascade(label="Log Level", menu=logmenu)
+
+        self.collect_stats = BooleanVar(value=performance["stats"])
+        self.profile = BooleanVar(value=performance["profile"])
+        perfmenu = Menu(menubar, tearoff=0)
+        perfmenu.add_checkbutton(
+            label="Collect Statistics",
+            variable=self.collect_stats,
+            command=lambda: performance.update(stats=self.collect_stats.get()),
+        )
+        perfmenu.add_checkbutton(
+            label="Profile with cProfile",
+            variable=self.profile,
+            command=lambda: performance.update(profile=self.profile.get()),
+        )
+        perfmenu.add_separator()
+        perfmenu.add_command(label="Show Statistics...", command=show_statistics)
+        menubar.add_cascade(label="Performance", menu=perfmenu)
+
+        self.showing_panel = BooleanVar(value=True)
+        viewmenu = Menu(menubar, tearoff=0)
+        viewmenu.add_checkbutton(label="Registers and Memory Panel", variable=self.showing_panel, command=self.toggle_panel)
+        menubar.add_cascade(label="View", menu=viewmenu)
         self.config(menu=menubar)
 
     def create_welcome_message(self):
@@ -290,22 +1012,43 @@ class ManoAssemblerApp(Tk):
         frame = Frame(self, bg="#2E2E2E")
         frame.pack(pady=10)
 
+        background = self.run_in_background
         buttons = [
-            ("Convert Assembly to Machine Language", convert_assembly_to_machine),
-            ("Convert Machine Language to Assembly", convert_machine_to_assembly),
-            ("View Register State", view_register_state),
-            ("Display Log File", display_log_file),
-            ("Display Assembly Input File", lambda: display_file_contents(ASSEMBLY_INPUT_FILE, "Assembly Input")),
-            ("Display Assembly Output File", lambda: display_file_contents(ASSEMBLY_OUTPUT_FILE, "Assembly Output")),
-            ("Display Machine Input File", lambda: display_file_contents(MACHINE_INPUT_FILE, "Machine Input")),
-            ("Display Machine Output File", lambda: display_file_contents(MACHINE_OUTPUT_FILE, "Machine Output")),
+            ("Convert Assembly to Machine Language", lambda: background(convert_assembly_to_machine, passes=2)),
+            ("Convert Machine Language to Assembly", lambda: background(convert_machine_to_assembly)),
+            ("View Register State", lambda: background(view_register_state)),
+            ("Display Log File", lambda: background(display_log_file)),
+            ("Display Assembly Input File", lambda: background(lambda m: display_file_contents(ASSEMBLY_INPUT_FILE, "Assembly Input", m))),
+            ("Display Assembly Output File", lambda: background(lambda m: display_file_contents(ASSEMBLY_OUTPUT_FILE, "Assembly Output", m))),
+            ("Display Machine Input File", lambda: background(lambda m: display_file_contents(MACHINE_INPUT_FILE, "Machine Input", m))),
+            ("Display Machine Output File", lambda: background(lambda m: display_file_contents(MACHINE_OUTPUT_FILE, "Machine Output", m))),
             ("Add Assembly Code", add_assembly_code),
-            ("Add Machine Code", add_machine_code)
+            ("Add Machine Code", add_machine_code),
+            ("Run Machine Program", lambda: start_machine_program(self)),
+            ("Search Register Log", lambda: TraceSearchDialog(self)),
+            ("Debug Machine Program", lambda: debug_machine_program(self)),
+            ("Profile Machine Program", lambda: start_machine_program(self, profile_machine_program)),
         ]
 
         for i, (text, command) in enumerate(buttons):
             Button(frame, text=text, command=command, font=("Helvetica", 12, "bold"), bg="#4CAF50", fg="white", width=40, height=2, relief=RAISED, bd=5).grid(row=i//2, column=i%2, padx=10, pady=10)
 
+    def create_progress_bar(self):
+        frame = Frame(self)
+        frame.pack(fill=X, padx=20)
+        self.progress = ttk.Progressbar(frame, mode="determinate", maximum=1.0)
+        self.progress.pack(side=LEFT, fill=X, expand=True, padx=10, pady=5)
+        self.cancel_button = Button(
+            frame,
+            text="Cancel",
+            command=self.cancel_work,
+            state=DISABLED,
+            font=("Helvetica", 12, "bold"),
+            bg="#E53935",
+            fg="white",
+        )
+        self.cancel_button.pack(side=LEFT, padx=10)
+
     def create_text_area(self):
         global text_area
         text_area = scrolledtext.ScrolledText(self, wrap=WORD, width=150, height=20, font=("Helvetica", 12), bg="#1E1E1E", fg="white", insertbackground="white")
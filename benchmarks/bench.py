@@ -0,0 +1,440 @@
+"""Benchmarks for the assembler, disassembler and register log.
+
+``run`` generates seeded inputs (see generate.py), times every case a few
+times and writes throughput, peak memory and per-line latency percentiles to
+a JSON file; ``compare`` prints the change between two such files::
+
+    python benchmarks/bench.py run -o results.json
+    python benchmarks/bench.py run --sizes 100 10000 10000000 -o big.json
+    python benchmarks/bench.py compare before.json after.json
+    python benchmarks/bench.py latency --clients 8
+
+``latency`` starts the assembler daemon and measures request round trips,
+sequentially and from several concurrent clients, next to cold CLI runs that
+assemble the same program in a new process.
+
+The cases drive the same code paths as the CLI and GUI conversions: the
+streaming assembler and disassembler, with register logging either off or
+at the full level, and ``RegisterLog.record`` on its own. The ``run`` cases
+execute a tight ISZ/BUN counting loop for ``size`` instructions, with the
+step-by-step interpreter, with compiled basic blocks and under the profiler,
+plus (with NumPy installed) as ``LOCKSTEP_INSTANCES`` lockstep instances;
+they have no per-line latency. ``run/io`` echoes ``size`` characters through the
+keyboard and printer devices (SKI/INP/SKO/OUT) with the asyncio device loop.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from benchmarks.generate import DEFAULT_SEED, KINDS, write_assembly, write_machine
+from mano.assembler import assemble_lines
+from mano.client import DEFAULT_PORT, DaemonClient, wait_for_daemon
+from mano.decoder import decode_lines
+from mano.devices import DeviceBus, run_with_devices
+from mano.lockstep import LockstepMachine
+from mano.machine import Machine
+from mano.pipeline import Emit, read_lines, write_stream
+from mano.profiler import Profile
+from mano.session import TRACE_REGISTERS, register_recorder
+from mano.tables import ASSEMBLY_TO_MACHINE
+from mano.trace_log import LOG_FULL, LOG_OFF, RegisterLog
+
+DEFAULT_SIZES = [100, 10_000, 1_000_000]
+DEFAULT_REPEATS = 3
+RESULTS_VERSION = 1
+LOCKSTEP_INSTANCES = 1000
+
+# Adds STEP to SUM forever; ISZ wraps CNT and skips every 65536 iterations.
+LOOP_PROGRAM = [
+    "        ORG 100",
+    "LOOP,   LDA SUM",
+    "        ADD STEP",
+    "        STA SUM",
+    "        ISZ CNT",
+    "        BUN LOOP",
+    "        CMA",
+    "        BUN LOOP",
+    "SUM,    DEC 0",
+    "STEP,   DEC 3",
+    "CNT,    DEC -1000",
+    "        END",
+]
+
+# Copies every typed character to the printer until it reads a '.'.
+ECHO_PROGRAM = [
+    "        ORG 100",
+    "WAIT,   SKI",
+    "        BUN WAIT",
+    "        CLA",
+    "        INP",
+    "READY,  SKO",
+    "        BUN READY",
+    "        OUT",
+    "        ADD DOT",
+    "        SZA",
+    "        BUN WAIT",
+    "        HLT",
+    "DOT,    DEC -46",
+    "        END",
+]
+
+
+class Case:
+    """One benchmark: ``run(on_line)`` does the work and returns the number of lines."""
+
+    def __init__(self, name: str, lines: int, run: Callable[[Optional[Callable[[], None]]], int]) -> None:
+        self.name = name
+        self.lines = lines
+        self.run = run
+
+
+def emit_callback(log: Optional[RegisterLog], on_line: Optional[Callable[[], None]]) -> Optional[Callable[[Emit], None]]:
+    """Mirror emitted words into registers and the log the way the front ends do."""
+    record = register_recorder(dict.fromkeys(TRACE_REGISTERS, 0), log) if log is not None else None
+    if on_line is None:
+        return record
+    if record is None:
+        return lambda emit: on_line()
+
+    def record_and_time(emit: Emit) -> None:
+        record(emit)
+        on_line()
+
+    return record_and_time
+
+
+def build_cases(directory: str, sizes: List[int], kinds: List[str], seed: int) -> List[Case]:
+    """Generate the inputs and return every case over them."""
+    cases = []
+    numpy_installed = importlib.util.find_spec("numpy") is not None
+    loop_image = [(emit.lineno, emit.text) for emit in assemble_lines(lambda: enumerate(LOOP_PROGRAM, 1), ASSEMBLY_TO_MACHINE)]
+    echo_image = [(emit.lineno, emit.text) for emit in assemble_lines(lambda: enumerate(ECHO_PROGRAM, 1), ASSEMBLY_TO_MACHINE)]
+    output = os.path.join(directory, "output.txt")
+    log_path = os.path.join(directory, "register_log.txt")
+    for size in sizes:
+        for kind in kinds:
+            source = os.path.join(directory, f"{kind}-{size}.asm")
+            image = os.path.join(directory, f"{kind}-{size}.txt")
+            write_assembly(source, kind, size, seed)
+            write_machine(image, kind, size, seed)
+            for level in (LOG_OFF, LOG_FULL):
+                suffix = "log-full" if level == LOG_FULL else "log-off"
+
+                def assemble(on_line, source=source, level=level) -> int:
+                    log = RegisterLog(log_path, level) if level != LOG_OFF else None
+                    if log is not None:
+                        log.reset()
+                    records = assemble_lines(lambda: read_lines(source), ASSEMBLY_TO_MACHINE)
+                    result = write_stream(output, records, emit_callback(log, on_line))
+                    if log is not None:
+                        log.close()
+                    if not result.ok:
+                        raise RuntimeError(f"{source}: {result.error_report()}")
+                    return result.lines
+
+                def disassemble(on_line, image=image, level=level) -> int:
+                    log = RegisterLog(log_path, level) if level != LOG_OFF else None
+                    if log is not None:
+                        log.reset()
+                    records = decode_lines(read_lines(image), ASSEMBLY_TO_MACHINE)
+                    result = write_stream(output, records, emit_callback(log, on_line))
+                    if log is not None:
+                        log.close()
+                    if not result.ok:
+                        raise RuntimeError(f"{image}: {result.error_report()}")
+                    return result.lines
+
+                cases.append(Case(f"assemble/{kind}/{size}/{suffix}", size, assemble))
+                cases.append(Case(f"disassemble/{kind}/{size}/{suffix}", size, disassemble))
+
+        def log_events(on_line, size=size) -> int:
+            log = RegisterLog(log_path, LOG_FULL)
+            log.reset()
+            registers = {"AR": 0, "PC": 0, "DR": 0, "AC": 0, "IR": 0}
+            record = log.record
+            for step in range(size):
+                registers["PC"] = step & 0xFFF
+                record(LOG_FULL, "UPDATE", "PC", registers["PC"], registers)
+                if on_line is not None:
+                    on_line()
+            log.close()
+            return size
+
+        cases.append(Case(f"log/record/{size}", size, log_events))
+
+        for engine in ("run", "run_blocks"):
+
+            def execute(on_line, size=size, engine=engine) -> int:
+                machine = Machine()
+                machine.load_lines(loop_image)
+                executed = getattr(machine, engine)(size)
+                if executed != size:
+                    raise RuntimeError(f"Loop program stopped after {executed} of {size} steps")
+                return size
+
+            cases.append(Case(f"run/{'blocks' if engine == 'run_blocks' else 'interpret'}/{size}", size, execute))
+
+        def execute_profiled(on_line, size=size) -> int:
+            machine = Machine()
+            machine.load_lines(loop_image)
+            executed = Profile().run(machine, size)
+            if executed != size:
+                raise RuntimeError(f"Loop program stopped after {executed} of {size} steps")
+            return size
+
+        cases.append(Case(f"run/profile/{size}", size, execute_profiled))
+
+        def echo(on_line, size=size) -> int:
+            machine = Machine()
+            machine.load_lines(echo_image)
+            bus = DeviceBus(b"x" * (size - 1) + b".")
+            asyncio.run(run_with_devices(machine, bus=bus, max_steps=size * 16))
+            if not machine.halted or len(bus.output) != size:
+                raise RuntimeError(f"Echo program printed {len(bus.output)} of {size} characters")
+            return size
+
+        cases.append(Case(f"run/io/{size}", size, echo))
+
+        if numpy_installed and size >= LOCKSTEP_INSTANCES:
+
+            def execute_lockstep(on_line, size=size) -> int:
+                machine = Machine()
+                machine.load_lines(loop_image)
+                instances = LockstepMachine.from_machine(machine, LOCKSTEP_INSTANCES)
+                return instances.run(size // LOCKSTEP_INSTANCES) * LOCKSTEP_INSTANCES
+
+            cases.append(Case(f"run/lockstep/{size}", size // LOCKSTEP_INSTANCES * LOCKSTEP_INSTANCES, execute_lockstep))
+    return cases
+
+
+def percentile(sorted_values: array, fraction: float) -> int:
+    if not sorted_values:
+        return 0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def measure(case: Case, repeats: int, memory: bool) -> Dict[str, object]:
+    """Time ``case`` ``repeats`` times, then once more for memory and latency."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        case.run(None)
+        timings.append(time.perf_counter() - start)
+
+    stamps = array("Q")
+    clock = time.perf_counter_ns
+    if memory:
+        tracemalloc.start()
+    stamps.append(clock())
+    case.run(lambda: stamps.append(clock()))
+    peak = tracemalloc.get_traced_memory()[1] if memory else None
+    if memory:
+        tracemalloc.stop()
+    deltas = array("Q", sorted(b - a for a, b in zip(stamps, stamps[1:])))
+
+    best = min(timings)
+    return {
+        "name": case.name,
+        "lines": case.lines,
+        "seconds": timings,
+        "best_seconds": best,
+        "median_seconds": statistics.median(timings),
+        "lines_per_second": case.lines / best if best else None,
+        "peak_bytes": peak,
+        "latency_ns": {
+            "p50": percentile(deltas, 0.50),
+            "p99": percentile(deltas, 0.99),
+            "max": deltas[-1] if deltas else 0,
+        },
+    }
+
+
+def run(args: argparse.Namespace) -> int:
+    with tempfile.TemporaryDirectory(prefix="mano-bench-") as directory:
+        cases = build_cases(directory, args.sizes, args.kinds, args.seed)
+        if args.filter:
+            cases = [case for case in cases if args.filter in case.name]
+        results = []
+        for case in cases:
+            result = measure(case, args.repeats, not args.no_memory)
+            results.append(result)
+            print(
+                f"{case.name:<40} {result['lines_per_second']:>14,.0f} lines/s"
+                f"  p99 {result['latency_ns']['p99'] / 1000:>8.1f} us"
+                + (f"  peak {result['peak_bytes'] / 1e6:>8.1f} MB" if result["peak_bytes"] is not None else "")
+            )
+    document = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "repeats": args.repeats,
+        "results": results,
+    }
+    with open(args.output, "w") as file:
+        json.dump(document, file, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+def compare(args: argparse.Namespace) -> int:
+    """Print the throughput change of every case found in both files."""
+    with open(args.before) as file:
+        before = {result["name"]: result for result in json.load(file)["results"]}
+    with open(args.after) as file:
+        after = {result["name"]: result for result in json.load(file)["results"]}
+    regressions = 0
+    print(f"{'case':<40} {'before':>14} {'after':>14} {'change':>8}")
+    for name, new in after.items():
+        old = before.get(name)
+        if old is None or not old["lines_per_second"] or not new["lines_per_second"]:
+            continue
+        change = (new["lines_per_second"] / old["lines_per_second"] - 1) * 100
+        flag = ""
+        if change < -args.threshold:
+            regressions += 1
+            flag = "  SLOWER"
+        elif change > args.threshold:
+            flag = "  faster"
+        print(f"{name:<40} {old['lines_per_second']:>14,.0f} {new['lines_per_second']:>14,.0f} {change:>+7.1f}%{flag}")
+    missing = sorted(set(before) ^ set(after))
+    if missing:
+        print(f"Only in one file: {', '.join(missing)}")
+    return 1 if regressions else 0
+
+
+def latency_summary(name: str, deltas: List[int], seconds: float) -> Dict[str, object]:
+    deltas = array("Q", sorted(deltas))
+    return {
+        "name": name,
+        "requests": len(deltas),
+        "requests_per_second": len(deltas) / seconds if seconds else None,
+        "latency_ns": {
+            "p50": percentile(deltas, 0.50),
+            "p99": percentile(deltas, 0.99),
+            "max": deltas[-1] if deltas else 0,
+        },
+    }
+
+
+def daemon_latency(address: str, source: str, requests: int, clients: int) -> Dict[str, object]:
+    """Send ``requests`` assemble requests spread over ``clients`` connections."""
+    deltas: List[int] = []
+    errors: List[Exception] = []
+    clock = time.perf_counter_ns
+
+    def client_loop(count: int) -> None:
+        try:
+            with DaemonClient(address) as client:
+                for _ in range(count):
+                    start = clock()
+                    response = client.assemble(source)
+                    deltas.append(clock() - start)
+                    if not response["ok"]:
+                        raise RuntimeError("; ".join(response["errors"]))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=client_loop, args=(requests // clients + (index < requests % clients),))
+        for index in range(clients)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return latency_summary(f"daemon/{clients}-clients", deltas, time.perf_counter() - started)
+
+
+def latency(args: argparse.Namespace) -> int:
+    cli = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "CLI", "main.py")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="mano-bench-") as directory:
+        source_path = os.path.join(directory, "program.asm")
+        write_assembly(source_path, "mixed", args.lines, args.seed)
+        with open(source_path) as file:
+            source = file.read()
+        address = os.path.join(directory, "daemon.sock") if hasattr(socket, "AF_UNIX") else f"127.0.0.1:{DEFAULT_PORT}"
+        daemon = subprocess.Popen([sys.executable, cli, "serve", "--address", address], stdout=subprocess.DEVNULL)
+        try:
+            wait_for_daemon(address)
+            for clients in sorted({1, args.clients}):
+                results.append(daemon_latency(address, source, args.requests, clients))
+            with DaemonClient(address) as client:
+                client.shutdown()
+            daemon.wait(timeout=10)
+        finally:
+            if daemon.poll() is None:
+                daemon.kill()
+
+        deltas = []
+        started = time.perf_counter()
+        for _ in range(args.cold):
+            start = time.perf_counter_ns()
+            subprocess.run(
+                [sys.executable, cli, "assemble", source_path, "-o", directory, "--no-cache"],
+                check=True, stdout=subprocess.DEVNULL,
+            )
+            deltas.append(time.perf_counter_ns() - start)
+        results.append(latency_summary("cold-cli", deltas, time.perf_counter() - started))
+
+    for result in results:
+        latencies = result["latency_ns"]
+        print(
+            f"{result['name']:<20} {result['requests_per_second']:>10,.0f} requests/s"
+            f"  p50 {latencies['p50'] / 1e6:>8.2f} ms  p99 {latencies['p99'] / 1e6:>8.2f} ms"
+        )
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"version": RESULTS_VERSION, "lines": args.lines, "results": results}, file, indent=2)
+    return 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Mano assembler benchmarks.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run", help="run the benchmarks and save the results")
+    run_parser.add_argument("-o", "--output", default="bench_results.json", help="results file (default: bench_results.json)")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="program sizes in lines")
+    run_parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS), help="program kinds")
+    run_parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="generator seed")
+    run_parser.add_argument("--repeats", type=int, default=DEFAULT_REPEATS, help="timed runs per case")
+    run_parser.add_argument("--filter", help="only run cases whose name contains this text")
+    run_parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peak memory measurement")
+    compare_parser = subparsers.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=5.0, help="percent change to flag (default: 5)")
+    latency_parser = subparsers.add_parser("latency", help="time daemon requests against cold CLI runs")
+    latency_parser.add_argument("--lines", type=int, default=100, help="lines of the assembled program (default: 100)")
+    latency_parser.add_argument("--requests", type=int, default=2000, help="daemon requests per client setting")
+    latency_parser.add_argument("--clients", type=int, default=4, help="concurrent clients for the second run")
+    latency_parser.add_argument("--cold", type=int, default=20, help="cold CLI runs (default: 20)")
+    latency_parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="generator seed")
+    latency_parser.add_argument("-o", "--output", help="also save the results as JSON")
+    args = parser.parse_args(argv)
+    if args.command == "latency":
+        return latency(args)
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Seeded generator of valid Mano programs and machine images for benchmarks.
+
+The same kind, size and seed always produce the same file. Programs longer
+than memory are split into 4000-word segments that each start with ``ORG``,
+so every size from a hundred to millions of lines assembles without errors.
+
+Usage::
+
+    python benchmarks/generate.py assembly mixed 100000 program.asm --seed 7
+    python benchmarks/generate.py machine register 100000 image.txt
+"""
+import argparse
+import os
+import random
+import sys
+from typing import Iterator, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from mano.assembler import MEMORY_SIZE
+
+MEMORY_REFERENCE = ["AND", "ADD", "LDA", "STA", "BUN", "BSA", "ISZ"]
+MEMORY_OPCODES = {"AND": 0, "ADD": 1, "LDA": 2, "STA": 3, "BUN": 4, "BSA": 5, "ISZ": 6}
+REGISTER_REFERENCE = {
+    "CLA": 0x7800, "CLE": 0x7400, "CMA": 0x7200, "CME": 0x7100, "CIR": 0x7080, "CIL": 0x7040,
+    "INC": 0x7020, "SPA": 0x7010, "SNA": 0x7008, "SZA": 0x7004, "SZE": 0x7002, "HLT": 0x7001,
+}
+KINDS = ("memory", "register", "mixed")
+SEGMENT_WORDS = 4000
+DEFAULT_SEED = 1
+
+
+def _check(kind: str, lines: int) -> None:
+    if kind not in KINDS:
+        raise ValueError(f"Unknown program kind {kind!r} (expected one of {', '.join(KINDS)})")
+    if lines < 1:
+        raise ValueError("A program needs at least one line")
+
+
+def assembly_lines(kind: str, lines: int, seed: int = DEFAULT_SEED) -> Iterator[str]:
+    """Yield ``lines`` lines of valid assembly of the given kind."""
+    _check(kind, lines)
+    rng = random.Random(seed)
+    register_names = list(REGISTER_REFERENCE)
+    segment_labels: List[str] = []
+    label_count = 0
+    written = 0
+    while written < lines:
+        if written % SEGMENT_WORDS == 0:
+            yield f"        ORG {rng.randrange(0, MEMORY_SIZE - SEGMENT_WORDS):03X}\n"
+            written += 1
+            segment_labels = []
+            continue
+        use_memory = kind == "memory" or (kind == "mixed" and rng.random() < 0.6)
+        label = ""
+        if kind != "register" and rng.random() < 0.05:
+            label_count += 1
+            label = f"L{label_count}"
+            segment_labels.append(label)
+        prefix = f"{label + ',':<8}" if label else " " * 8
+        if kind == "mixed" and rng.random() < 0.1:
+            if rng.random() < 0.5:
+                text = f"DEC {rng.randrange(-32768, 32768)}"
+            else:
+                text = f"HEX {rng.randrange(0x10000):X}"
+        elif use_memory:
+            mnemonic = rng.choice(MEMORY_REFERENCE)
+            if segment_labels and rng.random() < 0.5:
+                operand = rng.choice(segment_labels)
+            else:
+                operand = f"{rng.randrange(MEMORY_SIZE):03X}"
+            text = f"{mnemonic} {operand}" + (" I" if rng.random() < 0.25 else "")
+        else:
+            text = rng.choice(register_names)
+        if kind == "mixed" and rng.random() < 0.05:
+            text += "   / generated"
+        yield prefix + text + "\n"
+        written += 1
+
+
+def machine_words(kind: str, count: int, seed: int = DEFAULT_SEED) -> Iterator[int]:
+    """Yield ``count`` machine words of the given kind."""
+    _check(kind, count)
+    rng = random.Random(seed)
+    register_words = list(REGISTER_REFERENCE.values())
+    for _ in range(count):
+        if kind == "register" or (kind == "mixed" and rng.random() < 0.4):
+            yield rng.choice(register_words)
+        elif kind == "mixed" and rng.random() < 0.1:
+            yield rng.randrange(0x10000)
+        else:
+            word = rng.randrange(7) << 12 | rng.randrange(MEMORY_SIZE)
+            yield word | 0x8000 if rng.random() < 0.25 else word
+
+
+def machine_lines(kind: str, lines: int, seed: int = DEFAULT_SEED) -> Iterator[str]:
+    """Yield a text machine image of ``lines`` lines with ``@addr`` markers per segment."""
+    words = machine_words(kind, lines, seed)
+    for index in range(lines):
+        if index % SEGMENT_WORDS == 0:
+            yield f"@{(index // SEGMENT_WORDS * 0x100) % (MEMORY_SIZE - SEGMENT_WORDS):03X}\n"
+        else:
+            yield f"{next(words):04X}\n"
+
+
+def write_assembly(file_path: str, kind: str, lines: int, seed: int = DEFAULT_SEED) -> None:
+    with open(file_path, "w") as file:
+        file.writelines(assembly_lines(kind, lines, seed))
+
+
+def write_machine(file_path: str, kind: str, lines: int, seed: int = DEFAULT_SEED) -> None:
+    with open(file_path, "w") as file:
+        file.writelines(machine_lines(kind, lines, seed))
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a reproducible Mano program or machine image.")
+    parser.add_argument("format", choices=["assembly", "machine"])
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("lines", type=int)
+    parser.add_argument("output")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+    write = write_assembly if args.format == "assembly" else write_machine
+    write(args.output, args.kind, args.lines, args.seed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
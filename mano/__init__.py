@@ -0,0 +1,43 @@
+"""Shared building blocks for the Mano CLI and GUI assemblers.
+
+The common entry points can be imported from the package itself; their
+modules are only loaded on first use, so ``import mano`` stays cheap::
+
+    from mano import Session
+    session = Session()
+    result = session.assemble("program.asm", "program.txt")
+"""
+import importlib
+
+_EXPORTS = {
+    "ASSEMBLY_TO_MACHINE": "mano.tables",
+    "MACHINE_TO_ASSEMBLY": "mano.tables",
+    "Assembler": "mano.assembler",
+    "assemble_lines": "mano.assembler",
+    "BuildCache": "mano.cache",
+    "assemble_file": "mano.cache",
+    "decode_lines": "mano.decoder",
+    "disassemble_file": "mano.decoder",
+    "disassemble_image": "mano.decoder",
+    "LockstepMachine": "mano.lockstep",
+    "Machine": "mano.machine",
+    "MachineError": "mano.machine",
+    "RegisterLog": "mano.trace_log",
+    "Session": "mano.session",
+    "register_recorder": "mano.session",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module 'mano' has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
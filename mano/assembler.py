@@ -0,0 +1,207 @@
+"""Two-pass assembler for the Mano Basic Computer.
+
+The first pass walks the source with a location counter and records every
+label in a dict-backed symbol table; the second pass encodes instructions and
+resolves operands, including forward references, against that table. Both
+passes stream the source, so only the symbol table grows with program size.
+
+Source syntax follows Mano's textbook listings::
+
+    LOP,    LDA PTR I   / comment
+            ORG 100
+    PTR,    HEX 1F
+    NUM,    DEC -23
+            END
+"""
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from mano.pipeline import Emit, LineError, Record
+
+if TYPE_CHECKING:
+    from mano.stats import Stats
+
+
+MEMORY_SIZE = 4096
+ADDRESS_MASK = 0x0FFF
+WORD_MASK = 0xFFFF
+INDIRECT_BIT = 0x8000
+
+PSEUDO_OPS = ("ORG", "END", "DEC", "HEX")
+COMMENT_CHAR = "/"
+
+
+class SourceLine(NamedTuple):
+    """The fields of one assembly statement."""
+    label: Optional[str]
+    mnemonic: Optional[str]
+    operand: Optional[str]
+    indirect: bool
+
+
+def is_symbol(name: str) -> bool:
+    """Return True if ``name`` can be used as a label."""
+    return bool(name) and name[0].isalpha() and name.isalnum()
+
+
+def parse_line(text: str) -> SourceLine:
+    """Split one source line into label, mnemonic, operand and I flag."""
+    code = text.split(COMMENT_CHAR, 1)[0].strip().upper()
+    label = None
+    if "," in code:
+        label, code = code.split(",", 1)
+        label = label.strip()
+        if not is_symbol(label):
+            raise ValueError(f"Invalid label {label}")
+        code = code.strip()
+    parts = code.split()
+    if not parts:
+        return SourceLine(label, None, None, False)
+    mnemonic = parts[0]
+    indirect = len(parts) == 3 and parts[2] == "I"
+    if len(parts) > 3 or (len(parts) == 3 and not indirect):
+        raise ValueError(f"Unexpected text after {mnemonic}: {' '.join(parts[2:])}")
+    operand = parts[1] if len(parts) > 1 else None
+    return SourceLine(label, mnemonic, operand, indirect)
+
+
+def parse_number(text: str, base: int, low: int, high: int) -> int:
+    """Parse ``text`` in ``base`` and check that it lies in [low, high]."""
+    try:
+        value = int(text, base)
+    except ValueError:
+        value = low - 1
+    if not low <= value <= high:
+        raise ValueError(f"Invalid {'hexadecimal' if base == 16 else 'decimal'} value {text}")
+    return value
+
+
+class Assembler:
+    """Symbol table and location counter shared by both passes."""
+
+    def __init__(self, assembly_to_machine: Dict[str, str]) -> None:
+        self.assembly_to_machine = assembly_to_machine
+        self.symbols: Dict[str, int] = {}
+
+    def first_pass(self, lines: Iterable[Tuple[int, str]]) -> Iterator[LineError]:
+        """Assign an address to every label; yield label and ORG errors."""
+        symbols = self.symbols
+        location = 0
+        for lineno, text in lines:
+            try:
+                line = parse_line(text)
+            except ValueError as e:
+                yield LineError(lineno, str(e))
+                continue
+            error = None
+            if line.label is not None:
+                if line.label in symbols:
+                    error = f"Duplicate label {line.label}"  # the statement still takes its place
+                else:
+                    symbols[line.label] = location
+            if line.mnemonic == "END":
+                if error:
+                    yield LineError(lineno, error)
+                return
+            try:
+                if line.mnemonic == "ORG":
+                    location = parse_number(line.operand or "", 16, 0, ADDRESS_MASK)
+                elif line.mnemonic is not None:
+                    if location >= MEMORY_SIZE:
+                        raise ValueError(f"Program does not fit in {MEMORY_SIZE} words")
+                    location += 1
+            except ValueError as e:
+                error = error or str(e)
+            if error:
+                yield LineError(lineno, error)
+
+    def second_pass(self, lines: Iterable[Tuple[int, str]]) -> Iterator[Record]:
+        """Encode every statement; yield words, ORG markers and errors."""
+        location = 0
+        for lineno, text in lines:
+            try:
+                line = parse_line(text)
+            except ValueError:
+                continue  # already reported by the first pass
+            mnemonic = line.mnemonic
+            if mnemonic is None:
+                continue
+            if mnemonic == "END":
+                return
+            if mnemonic == "ORG":
+                try:
+                    location = parse_number(line.operand or "", 16, 0, ADDRESS_MASK)
+                except ValueError:
+                    continue
+                yield Emit(lineno, f"@{location:03X}")
+                continue
+            if location >= MEMORY_SIZE:
+                continue
+            try:
+                yield self.encode(lineno, line, location)
+            except ValueError as e:
+                yield LineError(lineno, str(e))
+            location += 1
+
+    def encode(self, lineno: int, line: SourceLine, location: int) -> Emit:
+        """Encode one instruction or data statement stored at ``location``."""
+        mnemonic, operand = line.mnemonic, line.operand
+        if mnemonic in ("DEC", "HEX"):
+            if operand is None or line.indirect:
+                raise ValueError(f"{mnemonic} needs exactly one value")
+            if mnemonic == "DEC":
+                word = parse_number(operand, 10, -0x8000, WORD_MASK) & WORD_MASK
+            else:
+                word = parse_number(operand, 16, 0, WORD_MASK)
+            return Emit(lineno, f"{word:04X}", address=location)
+
+        opcode = self.assembly_to_machine.get(mnemonic)
+        if opcode is None:
+            raise ValueError(f"Invalid instruction {mnemonic}")
+        if len(opcode) == 4:
+            if operand is not None:
+                raise ValueError(f"{mnemonic} does not take an operand")
+            word = int(opcode, 16)
+            return Emit(lineno, opcode, word, address=location)
+
+        if operand is None:
+            raise ValueError(f"{mnemonic} needs an address operand")
+        address = self.resolve(operand)
+        word = (int(opcode, 16) & 7) << 12 | address
+        if line.indirect:
+            word |= INDIRECT_BIT
+        return Emit(lineno, f"{word:04X}", word, address, location)
+
+    def resolve(self, operand: str) -> int:
+        """Return the address of a symbol or hexadecimal operand."""
+        address = self.symbols.get(operand)
+        if address is not None:
+            return address
+        try:
+            return parse_number(operand, 16, 0, ADDRESS_MASK)
+        except ValueError:
+            raise ValueError(f"Undefined symbol or invalid address {operand}") from None
+
+
+def assemble_lines(
+    open_lines: Callable[[], Iterable[Tuple[int, str]]],
+    assembly_to_machine: Dict[str, str],
+    assembler: Optional[Assembler] = None,
+    stats: Optional["Stats"] = None,
+) -> Iterator[Record]:
+    """Run both passes, calling ``open_lines`` once per pass for a fresh stream.
+
+    With ``stats``, reading, both passes and instruction encoding are timed as
+    separate stages.
+    """
+    if assembler is None:
+        assembler = Assembler(assembly_to_machine)
+    if stats is None:
+        yield from assembler.first_pass(open_lines())
+        yield from assembler.second_pass(open_lines())
+        return
+    assembler.encode = stats.timed_call("encode", assembler.encode)
+    try:
+        yield from stats.timed("first pass", assembler.first_pass(stats.timed("read", open_lines())))
+        yield from stats.timed("second pass", assembler.second_pass(stats.timed("read", open_lines())))
+    finally:
+        del assembler.encode
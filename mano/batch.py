@@ -0,0 +1,205 @@
+"""Assemble or disassemble many files at once across worker processes.
+
+Each file is handled by a self-contained task with its own register state and
+(optional) register log, so tasks can run in any process in any order.
+"""
+import glob
+import os
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from mano.cache import BuildCache, assemble_file
+from mano.decoder import disassemble_image
+from mano.image import ImageError, convert_image, image_format
+from mano.session import TRACE_REGISTERS, register_recorder
+from mano.stats import Stats
+from mano.trace_log import LOG_OFF, RegisterLog
+
+
+ASSEMBLE = "assemble"
+DISASSEMBLE = "disassemble"
+DEFAULT_CHUNK_SIZE = 8
+MAX_ERRORS_PER_FILE = 20
+
+OUTPUT_EXTENSIONS = {
+    ASSEMBLE: ".txt",
+    DISASSEMBLE: ".asm",
+}
+
+
+class BatchTask(NamedTuple):
+    """One file to translate."""
+    kind: str
+    source: str
+    target: str
+    assembly_to_machine: Dict[str, str]
+    log_level: int = LOG_OFF
+    use_cache: bool = False
+    cache_dir: Optional[str] = None
+    stats: bool = False
+    profile: bool = False
+
+
+class FileResult(NamedTuple):
+    """What happened to one file."""
+    source: str
+    target: str
+    ok: bool
+    lines: int
+    errors: List[str]
+    seconds: float
+    cached: bool = False
+    stats: Optional[dict] = None
+
+
+class BatchSummary:
+    """Totals over every file of a batch run."""
+
+    def __init__(self, results: List[FileResult], seconds: float) -> None:
+        self.results = results
+        self.seconds = seconds
+        self.files = len(results)
+        self.failed = sum(1 for result in results if not result.ok)
+        self.lines = sum(result.lines for result in results)
+        self.cached = sum(1 for result in results if result.cached)
+        self.stats: Optional[Stats] = None
+        for result in results:
+            if result.stats is not None:
+                if self.stats is None:
+                    self.stats = Stats()
+                self.stats.merge(result.stats)
+
+    def report(self) -> str:
+        """Return the throughput summary as text."""
+        seconds = max(self.seconds, 1e-9)
+        return (
+            f"{self.files} files ({self.failed} failed, {self.cached} cached), {self.lines} lines in {self.seconds:.3f} s: "
+            f"{self.files / seconds:.1f} files/s, {self.lines / seconds:.0f} lines/s"
+        )
+
+
+_worker_caches: Dict[Optional[str], BuildCache] = {}
+
+
+def _worker_cache(cache_dir: Optional[str]) -> BuildCache:
+    """Return this process's cache for ``cache_dir``, creating it once."""
+    cache = _worker_caches.get(cache_dir)
+    if cache is None:
+        cache = _worker_caches[cache_dir] = BuildCache(cache_dir)
+    return cache
+
+
+def expand_patterns(patterns: Iterable[str]) -> List[str]:
+    """Expand glob patterns (``**`` allowed) into a sorted list of files."""
+    files = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        if not matches and os.path.isfile(pattern):
+            matches = [pattern]
+        files.update(path for path in matches if os.path.isfile(path))
+    return sorted(files)
+
+
+def plan_tasks(
+    kind: str,
+    sources: Sequence[str],
+    output_dir: Optional[str],
+    assembly_to_machine: Dict[str, str],
+    log_level: int = LOG_OFF,
+    extension: Optional[str] = None,
+    use_cache: bool = False,
+    cache_dir: Optional[str] = None,
+    stats: bool = False,
+    profile: bool = False,
+) -> List[BatchTask]:
+    """Pair every source with its output path."""
+    extension = extension or OUTPUT_EXTENSIONS[kind]
+    tasks = []
+    targets = set()
+    for source in sources:
+        stem = os.path.splitext(os.path.basename(source))[0]
+        directory = output_dir if output_dir is not None else os.path.dirname(source)
+        target = os.path.join(directory, stem + extension)
+        if target in targets or os.path.abspath(target) == os.path.abspath(source):
+            raise ValueError(f"Output file {target} would be written twice or overwrite its input")
+        targets.add(target)
+        tasks.append(BatchTask(
+            kind, source, target, assembly_to_machine, log_level, use_cache, cache_dir, stats or profile, profile
+        ))
+    return tasks
+
+
+def run_task(task: BatchTask) -> FileResult:
+    """Translate one file with fresh register and log state."""
+    start = time.perf_counter()
+    cached = False
+    log = RegisterLog(task.target + ".log", task.log_level) if task.log_level != LOG_OFF else None
+    stats = Stats(task.profile) if task.stats else None
+    if stats is not None:
+        stats.start()
+    record = register_recorder(dict.fromkeys(TRACE_REGISTERS, 0), log) if log is not None else None
+
+    try:
+        if log is not None:
+            log.reset()
+        if task.kind == ASSEMBLE:
+            text_target = task.target if image_format(task.target) == "text" else task.target + ".tmp.txt"
+            cache = _worker_cache(task.cache_dir) if task.use_cache else None
+            hits = cache.hits if cache is not None else 0
+            result = assemble_file(
+                task.source, text_target, task.assembly_to_machine, cache, record, MAX_ERRORS_PER_FILE,
+                stats=stats,
+            )
+            cached = cache is not None and cache.hits > hits
+            lines, errors = result.lines, [str(error) for error in result.errors]
+            if result.error_count > len(errors):
+                errors.append(f"... and {result.error_count - len(errors)} more errors")
+            if not result.lines:
+                errors.append("File is empty")
+            if text_target != task.target:
+                try:
+                    if result.ok and result.lines:
+                        if stats is not None:
+                            with stats.stage("image conversion"):
+                                convert_image(text_target, task.target)
+                        else:
+                            convert_image(text_target, task.target)
+                finally:
+                    if os.path.exists(text_target):
+                        os.remove(text_target)
+        else:
+            if stats is not None:
+                with stats.stage("disassemble"):
+                    lines = disassemble_image(task.source, task.target, task.assembly_to_machine)
+                stats.count("lines", lines)
+            else:
+                lines = disassemble_image(task.source, task.target, task.assembly_to_machine)
+            errors = []
+    except (OSError, ValueError, ImageError) as e:
+        lines, errors = 0, [str(e)]
+        if stats is not None:
+            stats.count("failed files")
+    finally:
+        if log is not None:
+            log.close()
+    if stats is not None:
+        stats.stop()
+        if log is not None:
+            stats.count("log bytes", log.bytes_written)
+    return FileResult(
+        task.source, task.target, not errors, lines, errors, time.perf_counter() - start, cached,
+        stats.to_dict() if stats is not None else None,
+    )
+
+
+def run_batch(tasks: Sequence[BatchTask], jobs: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> BatchSummary:
+    """Run ``tasks`` in a process pool (or inline for one job) and summarize."""
+    start = time.perf_counter()
+    if jobs == 1 or len(tasks) <= 1:
+        results = [run_task(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # deferred: it pulls in multiprocessing
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(run_task, tasks, chunksize=max(1, chunk_size)))
+    return BatchSummary(results, time.perf_counter() - start)
@@ -0,0 +1,263 @@
+"""Basic-block translation of Mano programs into Python closures.
+
+``BlockCache.run`` executes a ``Machine`` one basic block at a time instead of
+one instruction at a time. A block starts at the address the PC points to and
+runs straight on until an instruction that may change the flow of control
+(BUN, BSA, ISZ, a register-reference skip or HLT), for at most
+``MAX_BLOCK_LENGTH`` instructions. Its words are translated into the source of
+one Python function that keeps AC, E and DR in locals, uses constant addresses
+and returns the next PC; the compiled function is cached by start address.
+
+Input-output instructions are blocks of their own that call the
+interpreter's handler. While IEN is set, ``run`` executes one instruction at a
+time so the interrupt cycle starts on the same step as in ``Machine.run``.
+
+Every store (STA, BSA, ISZ) checks a per-address counter of the blocks
+covering the target word and drops those blocks, so self-modifying code is
+recompiled before it runs again. A block that would overwrite its own later
+words ends right after that store.
+"""
+from typing import Callable, Dict, List, Tuple
+
+from mano.machine import (
+    ADDRESS_MASK, DEFAULT_STEP_LIMIT, HALT_BIT, MEMORY_SIZE, SIGN_BIT, WORD_MASK, Machine, MachineError,
+    decode_table, is_input_output,
+)
+
+
+MAX_BLOCK_LENGTH = 64
+SINGLE = MEMORY_SIZE  # cache key offset of one-instruction blocks, used near the step limit
+
+STA, BUN, BSA, ISZ = 3, 4, 5, 6
+
+# Register-reference micro-operations by bit, in execution order (see mano.machine).
+REGISTER_CODE = (
+    (0x800, "ac = 0"),
+    (0x400, "e = 0"),
+    (0x200, "ac ^= 0xFFFF"),
+    (0x100, "e ^= 1"),
+    (0x080, "ac, e = (ac >> 1) | (e << 15), ac & 1"),
+    (0x040, "ac, e = ((ac << 1) & 0xFFFF) | e, ac >> 15"),
+    (0x020, "ac = (ac + 1) & 0xFFFF"),
+)
+SKIP_CODE = (
+    (0x010, f"not ac & {SIGN_BIT:#x}"),
+    (0x008, f"ac & {SIGN_BIT:#x}"),
+    (0x004, "not ac"),
+    (0x002, "not e"),
+)
+SKIP_BITS = 0x01E
+READS_E = 0x1C2  # CME, CIR, CIL and SZE read E
+WRITES_E = 0x5C0  # CLE, CME, CIR and CIL write E
+
+Block = Tuple[Callable[[Machine], int], int]
+
+
+def _alone(word: int) -> bool:
+    """Return True for input-output and unsupported words, which form blocks of their own."""
+    return word >> 12 == 0xF
+
+
+def _ends_block(word: int) -> bool:
+    """Return True for instructions after which the next PC is not simply PC + 1."""
+    opcode = (word >> 12) & 7
+    if opcode == 7:
+        return bool(word & (SKIP_BITS | HALT_BIT)) or _alone(word)
+    return opcode in (BUN, BSA, ISZ) or (opcode == STA and bool(word & 0x8000))
+
+
+def block_extent(memory, start: int, max_length: int = MAX_BLOCK_LENGTH) -> int:
+    """Return how many instructions from ``start`` form one block."""
+    length = 0
+    address = start
+    while length < max_length:
+        word = memory[address]
+        if _alone(word) and length:
+            break
+        length += 1
+        if _ends_block(word) or address == ADDRESS_MASK:
+            break
+        address += 1
+    # A direct STA into the block itself ends it, so no stale word runs afterwards.
+    for offset in range(length):
+        word = memory[start + offset]
+        if (word >> 12) == STA and start <= (word & ADDRESS_MASK) < start + length:
+            return offset + 1
+    return length
+
+
+def block_source(memory, start: int, length: int) -> str:
+    """Return the source of a factory that builds the function for one block."""
+    body: List[str] = []
+    uses_e = writes_e = writes_dr = False
+    ar = ir = indirect = 0
+    ar_text = "0"
+    result = f"{(start + length) & ADDRESS_MASK:#05x}"
+    for offset in range(length):
+        address = start + offset
+        word = ir = memory[address]
+        opcode = (word >> 12) & 7
+        indirect = word >> 15
+        ar = word & ADDRESS_MASK
+        next_pc = (address + 1) & ADDRESS_MASK
+        body.append(f"# {address:03X}: {word:04X}")
+        if opcode == 7 and indirect:
+            body.append(f"m.IR = {word:#06x}")
+            body.append("m.I = 0")
+            body.append(f"m.AR = {ar:#05x}")
+            body.append(f"m.PC = {next_pc:#05x}")
+            if is_input_output(word):
+                body.append(f"decode[{word:#06x}][0](m, {ar:#05x})")
+                body.append("return m.PC")
+            else:
+                body.append(f"raise MachineError('Unsupported instruction {word:04X} at address {address:03X}')")
+            return _factory(start, body)
+        if opcode == 7:
+            indirect = 0
+            ar_text = f"{ar:#05x}"
+            uses_e |= bool(word & READS_E)
+            writes_e |= bool(word & WRITES_E)
+            body.extend(code for bit, code in REGISTER_CODE if word & bit)
+            if word & HALT_BIT:
+                body.append("m.S = 0")
+            skips = [f"({code})" for bit, code in SKIP_CODE if word & bit]
+            if skips:
+                result = f"{(next_pc + 1) & ADDRESS_MASK:#05x} if {' or '.join(skips)} else {next_pc:#05x}"
+            continue
+        if indirect:
+            body.append(f"ar = mem[{ar:#05x}] & {ADDRESS_MASK:#x}")
+            target = ar_text = "ar"
+        else:
+            target = ar_text = f"{ar:#05x}"
+        if opcode == 0:
+            body.append(f"dr = mem[{target}]")
+            body.append("ac &= dr")
+            writes_dr = True
+        elif opcode == 1:
+            body.append(f"dr = mem[{target}]")
+            body.append("ac += dr")
+            body.append("e = ac >> 16")
+            body.append(f"ac &= {WORD_MASK:#x}")
+            writes_dr = writes_e = True
+        elif opcode == 2:
+            body.append(f"ac = dr = mem[{target}]")
+            writes_dr = True
+        elif opcode == STA:
+            body.append(f"mem[{target}] = ac")
+            body.append(f"if covered[{target}]: invalidate({target})")
+        elif opcode == BUN:
+            result = target
+        elif opcode == BSA:
+            body.append(f"mem[{target}] = {next_pc:#05x}")
+            body.append(f"if covered[{target}]: invalidate({target})")
+            result = f"({target} + 1) & {ADDRESS_MASK:#x}" if indirect else f"{(ar + 1) & ADDRESS_MASK:#05x}"
+        else:  # ISZ
+            body.append(f"dr = (mem[{target}] + 1) & {WORD_MASK:#x}")
+            body.append(f"mem[{target}] = dr")
+            body.append(f"if covered[{target}]: invalidate({target})")
+            result = f"{next_pc:#05x} if dr else {(next_pc + 1) & ADDRESS_MASK:#05x}"
+            writes_dr = True
+
+    prologue = ["ac = m.AC"] + (["e = m.E"] if uses_e else [])
+    epilogue = ["m.AC = ac"]
+    if writes_e:
+        epilogue.append("m.E = e")
+    if writes_dr:
+        epilogue.append("m.DR = dr")
+    epilogue += [f"m.AR = {ar_text}", f"m.IR = {ir:#06x}", f"m.I = {indirect}", f"return {result}"]
+    return _factory(start, prologue + body + epilogue)
+
+
+def _factory(start: int, body: List[str]) -> str:
+    lines = [f"def make_{start:03x}(mem, covered, invalidate, MachineError, decode):", "    def block(m):"]
+    lines += [f"        {line}" for line in body]
+    lines.append("    return block")
+    return "\n".join(lines) + "\n"
+
+
+class BlockCache:
+    """Compiled blocks of one machine's memory, invalidated by stores."""
+
+    def __init__(self, machine: Machine) -> None:
+        self.machine = machine
+        self.memory = machine.memory
+        self.blocks: Dict[int, Block] = {}
+        self.covered = bytearray(MEMORY_SIZE)  # how many cached blocks contain each word
+        self._owners: List[List[int]] = [[] for _ in range(MEMORY_SIZE)]
+        self.compiled = 0
+        self.invalidated = 0
+
+    def compile(self, start: int, max_length: int = MAX_BLOCK_LENGTH) -> Block:
+        """Translate the block at ``start``, cache it and return ``(function, length)``."""
+        memory = self.memory
+        length = block_extent(memory, start, max_length)
+        namespace: dict = {}
+        exec(compile(block_source(memory, start, length), f"<block {start:03X}>", "exec"), namespace)
+        function = namespace[f"make_{start:03x}"](memory, self.covered, self.invalidate, MachineError, decode_table())
+        key = start if max_length > 1 else start | SINGLE
+        entry = self.blocks[key] = (function, length)
+        for address in range(start, start + length):
+            self._owners[address].append(key)
+            self.covered[address] += 1
+        self.compiled += 1
+        return entry
+
+    def invalidate(self, address: int) -> None:
+        """Drop every cached block that contains ``address``."""
+        owners = self._owners
+        for key in list(owners[address]):
+            _, length = self.blocks.pop(key)
+            start = key & ADDRESS_MASK
+            for covered in range(start, start + length):
+                owners[covered].remove(key)
+                self.covered[covered] -= 1
+            self.invalidated += 1
+
+    def clear(self) -> None:
+        """Drop every cached block."""
+        self.blocks.clear()
+        self.covered = bytearray(MEMORY_SIZE)
+        self._owners = [[] for _ in range(MEMORY_SIZE)]
+
+    def run(self, max_steps: int = DEFAULT_STEP_LIMIT) -> int:
+        """Execute until HLT or ``max_steps`` and return the steps executed.
+
+        Blocks longer than the steps left are replaced by one-instruction
+        blocks, so the machine stops on exactly the same step as ``Machine.run``.
+        The same happens while IEN is set, so interrupts are taken between the
+        same instructions.
+        """
+        m = self.machine
+        if m.memory is not self.memory:
+            raise MachineError("Machine memory was replaced; create a new BlockCache")
+        get = self.blocks.get
+        compile_block = self.compile
+        executed = 0
+        pc = m.PC
+        m.S = 1
+        fast_steps = max_steps - MAX_BLOCK_LENGTH  # below this no block can overrun the limit
+        if not m.IEN and not m.R:
+            while executed <= fast_steps:
+                function, length = get(pc) or compile_block(pc)
+                pc = function(m)
+                executed += length
+                if not m.S or m.IEN:  # only input-output blocks change IEN
+                    break
+        while m.S and executed < max_steps:
+            if m.R:
+                m.PC = pc
+                m.interrupt()
+                if self.covered[0]:
+                    self.invalidate(0)
+                pc = 1
+            enabled = m.IEN
+            function, length = (None, 0) if enabled else (get(pc) or compile_block(pc))
+            if enabled or executed + length > max_steps:
+                function, length = get(pc | SINGLE) or compile_block(pc, 1)
+            pc = function(m)
+            executed += length
+            if enabled and m.IEN and (m.FGI or m.FGO):
+                m.R = 1
+        m.PC = pc
+        m.steps += executed
+        return executed
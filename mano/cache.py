@@ -0,0 +1,248 @@
+"""On-disk build cache for assembled programs.
+
+Entries are keyed by a SHA-256 of the source bytes, the opcode table and
+``ASSEMBLER_VERSION``, so an unchanged file is written straight from the cache
+without running either assembler pass. Each entry holds the emitted records
+(output text plus the line/address map), the symbol table and diagnostics.
+The least recently used entries are evicted once the cache exceeds its size cap.
+"""
+import json
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+from mano.assembler import Assembler, assemble_lines
+from mano.pipeline import Emit, LineError, PipelineResult, ProgressMonitor, read_lines, write_stream
+from mano.stats import Stats
+
+
+ASSEMBLER_VERSION = "2"
+CACHE_DIR_ENV = "MANO_CACHE_DIR"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mano")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+MAX_CACHED_RECORDS = 1 << 16
+ENTRY_SUFFIX = ".entry"
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def source_key(source_path: str, assembly_to_machine: Dict[str, str], version: str = ASSEMBLER_VERSION) -> str:
+    """Return a SHA-256 of the source bytes, the opcode table and ``version``."""
+    import hashlib  # deferred: loading OpenSSL is a noticeable part of CLI startup
+
+    digest = hashlib.sha256()
+    digest.update(version.encode())
+    digest.update(json.dumps(sorted(assembly_to_machine.items())).encode())
+    with open(source_path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CacheEntry:
+    """The stored result of assembling one source."""
+
+    def __init__(
+        self,
+        records: List[list],
+        symbols: Dict[str, int],
+        errors: List[list],
+        error_count: int,
+        lines: int,
+    ) -> None:
+        self.records = records
+        self.symbols = symbols
+        self.errors = errors
+        self.error_count = error_count
+        self.lines = lines
+
+    def to_bytes(self) -> bytes:
+        return zlib.compress(json.dumps(self.__dict__, separators=(",", ":")).encode())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CacheEntry":
+        return cls(**json.loads(zlib.decompress(data)))
+
+    def emits(self) -> List[Emit]:
+        return [Emit(*record) for record in self.records]
+
+    def addresses(self) -> Dict[int, int]:
+        """Map source line numbers to the address of the word they produced."""
+        return {lineno: address for lineno, _, _, _, address in self.records if address is not None}
+
+
+class BuildCache:
+    """A directory of compressed entries with LRU eviction by file mtime."""
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size: Optional[int] = None
+
+    def key(self, source_path: str, assembly_to_machine: Dict[str, str]) -> str:
+        """Hash the source contents together with the opcode table version."""
+        return source_key(source_path, assembly_to_machine)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for ``key`` and mark it as recently used."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                entry = CacheEntry.from_bytes(file.read())
+            os.utime(path)
+        except (OSError, ValueError, TypeError, zlib.error):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        """Store ``entry`` atomically and evict old entries if over the cap."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        data = entry.to_bytes()
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(ENTRY_SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        """Return the total size of all entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> None:
+        """Delete least recently used entries until the cache fits its cap."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        self._size = total
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+        self._size = total
+
+    def clear(self) -> None:
+        """Delete every entry."""
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self._size = 0
+
+
+def _result_from_entry(entry: CacheEntry, max_errors: int) -> PipelineResult:
+    result = PipelineResult(max_errors)
+    result.lines = entry.lines
+    result.error_count = entry.error_count
+    result.errors = [LineError(*error) for error in entry.errors[:max_errors]]
+    return result
+
+
+def assemble_file(
+    source_path: str,
+    target_path: str,
+    assembly_to_machine: Dict[str, str],
+    cache: Optional[BuildCache] = None,
+    on_emit: Optional[Callable[[Emit], None]] = None,
+    max_errors: int = 100,
+    monitor: Optional[ProgressMonitor] = None,
+    stats: Optional[Stats] = None,
+) -> PipelineResult:
+    """Assemble ``source_path`` into ``target_path``, reusing a cached build if possible."""
+    if stats is not None:
+        with stats.stage("write"):
+            result = _assemble_file(
+                source_path, target_path, assembly_to_machine, cache,
+                stats.emit_hook(on_emit), max_errors, monitor, stats,
+            )
+        stats.add_result(result)
+        return result
+    return _assemble_file(source_path, target_path, assembly_to_machine, cache, on_emit, max_errors, monitor)
+
+
+def _assemble_file(
+    source_path: str,
+    target_path: str,
+    assembly_to_machine: Dict[str, str],
+    cache: Optional[BuildCache],
+    on_emit: Optional[Callable[[Emit], None]],
+    max_errors: int,
+    monitor: Optional[ProgressMonitor],
+    stats: Optional[Stats] = None,
+) -> PipelineResult:
+    if cache is None:
+        return write_stream(
+            target_path,
+            assemble_lines(lambda: read_lines(source_path, monitor), assembly_to_machine, stats=stats),
+            on_emit,
+            max_errors,
+        )
+
+    if stats is not None:
+        with stats.stage("cache lookup"):
+            key = cache.key(source_path, assembly_to_machine)
+            entry = cache.get(key)
+        stats.count("cache hits" if entry is not None else "cache misses")
+    else:
+        key = cache.key(source_path, assembly_to_machine)
+        entry = cache.get(key)
+    if entry is not None:
+        if entry.error_count:
+            return _result_from_entry(entry, max_errors)
+        return write_stream(target_path, entry.emits(), on_emit, max_errors)
+
+    assembler = Assembler(assembly_to_machine)
+    records: Optional[List[list]] = []
+
+    def collect(emit: Emit) -> None:
+        nonlocal records
+        if records is not None:
+            records.append(list(emit))
+            if len(records) > MAX_CACHED_RECORDS:
+                records = None
+        if on_emit is not None:
+            on_emit(emit)
+
+    result = write_stream(
+        target_path,
+        assemble_lines(lambda: read_lines(source_path, monitor), assembly_to_machine, assembler, stats),
+        collect,
+        max_errors,
+    )
+    if records is not None:
+        errors = [list(error) for error in result.errors]
+        try:
+            cache.put(key, CacheEntry(records, assembler.symbols, errors, result.error_count, result.lines))
+        except OSError:
+            pass  # a read-only or full cache directory only costs the speed-up
+    return result
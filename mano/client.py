@@ -0,0 +1,158 @@
+"""Thin client for the assembler daemon (see ``mano.daemon``).
+
+It only needs the standard library ``socket`` and ``json`` modules, so it
+starts quickly and can be copied into editor plugins or grading scripts::
+
+    with DaemonClient() as client:
+        response = client.assemble(open("program.asm").read())
+
+Run ``python -m mano.client assemble program.asm -o program.txt`` to use it
+from a shell.
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from typing import Optional, Tuple
+
+DEFAULT_PORT = 8765
+CONNECT_TIMEOUT = 5.0
+
+
+def default_address() -> str:
+    """Return a per-user Unix socket path, or localhost TCP without Unix sockets."""
+    if hasattr(socket, "AF_UNIX"):
+        user = os.getuid() if hasattr(os, "getuid") else os.getpid()
+        return os.path.join(tempfile.gettempdir(), f"mano-{user}.sock")
+    return f"127.0.0.1:{DEFAULT_PORT}"
+
+
+def parse_address(address: str) -> Tuple[str, object]:
+    """Split an address into ``("tcp", (host, port))`` or ``("unix", path)``.
+
+    ``host:port`` and ``tcp:host:port`` are TCP; anything else is a socket path.
+    """
+    text = address[4:] if address.startswith("tcp:") else address
+    host, separator, port = text.rpartition(":")
+    if separator and port.isdigit() and os.sep not in text:
+        return "tcp", (host or "127.0.0.1", int(port))
+    if address.startswith("tcp:"):
+        raise ValueError(f"Invalid TCP address {address!r}")
+    return "unix", address
+
+
+def connect(address: str, timeout: Optional[float] = None) -> socket.socket:
+    """Open a connection to a daemon address."""
+    kind, location = parse_address(address)
+    if kind == "tcp":
+        connection = socket.create_connection(location, timeout)
+        connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    else:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(timeout)
+        connection.connect(location)
+    connection.settimeout(None)
+    return connection
+
+
+class DaemonError(Exception):
+    """Raised when the daemon rejects a request."""
+
+
+class DaemonClient:
+    """One connection to the daemon; requests are answered in order."""
+
+    def __init__(self, address: Optional[str] = None, timeout: float = CONNECT_TIMEOUT) -> None:
+        self.address = address or default_address()
+        self._socket = connect(self.address, timeout)
+        self._file = self._socket.makefile("rb")
+        self._next_id = 0
+
+    def __enter__(self) -> "DaemonClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+    def request(self, operation: str, **fields) -> dict:
+        """Send one request and return the response."""
+        self._next_id += 1
+        message = dict(fields, id=self._next_id, op=operation)
+        self._socket.sendall(json.dumps(message, separators=(",", ":")).encode() + b"\n")
+        line = self._file.readline()
+        if not line:
+            raise DaemonError("The daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise DaemonError(response["error"])
+        return response
+
+    def assemble(self, source: str) -> dict:
+        return self.request("assemble", source=source)
+
+    def disassemble(self, source: str) -> dict:
+        return self.request("disassemble", source=source)
+
+    def ping(self) -> dict:
+        return self.request("ping")
+
+    def shutdown(self) -> dict:
+        return self.request("shutdown")
+
+
+def wait_for_daemon(address: Optional[str] = None, timeout: float = CONNECT_TIMEOUT) -> None:
+    """Block until the daemon accepts connections or ``timeout`` seconds pass."""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with DaemonClient(address) as client:
+                client.ping()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.02)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Send a request to a running Mano assembler daemon.")
+    parser.add_argument("operation", choices=["assemble", "disassemble", "ping", "shutdown"])
+    parser.add_argument("file", nargs="?", help="source file (default: standard input)")
+    parser.add_argument("-o", "--output", help="write the output here instead of standard output")
+    parser.add_argument("--address", help=f"daemon address (default: {default_address()})")
+    args = parser.parse_args(argv)
+    try:
+        with DaemonClient(args.address) as client:
+            if args.operation in ("ping", "shutdown"):
+                client.request(args.operation)
+                return 0
+            if args.file:
+                with open(args.file) as file:
+                    source = file.read()
+            else:
+                source = sys.stdin.read()
+            response = client.request(args.operation, source=source)
+    except (OSError, DaemonError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    for error in response["errors"]:
+        print(f"Error: {error}", file=sys.stderr)
+    if not response["ok"]:
+        return 1
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(response["output"])
+    else:
+        sys.stdout.write(response["output"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
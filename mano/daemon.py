@@ -0,0 +1,162 @@
+"""A long-running assembler service for editors and grading scripts.
+
+The daemon keeps the opcode and decode tables warm and answers requests over
+a Unix domain socket (or localhost TCP where Unix sockets are not available).
+Requests and responses are JSON objects, one per line::
+
+    {"id": 1, "op": "assemble", "source": "ORG 100\\nLDA A\\n..."}
+    {"id": 1, "ok": true, "output": "@100\\n2102\\n...", "lines": 4, "errors": [],
+     "error_count": 0, "symbols": {"A": 258}, "seconds": 0.0002}
+
+``op`` is ``assemble``, ``disassemble``, ``ping`` or ``shutdown``. Every
+request is translated from its own text by a fresh assembler; no registers,
+logs or work files are shared between requests or touched at all. A client
+may send several requests on one connection; answers come back in order.
+"""
+import asyncio
+import json
+import os
+import socket
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+from mano.assembler import Assembler, assemble_lines
+from mano.client import default_address, parse_address
+from mano.decoder import decode_lines, decode_table
+from mano.pipeline import MAX_REPORTED_ERRORS, LineError, PipelineResult
+from mano.tables import ASSEMBLY_TO_MACHINE
+
+
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+INLINE_SOURCE_BYTES = 64 * 1024  # larger requests are translated on a worker thread
+OPERATIONS = ("assemble", "disassemble", "ping", "shutdown")
+
+
+def _listening(path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            return False
+    return True
+
+
+def source_lines(source: str) -> Iterator[Tuple[int, str]]:
+    """Yield ``(line number, stripped text)`` for every non-blank line, like ``read_lines``."""
+    for lineno, line in enumerate(source.splitlines(), 1):
+        text = line.strip()
+        if text:
+            yield lineno, text
+
+
+def translate(request: dict, assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE) -> dict:
+    """Answer one assemble or disassemble request."""
+    started = time.perf_counter()
+    operation = request.get("op")
+    source = request.get("source")
+    if not isinstance(source, str):
+        raise ValueError("Request needs a 'source' string")
+    max_errors = int(request.get("max_errors", MAX_REPORTED_ERRORS))
+    assembler = None
+    if operation == "assemble":
+        assembler = Assembler(assembly_to_machine)
+        records = assemble_lines(lambda: source_lines(source), assembly_to_machine, assembler)
+    else:
+        records = decode_lines(source_lines(source), assembly_to_machine)
+    result = PipelineResult(max_errors)
+    output = []
+    for record in records:
+        result.lines += 1
+        if isinstance(record, LineError):
+            result.add_error(record)
+        else:
+            output.append(record.text)
+    response = {
+        "ok": result.ok,
+        "output": "\n".join(output) + "\n" if output and result.ok else "",
+        "lines": result.lines,
+        "errors": [str(error) for error in result.errors],
+        "error_count": result.error_count,
+    }
+    if assembler is not None:
+        response["symbols"] = assembler.symbols
+    response["seconds"] = time.perf_counter() - started
+    return response
+
+
+class AssemblerDaemon:
+    """An asyncio server answering JSON Lines requests."""
+
+    def __init__(self, address: Optional[str] = None, assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE) -> None:
+        self.address = address or default_address()
+        self.assembly_to_machine = assembly_to_machine
+        self.requests = 0
+        self._stopped: Optional[asyncio.Event] = None
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one client connection until it closes."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # longer than MAX_REQUEST_BYTES
+                    writer.write(self._encode({"ok": False, "error": "Request too large"}))
+                    break
+                if not line:
+                    break
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                    operation = request.get("op")
+                    if operation not in OPERATIONS:
+                        raise ValueError(f"Unknown operation {operation!r}")
+                    if operation == "ping":
+                        response = {"ok": True}
+                    elif operation == "shutdown":
+                        writer.write(self._encode({"ok": True, "id": request_id}))
+                        await writer.drain()
+                        self._stopped.set()
+                        break
+                    elif len(line) <= INLINE_SOURCE_BYTES:
+                        response = translate(request, self.assembly_to_machine)
+                    else:
+                        response = await loop.run_in_executor(None, translate, request, self.assembly_to_machine)
+                except (ValueError, TypeError, AttributeError) as e:
+                    response = {"ok": False, "error": str(e)}
+                self.requests += 1
+                writer.write(self._encode(dict(response, id=request_id)))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _encode(response: dict) -> bytes:
+        return json.dumps(response, separators=(",", ":")).encode() + b"\n"
+
+    async def serve(self, ready=None) -> None:
+        """Listen until a ``shutdown`` request arrives; call ``ready()`` once listening."""
+        decode_table(self.assembly_to_machine)  # build the 65536-entry table before the first request
+        self._stopped = asyncio.Event()
+        kind, location = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(location):
+                if _listening(location):
+                    raise OSError(f"A daemon is already listening on {location}")
+                os.remove(location)  # left behind by a daemon that did not shut down cleanly
+            server = await asyncio.start_unix_server(self.handle, location, limit=MAX_REQUEST_BYTES)
+        else:
+            host, port = location
+            server = await asyncio.start_server(self.handle, host, port, limit=MAX_REQUEST_BYTES)
+        try:
+            if ready is not None:
+                ready()
+            await self._stopped.wait()
+        finally:
+            server.close()  # connections still open are cancelled when the loop ends
+            if kind == "unix" and os.path.exists(location):
+                os.remove(location)
+
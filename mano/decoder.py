@@ -0,0 +1,206 @@
+"""Table-driven disassembler for Mano machine words.
+
+``decode_table`` precomputes the assembly text for all 65536 words once, so
+decoding a word is a single list index. ``decode_words`` decodes a whole
+image at once, using NumPy fancy indexing when it is installed.
+"""
+import sys
+from array import array
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from mano.image import HEX_ORIGIN, HEX_WORD, BinaryImage, image_format, read_intel_hex
+from mano.pipeline import (
+    MAX_REPORTED_ERRORS, Emit, LineError, PipelineResult, ProgressMonitor, Record, read_lines, write_stream,
+)
+
+if TYPE_CHECKING:
+    from mano.stats import Stats
+
+_numpy = False  # not looked up yet
+
+
+def _load_numpy():
+    """Import NumPy on first use; return None if it is not installed."""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:  # pragma: no cover - optional speed-up
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+ADDRESS_MASK = 0x0FFF
+INDIRECT_BIT = 0x8000
+
+# (assembly text, address operand or None, True if the word is an instruction)
+DecodedWord = Tuple[str, Optional[int], bool]
+
+
+@lru_cache(maxsize=4)
+def _build_table(items: Tuple[Tuple[str, str], ...]) -> Tuple[DecodedWord, ...]:
+    memory_reference: List[Optional[str]] = [None] * 8
+    register_reference: Dict[int, str] = {}
+    for mnemonic, opcode in items:
+        if len(opcode) == 1:
+            memory_reference[int(opcode, 16) & 7] = mnemonic
+        else:
+            register_reference[int(opcode, 16)] = mnemonic
+
+    table: List[DecodedWord] = []
+    for word in range(0x10000):
+        mnemonic = register_reference.get(word)
+        if mnemonic is not None:
+            table.append((mnemonic, None, True))
+            continue
+        mnemonic = memory_reference[(word >> 12) & 7]
+        if mnemonic is None:
+            table.append((f"HEX {word:04X}", None, False))
+            continue
+        address = word & ADDRESS_MASK
+        suffix = " I" if word & INDIRECT_BIT else ""
+        table.append((f"{mnemonic} {address:03X}{suffix}", address, True))
+    return tuple(table)
+
+
+def decode_table(assembly_to_machine: Dict[str, str]) -> Tuple[DecodedWord, ...]:
+    """Return the decoded form of every 16-bit word for an opcode table."""
+    return _build_table(tuple(sorted(assembly_to_machine.items())))
+
+
+def decode_lines(lines: Iterable[Tuple[int, str]], assembly_to_machine: Dict[str, str]) -> Iterator[Record]:
+    """Translate hexadecimal machine words back into assembly lines.
+
+    ``@addr`` markers become ``ORG`` statements and words that are not
+    instructions are written back as ``HEX`` data.
+    """
+    table = decode_table(assembly_to_machine)
+    is_word = HEX_WORD.fullmatch
+    location = 0
+    for lineno, line in lines:
+        if line[0] == "@":
+            location = int(line[1:], 16) if HEX_ORIGIN.fullmatch(line) else -1
+            if not 0 <= location <= ADDRESS_MASK:
+                yield LineError(lineno, f"Invalid origin {line}")
+                location = 0
+                continue
+            yield Emit(lineno, f"ORG {location:03X}")
+            continue
+        if not is_word(line):
+            yield LineError(lineno, f"Invalid machine code {line}")
+            continue
+        word = int(line, 16)
+        text, address, is_instruction = table[word]
+        yield Emit(lineno, text, word if is_instruction else None, address, location)
+        location += 1
+
+
+def disassemble_file(
+    source_path: str,
+    target_path: str,
+    assembly_to_machine: Dict[str, str],
+    on_emit: Optional[Callable[[Emit], None]] = None,
+    max_errors: int = MAX_REPORTED_ERRORS,
+    monitor: Optional[ProgressMonitor] = None,
+    stats: Optional["Stats"] = None,
+) -> PipelineResult:
+    """Stream a hex text file through ``decode_lines`` into ``target_path``."""
+    if stats is None:
+        return write_stream(
+            target_path, decode_lines(read_lines(source_path, monitor), assembly_to_machine), on_emit, max_errors
+        )
+    with stats.stage("write"):
+        records = stats.timed("decode", decode_lines(stats.timed("read", read_lines(source_path, monitor)), assembly_to_machine))
+        result = write_stream(target_path, records, stats.emit_hook(on_emit), max_errors)
+    stats.add_result(result)
+    return result
+
+
+def parse_words(lines: Sequence[str]) -> array:
+    """Parse four-digit hex lines into an ``array('H')`` in one step."""
+    stripped = [line.strip() for line in lines]
+    stripped = [line for line in stripped if line]
+    for index, line in enumerate(stripped):
+        if len(line) != 4:
+            raise ValueError(f"Invalid machine code {line} (word {index + 1})")
+    try:
+        raw = bytes.fromhex("".join(stripped))
+    except ValueError:
+        for index, line in enumerate(stripped):
+            if not HEX_WORD.fullmatch(line):
+                raise ValueError(f"Invalid machine code {line} (word {index + 1})") from None
+        raise
+    words = array("H", raw)
+    if sys.byteorder == "little":
+        words.byteswap()  # hex text is most significant byte first
+    return words
+
+
+def decode_words(words: Sequence[int], assembly_to_machine: Dict[str, str]) -> List[str]:
+    """Decode a whole machine image at once and return one line per word."""
+    table = decode_table(assembly_to_machine)
+    numpy = _load_numpy()
+    if numpy is not None:
+        texts = _numpy_texts(table)
+        return texts[numpy.asarray(words, dtype=numpy.uint16)].tolist()
+    return [table[word][0] for word in words]
+
+
+@lru_cache(maxsize=4)
+def _numpy_texts(table: Tuple[DecodedWord, ...]):
+    numpy = _load_numpy()
+    texts = numpy.empty(len(table), dtype=object)
+    texts[:] = [entry[0] for entry in table]
+    return texts
+
+
+def disassemble_image(input_path: str, output_path: str, assembly_to_machine: Dict[str, str]) -> int:
+    """Disassemble a whole machine image in batch and return the number of words.
+
+    Binary images are decoded straight from their memory map. Text files are
+    split at ``@addr`` markers and each run of words is parsed as one array.
+    """
+    kind = image_format(input_path)
+    if kind == "binary":
+        with BinaryImage(input_path) as image:
+            output = [f"ORG {image.origin:03X}", *decode_words(image.words, assembly_to_machine)]
+            count = len(image)
+    elif kind == "intel-hex":
+        origin, words = read_intel_hex(input_path)
+        output = [f"ORG {origin:03X}", *decode_words(words, assembly_to_machine)]
+        count = len(words)
+    else:
+        output, count = _disassemble_text(input_path, assembly_to_machine)
+    with open(output_path, "w") as file:
+        file.write("\n".join(output) + "\n")
+    return count
+
+
+def _disassemble_text(input_path: str, assembly_to_machine: Dict[str, str]) -> Tuple[List[str], int]:
+    with open(input_path, "r") as file:
+        lines = file.read().split()
+    output: List[str] = []
+    segment: List[str] = []
+    count = 0
+
+    def flush_segment() -> None:
+        nonlocal count
+        if segment:
+            words = parse_words(segment)
+            output.extend(decode_words(words, assembly_to_machine))
+            count += len(words)
+            segment.clear()
+
+    for line in lines:
+        if line[0] == "@":
+            flush_segment()
+            origin = int(line[1:], 16) if HEX_ORIGIN.fullmatch(line) else -1
+            if not 0 <= origin <= ADDRESS_MASK:
+                raise ValueError(f"Invalid origin {line}")
+            output.append(f"ORG {origin:03X}")
+        else:
+            segment.append(line)
+    flush_segment()
+    return output, count
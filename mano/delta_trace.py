@@ -0,0 +1,180 @@
+"""Columnar, delta-encoded register traces.
+
+Every row is one register change: the step it happened at, the register id,
+the operation id and the new value, each kept in its own ``array`` column
+(14 bytes per row). The full register file is saved every
+``checkpoint_interval`` rows, so the registers at any step are rebuilt by
+replaying at most that many rows from the nearest checkpoint.
+
+Wall-clock time is stamped at every checkpoint and whenever the owner calls
+``stamp`` (the register log does so after each write), not per event, so an
+event carries the last second stamped before it.
+
+Registers that changed without an event of their own (for example while only
+summary events are logged) are stored as ``SILENT`` rows right after the event
+that noticed them, so reconstruction and export stay exact.
+"""
+import json
+import time
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
+
+SILENT = 0
+DEFAULT_CHECKPOINT_INTERVAL = 1024
+
+
+class DeltaTrace:
+    """Register events for a fixed set of register names."""
+
+    def __init__(self, names: Sequence[str], checkpoint_interval: int = DEFAULT_CHECKPOINT_INTERVAL) -> None:
+        self.names = tuple(names)
+        self.checkpoint_interval = checkpoint_interval
+        self._ids = {name: index for index, name in enumerate(self.names)}
+        self._indexed_names = tuple(enumerate(self.names))
+        self.operations: List[str] = [""]
+        self._operation_ids = {"": SILENT}
+        self.state = [0] * len(self.names)
+        self.events = 0
+        self._second = -1
+        self._clear_columns()
+
+    def _clear_columns(self) -> None:
+        self.steps = array("Q")
+        self.register_ids = array("B")
+        self.operation_ids = array("B")
+        self.values = array("i")
+        self.checkpoints = array("i")  # the register file before every checkpoint_interval-th row
+        self.time_rows = array("Q")  # first row of every new wall-clock second ...
+        self.time_seconds = array("Q")  # ... and that second
+        self._second = -1
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def nbytes(self) -> int:
+        """Return the memory held by the columns."""
+        columns = (
+            self.steps, self.register_ids, self.operation_ids, self.values,
+            self.checkpoints, self.time_rows, self.time_seconds,
+        )
+        return sum(column.itemsize * len(column) for column in columns)
+
+    def _operation_id(self, operation: str) -> int:
+        operation_id = self._operation_ids.get(operation)
+        if operation_id is None:
+            if len(self.operations) > 0xFF:
+                raise ValueError("Too many distinct operations in one trace")
+            operation_id = self._operation_ids[operation] = len(self.operations)
+            self.operations.append(operation)
+        return operation_id
+
+    def stamp(self, second: Optional[int] = None) -> None:
+        """Mark the rows appended from now on with ``second`` (default: now)."""
+        second = int(time.time()) if second is None else second
+        if second != self._second:
+            self._second = second
+            self.time_rows.append(len(self.values))
+            self.time_seconds.append(second)
+
+    def _row(self, step: int, register_id: int, operation_id: int, value: int) -> None:
+        if not len(self.values) % self.checkpoint_interval:
+            self.checkpoints.extend(self.state)
+            self.stamp()
+        self.steps.append(step)
+        self.register_ids.append(register_id)
+        self.operation_ids.append(operation_id)
+        self.values.append(value)
+        self.state[register_id] = value
+
+    def append(
+        self,
+        step: int,
+        operation: str,
+        register: str,
+        value: int,
+        registers: Mapping[str, int],
+    ) -> None:
+        """Record one event and any other registers that changed with it.
+
+        ``registers`` is the whole register file after the event; it is read
+        by name and not copied.
+        """
+        register_id = self._ids.get(register)
+        if register_id is None:
+            raise ValueError(f"Unknown register {register}")
+        operation_id = self._operation_ids.get(operation)
+        if operation_id is None:
+            operation_id = self._operation_id(operation)
+        self._row(step, register_id, operation_id, value)
+        state = self.state
+        for index, name in self._indexed_names:
+            current = registers[name]
+            if current != state[index]:
+                self._row(step, index, SILENT, current)
+        self.events += 1
+
+    def state_at_row(self, row: int) -> List[int]:
+        """Return the register file before row ``row`` was applied."""
+        row = max(0, min(row, len(self.values)))
+        width = len(self.names)
+        checkpoint = row // self.checkpoint_interval
+        if checkpoint * width >= len(self.checkpoints):
+            return list(self.state)  # row is the end of the trace
+        state = self.checkpoints[checkpoint * width:(checkpoint + 1) * width].tolist()
+        register_ids, values = self.register_ids, self.values
+        for index in range(checkpoint * self.checkpoint_interval, row):
+            state[register_ids[index]] = values[index]
+        return state
+
+    def registers_at(self, step: int) -> Dict[str, int]:
+        """Return the registers after every event up to and including ``step``."""
+        return dict(zip(self.names, self.state_at_row(bisect_right(self.steps, step))))
+
+    def truncate(self) -> None:
+        """Drop all rows but keep the current register file as the new start."""
+        self._clear_columns()
+
+    def json_lines(self, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """Yield rows ``start:end`` as register log JSON Lines, one per event.
+
+        ``start`` must be the row of an event (not a silent row).
+        """
+        end = len(self.values) if end is None else min(end, len(self.values))
+        state = self.state_at_row(start)
+        names, operations = self.names, self.operations
+        steps, register_ids, operation_ids, values = self.steps, self.register_ids, self.operation_ids, self.values
+        time_rows, time_seconds = self.time_rows, self.time_seconds
+        mark = max(0, bisect_right(time_rows, start) - 1)
+        second, timestamp = -1, ""
+        # Same text as json.dumps of the event dict, formatted without building the dict.
+        dumps = json.dumps
+        template = (
+            '{"Step": %d, "Timestamp": "%s", "Operation": %s, "Register": %s, "Value": %d, "Registers": {'
+            + ", ".join(f"{dumps(name)}: %d" for name in names)
+            + "}}\n"
+        )
+        operation_texts = [dumps(operation) for operation in operations]
+        register_texts = [dumps(name) for name in names]
+        pending = None
+
+        def line(event) -> str:
+            step, operation_id, register_id, value, timestamp = event
+            return template % (
+                step, timestamp, operation_texts[operation_id], register_texts[register_id], value, *state
+            )
+
+        for row in range(start, end):
+            operation_id = operation_ids[row]
+            if operation_id != SILENT:
+                if pending is not None:
+                    yield line(pending)
+                while mark + 1 < len(time_rows) and time_rows[mark + 1] <= row:
+                    mark += 1
+                if time_seconds and time_seconds[mark] != second:
+                    second = time_seconds[mark]
+                    timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+                pending = (steps[row], operation_id, register_ids[row], values[row], timestamp)
+            state[register_ids[row]] = values[row]
+        if pending is not None:
+            yield line(pending)
@@ -0,0 +1,327 @@
+"""Input and output devices for INP, OUT, SKI and SKO.
+
+A ``DeviceBus`` stands for Mano's keyboard and printer. It keeps a buffer of
+characters to be typed and a buffer of characters printed. Whenever FGI is
+clear and a character is waiting, the bus moves it into INPR and sets FGI.
+Whenever OUT has cleared FGO, the bus takes OUTR and sets FGO again. Both
+happen inside the instructions themselves, so the CPU never waits on a
+device.
+
+``run_with_devices`` connects the buffers to asyncio streams. The machine runs
+in slices of ``IO_SLICE`` instructions. Between slices the characters printed
+so far are written out in one batch, and input that arrived meanwhile is
+appended to the bus. A program that polls SKI with nothing left to read
+pauses the machine (S is cleared, ``starved`` is set) until more input
+arrives; the next run continues at the instruction after SKI. Streams are
+named by a spec:
+
+* ``-`` for stdin or stdout,
+* ``socket:ADDRESS`` for a local socket (``host:port`` or a Unix socket path),
+* anything else is a file path.
+"""
+import asyncio
+import os
+import sys
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from mano.assembler import assemble_lines
+from mano.client import parse_address
+from mano.machine import DEFAULT_STEP_LIMIT, Machine, is_input_output
+from mano.pipeline import Emit, read_lines
+from mano.tables import ASSEMBLY_TO_MACHINE
+
+
+READ_SIZE = 4096
+IO_SLICE = 20_000  # instructions run between two device transfers
+SOCKET_PREFIX = "socket:"
+
+
+class DeviceBus:
+    """Buffered keyboard (INPR, FGI) and printer (OUTR, FGO)."""
+
+    def __init__(self, input_data: bytes = b"") -> None:
+        self.input = bytearray(input_data)
+        self.position = 0  # next character of ``input`` to move into INPR
+        self.output = bytearray()
+        self.input_closed = False
+        self.starved = False  # SKI found FGI clear and nothing left to read
+        self.machine: Optional[Machine] = None
+
+    def attach(self, machine: Machine) -> None:
+        self.machine = machine
+        machine.FGO = 1  # the printer starts out ready
+        self.service(machine)
+
+    @property
+    def pending(self) -> int:
+        """Return how many characters are waiting to be read by INP."""
+        return len(self.input) - self.position
+
+    def feed(self, data: bytes) -> None:
+        """Queue characters for INP."""
+        if self.position > READ_SIZE and self.position * 2 > len(self.input):
+            del self.input[:self.position]
+            self.position = 0
+        self.input += data
+        self.starved = False
+        if self.machine is not None:
+            self.service(self.machine)
+
+    def close_input(self) -> None:
+        self.input_closed = True
+
+    def service(self, machine: Machine) -> None:
+        """Fill INPR if FGI is clear and take OUTR if FGO is clear."""
+        if not machine.FGI and self.position < len(self.input):
+            machine.INPR = self.input[self.position]
+            self.position += 1
+            machine.FGI = 1
+        if not machine.FGO:
+            self.output.append(machine.OUTR)
+            machine.FGO = 1
+
+    def wait_for_input(self, machine: Machine) -> None:
+        """Called by SKI with FGI clear; pauses the machine if nothing is left to read."""
+        self.service(machine)
+        if not machine.FGI:
+            self.starved = True
+            machine.S = 0
+
+    def take_output(self) -> bytes:
+        """Return and forget the characters printed so far."""
+        output = bytes(self.output)
+        self.output.clear()
+        return output
+
+
+def uses_devices(machine: Machine) -> bool:
+    """Return True if any word in memory has the form of an input-output instruction."""
+    return any(is_input_output(word) for word in machine.memory)
+
+
+def source_uses_devices(
+    machine: Machine,
+    open_lines: Callable[[], Iterable[Tuple[int, str]]],
+    assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE,
+) -> Optional[bool]:
+    """Return True if the instructions assembled from a source include an input-output instruction.
+
+    Only instruction statements count, so data such as ``HEX F800`` does not.
+    Returns None if the source has errors or does not match the words in
+    ``machine``'s memory.
+    """
+    memory = machine.memory
+    found = False
+    for record in assemble_lines(open_lines, assembly_to_machine):
+        if not isinstance(record, Emit):
+            return None
+        if record.address is None:  # an ORG marker
+            continue
+        if memory[record.address] != int(record.text, 16):
+            return None
+        if record.ir is not None and is_input_output(record.ir):
+            found = True
+    return found
+
+
+def image_uses_devices(
+    image_path: str,
+    source_path: Optional[str] = None,
+    assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE,
+) -> bool:
+    """Return True if the program in a machine code text file uses input-output instructions.
+
+    If ``source_path`` is the assembly the image was made from, only its
+    instruction statements are looked at. Otherwise every word of the image
+    that looks like an input-output instruction counts.
+    """
+    machine = Machine()
+    machine.load_file(image_path)
+    if source_path is not None and os.path.exists(source_path):
+        found = source_uses_devices(machine, lambda: read_lines(source_path), assembly_to_machine)
+        if found is not None:
+            return found
+    return uses_devices(machine)
+
+
+class FileSink:
+    """Write output batches to a file object on a worker thread."""
+
+    def __init__(self, file, close: bool = True) -> None:
+        self.file = file
+        self._close = close
+
+    def _write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.file.flush()
+
+    async def write(self, data: bytes) -> None:
+        await asyncio.get_running_loop().run_in_executor(None, self._write, data)
+
+    async def close(self) -> None:
+        if self._close:
+            self.file.close()
+
+
+class StreamSink:
+    """Write output batches to an asyncio stream."""
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+
+    async def write(self, data: bytes) -> None:
+        self.writer.write(data)
+        await self.writer.drain()
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def _read_file(file, reader: asyncio.StreamReader, loop: asyncio.AbstractEventLoop, close: bool) -> None:
+    """Feed ``file`` into ``reader`` from a worker thread, one chunk at a time."""
+    try:
+        read = getattr(file, "read1", file.read)
+        while True:
+            data = read(READ_SIZE)
+            if not data:
+                break
+            loop.call_soon_threadsafe(reader.feed_data, data)
+        loop.call_soon_threadsafe(reader.feed_eof)
+    except RuntimeError:
+        pass  # the run ended and its event loop was closed while we were reading
+    finally:
+        if close:
+            file.close()
+
+
+def _file_reader(file, close: bool) -> asyncio.StreamReader:
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    threading.Thread(target=_read_file, args=(file, reader, loop, close), daemon=True).start()
+    return reader
+
+
+async def _open_socket(spec: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    kind, location = parse_address(spec[len(SOCKET_PREFIX):])
+    if kind == "unix":
+        return await asyncio.open_unix_connection(location)
+    return await asyncio.open_connection(*location)
+
+
+class Streams(NamedTuple):
+    reader: Optional[asyncio.StreamReader]
+    sink: Optional[object]  # a FileSink or StreamSink
+    sockets: List[asyncio.StreamWriter]
+
+    async def close(self) -> None:
+        if self.sink is not None:
+            await self.sink.close()
+        for writer in self.sockets:
+            if self.sink is None or writer is not getattr(self.sink, "writer", None):
+                await StreamSink(writer).close()
+
+
+async def open_streams(input_spec: Optional[str], output_spec: Optional[str]) -> Streams:
+    """Open the streams named by two specs; either may be None for no stream."""
+    reader = sink = None
+    sockets = []
+    if input_spec and input_spec.startswith(SOCKET_PREFIX):
+        reader, writer = await _open_socket(input_spec)
+        sockets.append(writer)
+    elif input_spec == "-":
+        reader = _file_reader(sys.stdin.buffer, close=False)
+    elif input_spec:
+        reader = _file_reader(open(input_spec, "rb"), close=True)
+    if output_spec and output_spec.startswith(SOCKET_PREFIX):
+        if output_spec != input_spec:
+            sockets.append((await _open_socket(output_spec))[1])
+        sink = StreamSink(sockets[-1])
+    elif output_spec == "-":
+        sink = FileSink(sys.stdout.buffer, close=False)
+    elif output_spec:
+        sink = FileSink(open(output_spec, "wb"))
+    return Streams(reader, sink, sockets)
+
+
+async def run_with_devices(
+    machine: Machine,
+    reader: Optional[asyncio.StreamReader] = None,
+    sink=None,
+    max_steps: int = DEFAULT_STEP_LIMIT,
+    bus: Optional[DeviceBus] = None,
+    slice_steps: int = IO_SLICE,
+) -> int:
+    """Run ``machine`` with its devices on ``reader`` and ``sink``; return the steps executed.
+
+    Without a reader only the characters already in ``bus`` can be read.
+    Without a sink the printed characters stay in ``bus.output``. The run
+    stops at HLT, at ``max_steps``, or when the program waits for input after
+    the input has ended (``bus.starved`` is then still set).
+    """
+    if bus is None:
+        bus = DeviceBus()
+    machine.attach_devices(bus)
+    arrived = asyncio.Event()
+
+    async def pump() -> None:
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                bus.feed(data)
+                arrived.set()
+        finally:
+            bus.close_input()
+            arrived.set()
+
+    pumping = asyncio.ensure_future(pump()) if reader is not None else None
+    if pumping is None:
+        bus.close_input()
+    executed = 0
+    try:
+        while executed < max_steps:
+            bus.starved = False
+            executed += machine.run_blocks(min(slice_steps, max_steps - executed))
+            if sink is not None and bus.output:
+                await sink.write(bus.take_output())
+            if bus.starved:
+                if bus.input_closed and not bus.pending:
+                    break  # waiting for input that will never come
+                arrived.clear()
+                if not bus.pending:
+                    await arrived.wait()
+            elif machine.halted:
+                break
+            else:
+                await asyncio.sleep(0)  # let the reader queue what has arrived
+    finally:
+        if pumping is not None:
+            pumping.cancel()
+        if sink is not None and bus.output:
+            await sink.write(bus.take_output())
+    return executed
+
+
+def run_on_streams(
+    machine: Machine,
+    input_spec: Optional[str] = None,
+    output_spec: Optional[str] = None,
+    max_steps: int = DEFAULT_STEP_LIMIT,
+    bus: Optional[DeviceBus] = None,
+) -> int:
+    """Open the streams named by the specs and run ``machine`` on them; return the steps executed."""
+
+    async def main() -> int:
+        streams = await open_streams(input_spec, output_spec)
+        try:
+            return await run_with_devices(machine, streams.reader, streams.sink, max_steps, bus)
+        finally:
+            await streams.close()
+
+    return asyncio.run(main())
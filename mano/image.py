@@ -0,0 +1,235 @@
+"""Machine image formats: hex text, compact binary and Intel HEX.
+
+The binary format is a 12-byte header followed by raw little-endian 16-bit
+words::
+
+    offset 0  magic   b"MANO"
+    offset 4  version u8 (1)
+    offset 5  unused  u8
+    offset 6  origin  u16 little-endian
+    offset 8  count   u32 little-endian
+    offset 12 words   count x u16 little-endian
+
+``BinaryImage`` maps the file with ``mmap`` and exposes the words as a
+``memoryview`` so they can be decoded or loaded without parsing or copying.
+"""
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Iterable, Sequence, Tuple
+
+from mano.pipeline import read_lines
+
+
+MAGIC = b"MANO"
+VERSION = 1
+HEADER = struct.Struct("<4sBxHI")
+MEMORY_SIZE = 4096
+
+# int(text, 16) alone also takes "0x1F", "+1F", "1_F" and any number of digits.
+HEX_WORD = re.compile(r"[0-9A-Fa-f]{4}")
+HEX_ORIGIN = re.compile(r"@[0-9A-Fa-f]{1,4}")
+
+BINARY_EXTENSIONS = (".bin",)
+INTEL_HEX_EXTENSIONS = (".hex", ".ihex", ".ihx")
+INTEL_HEX_RECORD_BYTES = 16
+
+
+class ImageError(Exception):
+    """Raised when an image file is malformed."""
+
+
+class BinaryImage:
+    """A memory-mapped binary image; ``words`` is valid until ``close()``."""
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        self._map = None
+        self._view = None
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < HEADER.size:
+                raise ImageError(f"{file_path} is too short for a Mano image")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, origin, count = HEADER.unpack_from(self._map)
+            if magic != MAGIC or version != VERSION:
+                raise ImageError(f"{file_path} is not a Mano binary image")
+            if size != HEADER.size + 2 * count or origin + count > MEMORY_SIZE:
+                raise ImageError(f"{file_path} has an invalid word count {count}")
+            self.origin = origin
+            self._view = memoryview(self._map)[HEADER.size:]
+            if sys.byteorder == "little":
+                self.words: Sequence[int] = self._view.cast("H")
+            else:
+                swapped = array("H", self._view)
+                swapped.byteswap()
+                self.words = swapped
+        except BaseException:
+            self.close()
+            raise
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def close(self) -> None:
+        """Release the view and unmap the file."""
+        if isinstance(getattr(self, "words", None), memoryview):
+            self.words.release()
+        self.words = ()
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> "BinaryImage":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def write_binary(file_path: str, words: Sequence[int], origin: int = 0) -> None:
+    """Write ``words`` as a binary image starting at ``origin``."""
+    if origin + len(words) > MEMORY_SIZE:
+        raise ImageError(f"Image does not fit in {MEMORY_SIZE} words")
+    data = array("H", words)
+    if sys.byteorder != "little":
+        data.byteswap()
+    with open(file_path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, origin, len(data)))
+        file.write(data.tobytes())
+
+
+def _intel_hex_record(address: int, record_type: int, data: bytes) -> str:
+    payload = bytes((len(data), address >> 8 & 0xFF, address & 0xFF, record_type)) + data
+    checksum = -sum(payload) & 0xFF
+    return f":{payload.hex().upper()}{checksum:02X}\n"
+
+
+def write_intel_hex(file_path: str, words: Sequence[int], origin: int = 0) -> None:
+    """Write ``words`` as Intel HEX with byte address ``2 * word address``."""
+    data = array("H", words)
+    if sys.byteorder != "little":
+        data.byteswap()
+    raw = data.tobytes()
+    base = 2 * origin
+    with open(file_path, "w") as file:
+        for offset in range(0, len(raw), INTEL_HEX_RECORD_BYTES):
+            chunk = raw[offset:offset + INTEL_HEX_RECORD_BYTES]
+            file.write(_intel_hex_record(base + offset, 0x00, chunk))
+        file.write(_intel_hex_record(0, 0x01, b""))
+
+
+def read_intel_hex(file_path: str) -> Tuple[int, array]:
+    """Read an Intel HEX file into ``(origin, words)``; gaps are zero-filled."""
+    memory = bytearray(2 * MEMORY_SIZE)
+    low, high = len(memory), 0
+    with open(file_path, "r") as file:
+        for lineno, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                if line[0] != ":":
+                    raise ValueError
+                record = bytes.fromhex(line[1:])
+            except ValueError:
+                raise ImageError(f"Line {lineno}: Invalid Intel HEX record") from None
+            if len(record) < 5 or len(record) != record[0] + 5 or sum(record) & 0xFF:
+                raise ImageError(f"Line {lineno}: Bad Intel HEX length or checksum")
+            record_type = record[3]
+            if record_type == 0x01:
+                break
+            if record_type != 0x00:
+                continue
+            address = record[1] << 8 | record[2]
+            data = record[4:-1]
+            if address + len(data) > len(memory):
+                raise ImageError(f"Line {lineno}: Address {address:04X} is outside memory")
+            memory[address:address + len(data)] = data
+            low, high = min(low, address), max(high, address + len(data))
+    if high <= low:
+        return 0, array("H")
+    low -= low % 2
+    high += high % 2
+    words = array("H", bytes(memory[low:high]))
+    if sys.byteorder != "little":
+        words.byteswap()
+    return low // 2, words
+
+
+def read_text(file_path: str) -> Tuple[int, array]:
+    """Read hex text with ``@addr`` markers into ``(origin, words)``."""
+    memory = array("H", bytes(2 * MEMORY_SIZE))
+    low, high = MEMORY_SIZE, 0
+    address = 0
+    for lineno, text in read_lines(file_path):
+        if text[0] == "@":
+            if not HEX_ORIGIN.fullmatch(text) or int(text[1:], 16) >= MEMORY_SIZE:
+                raise ImageError(f"Line {lineno}: Invalid machine code {text}")
+            address = int(text[1:], 16)
+            continue
+        if not HEX_WORD.fullmatch(text) or address >= MEMORY_SIZE:
+            raise ImageError(f"Line {lineno}: Invalid machine code {text}")
+        word = int(text, 16)
+        memory[address] = word
+        low, high = min(low, address), max(high, address + 1)
+        address += 1
+    if high <= low:
+        return 0, array("H")
+    return low, memory[low:high]
+
+
+def write_text(file_path: str, words: Iterable[int], origin: int = 0) -> None:
+    """Write ``words`` as hex text, with an ``@addr`` marker if needed."""
+    with open(file_path, "w") as file:
+        if origin:
+            file.write(f"@{origin:03X}\n")
+        file.writelines(f"{word:04X}\n" for word in words)
+
+
+def image_format(file_path: str) -> str:
+    """Return "binary", "intel-hex" or "text" based on the file extension."""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension in BINARY_EXTENSIONS:
+        return "binary"
+    if extension in INTEL_HEX_EXTENSIONS:
+        return "intel-hex"
+    return "text"
+
+
+def read_image(file_path: str) -> Tuple[int, array]:
+    """Read any supported image format into ``(origin, words)``."""
+    kind = image_format(file_path)
+    if kind == "binary":
+        with BinaryImage(file_path) as image:
+            return image.origin, array("H", image.words)
+    if kind == "intel-hex":
+        return read_intel_hex(file_path)
+    return read_text(file_path)
+
+
+def write_image(file_path: str, words: Sequence[int], origin: int = 0) -> None:
+    """Write ``words`` in the format implied by the file extension."""
+    kind = image_format(file_path)
+    if kind == "binary":
+        write_binary(file_path, words, origin)
+    elif kind == "intel-hex":
+        write_intel_hex(file_path, words, origin)
+    else:
+        write_text(file_path, words, origin)
+
+
+def convert_image(input_path: str, output_path: str) -> int:
+    """Convert between image formats and return the number of words."""
+    origin, words = read_image(input_path)
+    write_image(output_path, words, origin)
+    return len(words)
+
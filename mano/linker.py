@@ -0,0 +1,429 @@
+"""Relocatable object modules and a linker for programs split over several files.
+
+Each module is assembled on its own as if it started at address 0; ``ORG``
+moves the location counter relative to the start of the module. Two more
+pseudo-instructions connect modules::
+
+            EXTERN SUB      / SUB is defined in another module
+            ENTRY MAIN      / other modules may refer to MAIN
+    MAIN,   BSA SUB
+            HLT
+
+An object file (``.obj``, JSON) holds the module's words together with its
+relocation entries (offsets of words whose address field names a label of
+the module), its imports (offsets of words that name an ``EXTERN`` symbol)
+and its exports. Hexadecimal operands stay absolute. ``link`` places the
+modules one after another from an origin, adds each module's base address to
+its relocation entries, fills in the imported addresses and returns a single
+image of at most 4096 words.
+
+``build`` keeps one object file per source. An object is reused while its
+source is unchanged (same size and mtime, or else the same SHA-256). The
+stale modules are assembled in a process pool when there are several, so
+relinking after an edit costs one module's assembly and a link of a few
+milliseconds.
+"""
+import json
+import os
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from mano.assembler import ADDRESS_MASK, MEMORY_SIZE, Assembler, assemble_lines, is_symbol, parse_line, parse_number
+from mano.cache import source_key
+from mano.image import write_image
+from mano.pipeline import Emit, LineError, Record, read_lines
+from mano.tables import ASSEMBLY_TO_MACHINE
+
+
+OBJECT_VERSION = "1"
+OBJECT_EXTENSION = ".obj"
+DEFAULT_ORIGIN = 0x100
+LINK_DIRECTIVES = ("ENTRY", "EXTERN")
+MAX_ERRORS_PER_MODULE = 20
+OPCODE_MASK = 0xF000
+RELOCATE = object()  # marks an operand that names a label of the module being assembled
+
+
+class LinkError(Exception):
+    """Raised when modules cannot be linked into one image."""
+
+
+class ObjectModule:
+    """The relocatable result of assembling one module."""
+
+    def __init__(
+        self,
+        source: str,
+        key: str,
+        stat: List[int],
+        words: List[int],
+        relocations: List[int],
+        imports: List[list],
+        exports: Dict[str, int],
+        symbols: Dict[str, int],
+        version: str = OBJECT_VERSION,
+    ) -> None:
+        self.source = source
+        self.key = key  # source_key of the source it was assembled from
+        self.stat = stat  # [size, mtime_ns] of that source
+        self.words = words
+        self.relocations = relocations  # offsets whose address field is module-relative
+        self.imports = imports  # [offset, symbol] pairs to fill with imported addresses
+        self.exports = exports  # symbol -> offset
+        self.symbols = symbols  # every label -> offset, for link maps
+        self.version = version
+
+    @property
+    def size(self) -> int:
+        return len(self.words)
+
+    def write(self, file_path: str) -> None:
+        """Save the module atomically as JSON."""
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(self.__dict__, file, separators=(",", ":"))
+        os.replace(temp_path, file_path)
+
+    @classmethod
+    def read(cls, file_path: str) -> "ObjectModule":
+        try:
+            with open(file_path) as file:
+                module = cls(**json.load(file))
+        except (ValueError, TypeError) as e:
+            raise LinkError(f"{file_path} is not a Mano object file: {e}") from None
+        if module.version != OBJECT_VERSION:
+            raise LinkError(f"{file_path} has object format version {module.version}, expected {OBJECT_VERSION}")
+        return module
+
+
+class ObjectAssembler(Assembler):
+    """Assembles one module into relocatable words, relocation entries, imports and exports."""
+
+    def __init__(self, assembly_to_machine: Dict[str, str]) -> None:
+        super().__init__(assembly_to_machine)
+        self.imports: Set[str] = set()
+        self.exports: Dict[str, int] = {}  # symbol -> line number of its ENTRY statement
+        self.relocations: List[int] = []
+        self.references: List[list] = []  # [offset, imported symbol]
+        self._reference: object = None  # RELOCATE or the imported symbol named by the last operand
+
+    def _directive(self, lineno: int, mnemonic: str, label: Optional[str], operand: Optional[str], indirect: bool) -> None:
+        if label is not None:
+            raise ValueError(f"{mnemonic} does not take a label")
+        if operand is None or indirect or not is_symbol(operand):
+            raise ValueError(f"{mnemonic} needs a symbol name")
+        if mnemonic == "EXTERN":
+            if operand in self.imports or operand in self.symbols:
+                raise ValueError(f"Duplicate label {operand}")
+            self.imports.add(operand)
+        else:
+            if operand in self.exports:
+                raise ValueError(f"Duplicate ENTRY {operand}")
+            self.exports[operand] = lineno
+
+    def first_pass(self, lines: Iterable[Tuple[int, str]]) -> Iterator[LineError]:
+        """Assign module-relative addresses to labels; collect imports and exports."""
+        symbols = self.symbols
+        location = 0
+        for lineno, text in lines:
+            try:
+                line = parse_line(text)
+                if line.mnemonic in LINK_DIRECTIVES:
+                    self._directive(lineno, line.mnemonic, line.label, line.operand, line.indirect)
+                    continue
+            except ValueError as e:
+                yield LineError(lineno, str(e))
+                continue
+            error = None
+            if line.label is not None:
+                if line.label in symbols or line.label in self.imports:
+                    error = f"Duplicate label {line.label}"  # the statement still takes its place
+                else:
+                    symbols[line.label] = location
+            if line.mnemonic == "END":
+                if error:
+                    yield LineError(lineno, error)
+                break
+            try:
+                if line.mnemonic == "ORG":
+                    location = parse_number(line.operand or "", 16, 0, ADDRESS_MASK)
+                elif line.mnemonic is not None:
+                    if location >= MEMORY_SIZE:
+                        raise ValueError(f"Module does not fit in {MEMORY_SIZE} words")
+                    location += 1
+            except ValueError as e:
+                error = error or str(e)
+            if error:
+                yield LineError(lineno, error)
+        for name, lineno in self.exports.items():
+            if name not in symbols:
+                yield LineError(lineno, f"ENTRY {name} is not a label of this module")
+
+    def second_pass(self, lines: Iterable[Tuple[int, str]]) -> Iterator[Record]:
+        """Encode every statement at its module-relative address, noting fix-ups."""
+        location = 0
+        for lineno, text in lines:
+            try:
+                line = parse_line(text)
+            except ValueError:
+                continue  # already reported by the first pass
+            mnemonic = line.mnemonic
+            if mnemonic is None or mnemonic in LINK_DIRECTIVES:
+                continue
+            if mnemonic == "END":
+                return
+            if mnemonic == "ORG":
+                try:
+                    location = parse_number(line.operand or "", 16, 0, ADDRESS_MASK)
+                except ValueError:
+                    pass
+                continue
+            if location >= MEMORY_SIZE:
+                continue
+            self._reference = None
+            try:
+                emit = self.encode(lineno, line, location)
+            except ValueError as e:
+                yield LineError(lineno, str(e))
+            else:
+                if self._reference is RELOCATE:
+                    self.relocations.append(location)
+                elif self._reference is not None:
+                    self.references.append([location, self._reference])
+                yield emit
+            location += 1
+
+    def resolve(self, operand: str) -> int:
+        """Return a module-relative label address, 0 for an import, or an absolute address."""
+        if operand in self.imports:
+            self._reference = operand
+            return 0
+        address = self.symbols.get(operand)
+        if address is not None:
+            self._reference = RELOCATE
+            return address
+        return super().resolve(operand)
+
+
+def assemble_module(
+    source_path: str,
+    assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE,
+    key: Optional[str] = None,
+) -> Tuple[Optional[ObjectModule], List[LineError]]:
+    """Assemble one module; return the object, or None and the errors."""
+    stat = os.stat(source_path)
+    if key is None:
+        key = source_key(source_path, assembly_to_machine, OBJECT_VERSION)
+    assembler = ObjectAssembler(assembly_to_machine)
+    words: Dict[int, int] = {}
+    errors = []
+    for record in assemble_lines(lambda: read_lines(source_path), assembly_to_machine, assembler):
+        if isinstance(record, Emit):
+            words[record.address] = int(record.text, 16)
+        else:
+            errors.append(record)
+    if errors:
+        return None, errors
+    image = [0] * (max(words) + 1 if words else 0)
+    for address, word in words.items():
+        image[address] = word
+    symbols = assembler.symbols
+    return ObjectModule(
+        source_path, key, [stat.st_size, stat.st_mtime_ns], image, assembler.relocations, assembler.references,
+        {name: symbols[name] for name in assembler.exports}, symbols,
+    ), []
+
+
+class LinkedImage(NamedTuple):
+    origin: int
+    words: array
+    symbols: Dict[str, int]  # exported symbol -> absolute address
+    bases: List[Tuple[str, int, int]]  # (source, base address, size) of every module
+
+    def map_lines(self) -> List[str]:
+        """Return a link map: where every module and exported symbol ended up."""
+        lines = [f"{base:03X}-{base + size - 1:03X}  {source}\n" for source, base, size in self.bases if size]
+        lines.extend(f"{address:03X}  {name}\n" for name, address in sorted(self.symbols.items(), key=lambda item: item[1]))
+        return lines
+
+
+def link(modules: Sequence[ObjectModule], origin: int = DEFAULT_ORIGIN) -> LinkedImage:
+    """Place ``modules`` one after another from ``origin`` and resolve their fix-ups."""
+    bases = []
+    base = origin
+    for module in modules:
+        bases.append(base)
+        base += module.size
+    if base > MEMORY_SIZE:
+        raise LinkError(f"Linked program needs {base - origin} words from {origin:03X} but memory ends at {MEMORY_SIZE - 1:03X}")
+    symbols: Dict[str, int] = {}
+    owners: Dict[str, str] = {}
+    for module, base in zip(modules, bases):
+        for name, offset in module.exports.items():
+            if name in symbols:
+                raise LinkError(f"{name} is exported by both {owners[name]} and {module.source}")
+            symbols[name] = base + offset
+            owners[name] = module.source
+    words = array("H")
+    missing = []
+    for module, base in zip(modules, bases):
+        code = array("H", module.words)
+        for offset in module.relocations:
+            word = code[offset]
+            code[offset] = (word & OPCODE_MASK) | ((word + base) & ADDRESS_MASK)
+        for offset, name in module.imports:
+            address = symbols.get(name)
+            if address is None:
+                missing.append(f"{module.source}: Undefined external symbol {name}")
+                continue
+            code[offset] = (code[offset] & OPCODE_MASK) | address
+        words.extend(code)
+    if missing:
+        raise LinkError("\n".join(missing))
+    return LinkedImage(origin, words, symbols, [(module.source, base, module.size) for module, base in zip(modules, bases)])
+
+
+def object_path(source_path: str, object_dir: Optional[str] = None) -> str:
+    """Return where the object file of ``source_path`` is kept."""
+    if source_path.endswith(OBJECT_EXTENSION):
+        return source_path
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    directory = object_dir if object_dir is not None else os.path.dirname(source_path)
+    return os.path.join(directory, stem + OBJECT_EXTENSION)
+
+
+def _current_object(source_path: str, object_file: str, assembly_to_machine: Dict[str, str]) -> Tuple[Optional[ObjectModule], str]:
+    """Return the object if it is up to date with its source (else None), and the source's key."""
+    try:
+        module = ObjectModule.read(object_file)
+    except (OSError, LinkError):
+        module = None
+    stat = os.stat(source_path)
+    if module is not None and module.stat == [stat.st_size, stat.st_mtime_ns]:
+        return module, module.key
+    key = source_key(source_path, assembly_to_machine, OBJECT_VERSION)
+    if module is not None and module.key == key:
+        return module, key
+    return None, key
+
+
+class ModuleResult(NamedTuple):
+    """What happened to one module of a build."""
+    source: str
+    object_path: str
+    ok: bool
+    errors: List[str]
+    assembled: bool  # False when the object file was up to date
+    seconds: float
+
+
+def _build_module(task: Tuple[str, str, str, Dict[str, str]]) -> Tuple[ModuleResult, Optional[ObjectModule]]:
+    """Assemble one stale module and write its object file."""
+    source_path, object_file, key, assembly_to_machine = task
+    start = time.perf_counter()
+    try:
+        module, errors = assemble_module(source_path, assembly_to_machine, key)
+        if module is not None:
+            module.write(object_file)
+        messages = [str(error) for error in errors[:MAX_ERRORS_PER_MODULE]]
+        if len(errors) > len(messages):
+            messages.append(f"... and {len(errors) - len(messages)} more errors")
+    except OSError as e:
+        module, messages = None, [str(e)]
+    return ModuleResult(source_path, object_file, module is not None, messages, True, time.perf_counter() - start), module
+
+
+class BuildSummary:
+    """The modules of one build and, if they all assembled and linked, the image."""
+
+    def __init__(self, results: List[ModuleResult], image: Optional[LinkedImage], error: Optional[str], seconds: float, link_seconds: float) -> None:
+        self.results = results
+        self.image = image
+        self.error = error  # why linking failed
+        self.seconds = seconds
+        self.link_seconds = link_seconds
+        self.failed = sum(1 for result in results if not result.ok)
+        self.assembled = sum(1 for result in results if result.assembled)
+
+    @property
+    def ok(self) -> bool:
+        return self.image is not None
+
+    def report(self) -> str:
+        """Return the build summary as text."""
+        modules = f"{len(self.results)} modules ({self.assembled} assembled, {self.failed} failed)"
+        if self.image is None:
+            return f"{modules}, not linked, in {self.seconds * 1000:.1f} ms"
+        image = self.image
+        end = image.origin + len(image.words) - 1
+        return (
+            f"{modules}, {len(image.words)} words at {image.origin:03X}-{end:03X}, "
+            f"linked in {self.link_seconds * 1000:.1f} ms, {self.seconds * 1000:.1f} ms in total"
+        )
+
+
+def build(
+    sources: Sequence[str],
+    target_path: str,
+    object_dir: Optional[str] = None,
+    origin: int = DEFAULT_ORIGIN,
+    jobs: Optional[int] = None,
+    assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE,
+    map_path: Optional[str] = None,
+) -> BuildSummary:
+    """Bring every module's object file up to date, then link them into ``target_path``.
+
+    Sources ending in ``.obj`` are linked as they are. The image is written
+    in the format implied by the extension of ``target_path``, and only if
+    every module assembled and linked.
+    """
+    start = time.perf_counter()
+    if object_dir is not None:
+        os.makedirs(object_dir, exist_ok=True)
+    objects = [object_path(source, object_dir) for source in sources]
+    if len(set(map(os.path.abspath, objects))) < len(objects):
+        raise ValueError("Two modules would share an object file; give them different names")
+    modules: List[Optional[ObjectModule]] = [None] * len(sources)
+    results: List[Optional[ModuleResult]] = [None] * len(sources)
+    stale = []
+    for index, (source, object_file) in enumerate(zip(sources, objects)):
+        begun = time.perf_counter()
+        try:
+            if source == object_file:
+                modules[index], key = ObjectModule.read(source), None
+            else:
+                modules[index], key = _current_object(source, object_file, assembly_to_machine)
+        except (OSError, LinkError) as e:
+            results[index] = ModuleResult(source, object_file, False, [str(e)], False, time.perf_counter() - begun)
+            continue
+        if modules[index] is None:
+            stale.append((index, (source, object_file, key, assembly_to_machine)))
+        else:
+            results[index] = ModuleResult(source, object_file, True, [], False, time.perf_counter() - begun)
+
+    tasks = [task for _, task in stale]
+    if jobs == 1 or len(tasks) <= 1:
+        built = [_build_module(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor  # deferred: it pulls in multiprocessing
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            built = list(executor.map(_build_module, tasks))
+    for (index, _), (result, module) in zip(stale, built):
+        results[index], modules[index] = result, module
+
+    image = error = None
+    link_seconds = 0.0
+    if all(result.ok for result in results):
+        linking = time.perf_counter()
+        try:
+            image = link(modules, origin)
+            write_image(target_path, image.words, image.origin)
+            if map_path:
+                with open(map_path, "w") as file:
+                    file.writelines(image.map_lines())
+        except (LinkError, OSError) as e:
+            image, error = None, str(e)
+        link_seconds = time.perf_counter() - linking
+    return BuildSummary(results, image, error, time.perf_counter() - start, link_seconds)
@@ -0,0 +1,61 @@
+"""Coalesced register and memory changes for live views.
+
+Conversions, runs and the debugger write registers and memory millions of
+times per second, far more often than a screen can show. ``LiveState``
+therefore adds nothing to those write paths. A view calls ``poll`` once per
+frame instead; it compares the current registers and memory with the
+snapshot of the previous poll and returns only what differs, as dirty sets.
+Any number of writes between two frames costs one comparison. Memory is
+compared in chunks first, so an unchanged 4096-word memory costs 64 slice
+comparisons.
+"""
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from mano.machine import MEMORY_SIZE
+
+LIVE_REGISTERS = ("AR", "PC", "DR", "AC", "IR", "E")
+CHUNK_WORDS = 64  # memory is compared in chunks before looking at single words
+
+
+class Changes(NamedTuple):
+    registers: Dict[str, int]  # register values traced by conversions
+    machine: Dict[str, int]  # register values of the simulator
+    dirty_registers: Set[str]  # names whose traced value changed
+    dirty_machine: Set[str]  # names whose simulator value changed
+    memory: array  # copy of the simulator's memory
+    dirty_words: Optional[List[int]]  # changed addresses; None after a new machine was loaded
+
+
+class LiveState:
+    """Snapshots of a session's registers and simulator, diffed once per frame."""
+
+    def __init__(self, session) -> None:
+        self.session = session
+        self._registers: Dict[str, int] = {}
+        self._machine_registers: Dict[str, int] = {}
+        self._machine = None
+        self._memory = array("H", bytes(2 * MEMORY_SIZE))
+
+    def poll(self) -> Optional[Changes]:
+        """Return what changed since the last poll, or None if nothing did."""
+        registers = dict(self.session.registers)
+        machine = self.session.machine
+        machine_registers = {name: getattr(machine, name) for name in LIVE_REGISTERS}
+        memory = array("H", machine.memory)
+        dirty_registers = {name for name, value in registers.items() if self._registers.get(name) != value}
+        dirty_machine = {name for name, value in machine_registers.items() if self._machine_registers.get(name) != value}
+        if machine is not self._machine:
+            dirty_words = None
+        else:
+            dirty_words = []
+            last = self._memory
+            for start in range(0, MEMORY_SIZE, CHUNK_WORDS):
+                end = start + CHUNK_WORDS
+                if memory[start:end] != last[start:end]:
+                    dirty_words.extend(address for address in range(start, end) if memory[address] != last[address])
+            if not dirty_registers and not dirty_machine and not dirty_words:
+                return None
+        self._registers, self._machine_registers = registers, machine_registers
+        self._machine, self._memory = machine, memory
+        return Changes(registers, machine_registers, dirty_registers, dirty_machine, memory, dirty_words)
@@ -0,0 +1,229 @@
+"""Lockstep simulation of many instances of one Mano program with NumPy.
+
+``LockstepMachine`` holds the registers of ``count`` machines as NumPy arrays
+with one element per instance and their memories as a ``(count, 4096)``
+array. Every step fetches, decodes and executes the current instruction of
+all running instances at once: instances are grouped by opcode with boolean
+masks, so instances whose PCs diverged simply fall into different groups,
+and halted instances drop out of the step. The opcodes and register-reference
+bits are taken from ``assembly_to_machine``. There are no devices here:
+an instance that reaches an input-output instruction stops and is marked in
+``failed``, like one that reaches an unsupported word.
+
+NumPy is required for this module only; it is imported when the first
+``LockstepMachine`` is created.
+"""
+from typing import Dict, Iterable
+
+from mano.image import image_format
+from mano.machine import ADDRESS_MASK, FLAG_NAMES, MEMORY_SIZE, REGISTER_NAMES, WORD_MASK, Machine, MachineError
+from mano.tables import ASSEMBLY_TO_MACHINE
+
+
+MEMORY_REFERENCE = ("AND", "ADD", "LDA", "STA", "BUN", "BSA", "ISZ")
+REGISTER_OPERATIONS = ("CLA", "CLE", "CMA", "CME", "CIR", "CIL", "INC")  # in execution order
+REGISTER_SKIPS = ("SPA", "SNA", "SZA", "SZE")
+HALT = "HLT"
+
+
+def _load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise MachineError("Lockstep simulation needs NumPy (pip install numpy)") from None
+    return numpy
+
+
+def instruction_set(assembly_to_machine: Dict[str, str]) -> Dict[str, int]:
+    """Map each mnemonic to its opcode (memory reference) or its register-reference bits."""
+    codes = {}
+    for mnemonic in MEMORY_REFERENCE + REGISTER_OPERATIONS + REGISTER_SKIPS + (HALT,):
+        try:
+            code = int(assembly_to_machine[mnemonic], 16)
+        except (KeyError, ValueError):
+            raise MachineError(f"Opcode table has no usable entry for {mnemonic}") from None
+        codes[mnemonic] = code & 7 if mnemonic in MEMORY_REFERENCE else code & ADDRESS_MASK
+    return codes
+
+
+class LockstepMachine:
+    """``count`` Mano machines that run the same program side by side."""
+
+    def __init__(self, count: int, assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE) -> None:
+        if count < 1:
+            raise MachineError("A lockstep run needs at least one instance")
+        np = self._np = _load_numpy()
+        self.count = count
+        self.codes = instruction_set(assembly_to_machine)
+        self.memory = np.zeros((count, MEMORY_SIZE), dtype=np.uint16)
+        for name in ("AC", "DR", "AR", "PC", "IR"):
+            setattr(self, name, np.zeros(count, dtype=np.int64))
+        self.E = np.zeros(count, dtype=np.int64)
+        self.I = np.zeros(count, dtype=np.int64)
+        self.running = np.ones(count, dtype=bool)
+        self.failed = np.zeros(count, dtype=bool)  # stopped on an input-output or unsupported instruction
+        self.steps = np.zeros(count, dtype=np.int64)
+
+    @classmethod
+    def from_machine(cls, machine: Machine, count: int, assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE) -> "LockstepMachine":
+        """Start ``count`` copies of ``machine``'s memory and registers."""
+        batch = cls(count, assembly_to_machine)
+        batch.memory[:] = batch._np.frombuffer(machine.memory, dtype=batch._np.uint16)
+        for name in ("AC", "DR", "AR", "PC", "IR", "E", "I"):
+            getattr(batch, name)[:] = getattr(machine, name)
+        return batch
+
+    @classmethod
+    def from_file(cls, file_path: str, count: int, assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE) -> "LockstepMachine":
+        """Load a machine code or image file into ``count`` instances."""
+        machine = Machine()
+        if image_format(file_path) == "text":
+            machine.load_file(file_path)  # keeps every @addr segment
+        else:
+            machine.load_image(file_path)
+        return cls.from_machine(machine, count, assembly_to_machine)
+
+    def load_words(self, words: Iterable[int], origin: int = 0) -> int:
+        """Store the same ``words`` from ``origin`` on in every instance and set PC."""
+        words = self._np.fromiter((word & WORD_MASK for word in words), dtype=self._np.uint16)
+        if origin + len(words) > MEMORY_SIZE:
+            raise MachineError(f"Program does not fit in {MEMORY_SIZE} words")
+        self.memory[:, origin:origin + len(words)] = words
+        self.PC[:] = origin
+        return len(words)
+
+    @property
+    def halted(self) -> bool:
+        return not self.running.any()
+
+    def step(self) -> int:
+        """Execute one instruction in every running instance; return how many ran."""
+        np, codes = self._np, self.codes
+        memory = self.memory.reshape(-1)  # a flat view: word a of instance i is at i * MEMORY_SIZE + a
+        rows = np.flatnonzero(self.running)
+        if not len(rows):
+            return 0
+        base = rows * MEMORY_SIZE
+        pc = self.PC[rows]
+        ir = memory[base + pc].astype(np.int64)
+        opcode = (ir >> 12) & 7
+        indirect = ir >> 15
+        address = ir & ADDRESS_MASK
+        register_reference = opcode == 7
+        pointer = (indirect == 1) & ~register_reference
+        if pointer.any():
+            address[pointer] = memory[base[pointer] + address[pointer]] & ADDRESS_MASK
+        next_pc = (pc + 1) & ADDRESS_MASK
+        self.IR[rows] = ir
+        self.I[rows] = pointer
+        self.AR[rows] = address
+        self.PC[rows] = next_pc
+
+        for mnemonic in MEMORY_REFERENCE:
+            selected = opcode == codes[mnemonic]
+            if not selected.any():
+                continue
+            group, target = rows[selected], base[selected] + address[selected]
+            if mnemonic in ("AND", "ADD", "LDA"):
+                value = memory[target].astype(np.int64)
+                self.DR[group] = value
+                if mnemonic == "AND":
+                    self.AC[group] &= value
+                elif mnemonic == "ADD":
+                    total = self.AC[group] + value
+                    self.AC[group] = total & WORD_MASK
+                    self.E[group] = total >> 16
+                else:
+                    self.AC[group] = value
+            elif mnemonic == "STA":
+                memory[target] = self.AC[group]
+            elif mnemonic == "BUN":
+                self.PC[group] = address[selected]
+            elif mnemonic == "BSA":
+                memory[target] = next_pc[selected]
+                self.PC[group] = (address[selected] + 1) & ADDRESS_MASK
+            else:  # ISZ
+                value = (memory[target].astype(np.int64) + 1) & WORD_MASK
+                self.DR[group] = value
+                memory[target] = value
+                self.PC[group] = (next_pc[selected] + (value == 0)) & ADDRESS_MASK
+
+        if register_reference.any():
+            unsupported = register_reference & (indirect == 1)
+            if unsupported.any():
+                self.failed[rows[unsupported]] = True
+                self.running[rows[unsupported]] = False
+                register_reference &= ~unsupported
+            self._register_reference(rows[register_reference], ir[register_reference] & ADDRESS_MASK)
+            self.steps[rows[~unsupported]] += 1
+        else:
+            self.steps[rows] += 1
+        return len(rows)
+
+    def _register_reference(self, group, bits) -> None:
+        codes = self.codes
+        AC, E = self.AC, self.E
+        for mnemonic in REGISTER_OPERATIONS:
+            selected = (bits & codes[mnemonic]) != 0
+            if not selected.any():
+                continue
+            rows = group[selected]
+            if mnemonic == "CLA":
+                AC[rows] = 0
+            elif mnemonic == "CLE":
+                E[rows] = 0
+            elif mnemonic == "CMA":
+                AC[rows] ^= WORD_MASK
+            elif mnemonic == "CME":
+                E[rows] ^= 1
+            elif mnemonic == "CIR":
+                ac = AC[rows]
+                AC[rows] = (ac >> 1) | (E[rows] << 15)
+                E[rows] = ac & 1
+            elif mnemonic == "CIL":
+                ac = AC[rows]
+                AC[rows] = ((ac << 1) & WORD_MASK) | E[rows]
+                E[rows] = ac >> 15
+            else:  # INC
+                AC[rows] = (AC[rows] + 1) & WORD_MASK
+        ac, e = AC[group], E[group]
+        skip = (
+            (((bits & codes["SPA"]) != 0) & ((ac & 0x8000) == 0))
+            | (((bits & codes["SNA"]) != 0) & ((ac & 0x8000) != 0))
+            | (((bits & codes["SZA"]) != 0) & (ac == 0))
+            | (((bits & codes["SZE"]) != 0) & (e == 0))
+        )
+        if skip.any():
+            self.PC[group[skip]] = (self.PC[group[skip]] + 1) & ADDRESS_MASK
+        halt = (bits & codes[HALT]) != 0
+        if halt.any():
+            self.running[group[halt]] = False
+
+    def run(self, max_steps: int = 100_000) -> int:
+        """Step until every instance stopped or ``max_steps`` steps; return the steps taken."""
+        for step in range(max_steps):
+            if not self.step():
+                return step
+        return max_steps
+
+    def machine(self, index: int) -> Machine:
+        """Return instance ``index`` as an ordinary ``Machine`` (a copy)."""
+        machine = Machine()
+        machine.memory[:] = type(machine.memory)("H", self.memory[index].tobytes())
+        for name in ("AC", "DR", "AR", "PC", "IR", "E", "I"):
+            setattr(machine, name, int(getattr(self, name)[index]))
+        machine.S = int(self.running[index])
+        machine.steps = int(self.steps[index])
+        return machine
+
+    def state(self, index: int) -> Dict[str, int]:
+        """Return every register and flip-flop of instance ``index`` by name."""
+        state = dict.fromkeys(REGISTER_NAMES + FLAG_NAMES, 0)
+        for name in ("AC", "DR", "AR", "PC", "IR", "E", "I"):
+            state[name] = int(getattr(self, name)[index])
+        state["S"] = int(self.running[index])
+        return state
+
+    def values(self, address: int) -> "numpy.ndarray":
+        """Return the word at ``address`` in every instance as a NumPy array."""
+        return self.memory[:, address].copy()
@@ -0,0 +1,405 @@
+"""Mano Basic Computer simulator with a 4096-word, 16-bit memory.
+
+Every 16-bit instruction word is decoded once into a ``(handler, address,
+indirect)`` entry of a 65536-entry table, so executing an instruction is one
+list index and one call instead of string parsing and dictionary lookups.
+``Machine.run_blocks`` goes further and runs whole basic blocks compiled to
+Python functions (see ``mano.blocks``).
+
+The input-output instructions work on INPR, OUTR and the FGI/FGO flags. A
+device bus attached with ``attach_devices`` (see ``mano.devices``) moves
+characters between those registers and its buffers. With IEN set, a raised
+flag starts the interrupt cycle after the next instruction, as in Mano's
+hardware: ``M[0] <- PC, PC <- 1, IEN <- 0``.
+"""
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from mano.image import HEX_ORIGIN, HEX_WORD, BinaryImage, ImageError, image_format, read_image
+from mano.pipeline import read_lines
+
+
+MEMORY_SIZE = 4096
+WORD_MASK = 0xFFFF
+ADDRESS_MASK = 0x0FFF
+SIGN_BIT = 0x8000
+CHARACTER_MASK = 0x00FF
+DEFAULT_STEP_LIMIT = 10_000_000
+
+REGISTER_NAMES = ("AR", "PC", "DR", "AC", "IR", "TR", "INPR", "OUTR", "E")
+FLAG_NAMES = ("I", "S", "R", "IEN", "FGI", "FGO")
+
+
+class MachineError(Exception):
+    """Raised when a program cannot be loaded or executed."""
+
+
+class Machine:
+    """Registers, flip-flops and memory of the Mano Basic Computer."""
+
+    __slots__ = ("memory",) + REGISTER_NAMES + FLAG_NAMES + ("steps", "devices", "_blocks")
+
+    def __init__(self) -> None:
+        self.memory = array("H", bytes(2 * MEMORY_SIZE))
+        self._blocks = None
+        self.devices = None
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear every register and flip-flop; memory is left untouched."""
+        for name in REGISTER_NAMES + FLAG_NAMES:
+            setattr(self, name, 0)
+        self.steps = 0
+
+    def clear_memory(self) -> None:
+        """Zero all 4096 memory words."""
+        self.memory = array("H", bytes(2 * MEMORY_SIZE))
+        self._blocks = None
+
+    def discard_blocks(self) -> None:
+        """Forget compiled blocks; call this after writing ``memory`` directly."""
+        self._blocks = None
+
+    def attach_devices(self, devices) -> None:
+        """Connect a device bus (see ``mano.devices``) to INPR, OUTR, FGI and FGO."""
+        self.devices = devices
+        devices.attach(self)
+
+    def interrupt(self) -> None:
+        """Run the interrupt cycle: save PC in word 0 and continue at address 1."""
+        self.memory[0] = self.PC
+        self.PC = 1
+        self.IEN = 0
+        self.R = 0
+
+    def load_words(self, words: Iterable[int], origin: int = 0) -> int:
+        """Store ``words`` from ``origin`` on and return how many were stored."""
+        self.discard_blocks()
+        address = origin
+        memory = self.memory
+        for word in words:
+            if address >= MEMORY_SIZE:
+                raise MachineError(f"Program does not fit in {MEMORY_SIZE} words")
+            memory[address] = word & WORD_MASK
+            address += 1
+        return address - origin
+
+    def load_lines(self, lines: Iterable[Tuple[int, str]], origin: int = 0) -> int:
+        """Load ``(line number, hex word)`` pairs as produced by ``read_lines``.
+
+        A line of the form ``@addr`` moves the load address, matching the ORG
+        markers written by the assembler. PC is set to the address of the
+        first word so execution starts at the program's origin. Returns the
+        number of words stored.
+        """
+        self.discard_blocks()
+        address = origin
+        memory = self.memory
+        stored = 0
+        for lineno, text in lines:
+            if text.startswith("@"):
+                address = int(text[1:], 16) if HEX_ORIGIN.fullmatch(text) else -1
+                if not 0 <= address < MEMORY_SIZE:
+                    raise MachineError(f"Line {lineno}: Invalid origin {text}")
+                continue
+            word = int(text, 16) if HEX_WORD.fullmatch(text) else -1
+            if word < 0:
+                raise MachineError(f"Line {lineno}: Invalid machine word {text}")
+            if address >= MEMORY_SIZE:
+                raise MachineError(f"Line {lineno}: Program does not fit in {MEMORY_SIZE} words")
+            if not stored:
+                self.PC = address
+            memory[address] = word
+            address += 1
+            stored += 1
+        return stored
+
+    def load_file(self, file_path: str, origin: int = 0) -> int:
+        """Load a machine code text file with one hex word per line."""
+        return self.load_lines(read_lines(file_path), origin)
+
+    def load_image(self, file_path: str) -> int:
+        """Load a text, binary or Intel HEX image and set PC to its origin."""
+        self.discard_blocks()
+        try:
+            if image_format(file_path) == "binary":
+                with BinaryImage(file_path) as image:
+                    origin, count = image.origin, len(image)
+                    self.memory[origin:origin + count] = array("H", image.words)
+            else:
+                origin, words = read_image(file_path)
+                count = len(words)
+                self.memory[origin:origin + count] = words
+        except ImageError as e:
+            raise MachineError(str(e)) from None
+        self.PC = origin
+        return count
+
+    def step(self) -> None:
+        """Fetch, decode and execute one instruction."""
+        self.run(1)
+
+    def run(self, max_steps: int = DEFAULT_STEP_LIMIT) -> int:
+        """Execute until HLT or ``max_steps`` and return the steps executed."""
+        self.discard_blocks()  # stores made here are not tracked for compiled blocks
+        memory = self.memory
+        decode = decode_table()
+        executed = 0
+        self.S = 1
+        while self.S and executed < max_steps:
+            if self.R:
+                self.interrupt()
+            enabled = self.IEN
+            pc = self.PC
+            ir = memory[pc]
+            handler, address, indirect = decode[ir]
+            self.IR = ir
+            self.I = indirect
+            self.PC = (pc + 1) & ADDRESS_MASK
+            if indirect:
+                address = memory[address] & ADDRESS_MASK
+            self.AR = address
+            handler(self, address)
+            executed += 1
+            if enabled and self.IEN and (self.FGI or self.FGO):
+                self.R = 1
+        self.steps += executed
+        return executed
+
+    def run_blocks(self, max_steps: int = DEFAULT_STEP_LIMIT) -> int:
+        """Like ``run``, but execute cached, compiled basic blocks."""
+        if self._blocks is None:
+            from mano.blocks import BlockCache  # deferred: mano.blocks imports this module
+
+            self._blocks = BlockCache(self)
+        return self._blocks.run(max_steps)
+
+    @property
+    def halted(self) -> bool:
+        return not self.S
+
+    def state(self) -> Dict[str, int]:
+        """Return every register and flip-flop by name."""
+        return {name: getattr(self, name) for name in REGISTER_NAMES + FLAG_NAMES}
+
+
+def _and(m: Machine, address: int) -> None:
+    m.DR = m.memory[address]
+    m.AC &= m.DR
+
+
+def _add(m: Machine, address: int) -> None:
+    m.DR = m.memory[address]
+    total = m.AC + m.DR
+    m.AC = total & WORD_MASK
+    m.E = total >> 16
+
+
+def _lda(m: Machine, address: int) -> None:
+    m.DR = m.memory[address]
+    m.AC = m.DR
+
+
+def _sta(m: Machine, address: int) -> None:
+    m.memory[address] = m.AC
+
+
+def _bun(m: Machine, address: int) -> None:
+    m.PC = address
+
+
+def _bsa(m: Machine, address: int) -> None:
+    m.memory[address] = m.PC
+    m.PC = (address + 1) & ADDRESS_MASK
+
+
+def _isz(m: Machine, address: int) -> None:
+    value = (m.memory[address] + 1) & WORD_MASK
+    m.DR = value
+    m.memory[address] = value
+    if value == 0:
+        m.PC = (m.PC + 1) & ADDRESS_MASK
+
+
+def _cla(m: Machine) -> None:
+    m.AC = 0
+
+
+def _cle(m: Machine) -> None:
+    m.E = 0
+
+
+def _cma(m: Machine) -> None:
+    m.AC ^= WORD_MASK
+
+
+def _cme(m: Machine) -> None:
+    m.E ^= 1
+
+
+def _cir(m: Machine) -> None:
+    ac = m.AC
+    m.AC = (ac >> 1) | (m.E << 15)
+    m.E = ac & 1
+
+
+def _cil(m: Machine) -> None:
+    ac = m.AC
+    m.AC = ((ac << 1) & WORD_MASK) | m.E
+    m.E = ac >> 15
+
+
+def _inc(m: Machine) -> None:
+    m.AC = (m.AC + 1) & WORD_MASK
+
+
+def _spa(m: Machine) -> bool:
+    return not m.AC & SIGN_BIT
+
+
+def _sna(m: Machine) -> bool:
+    return bool(m.AC & SIGN_BIT)
+
+
+def _sza(m: Machine) -> bool:
+    return m.AC == 0
+
+
+def _sze(m: Machine) -> bool:
+    return m.E == 0
+
+
+# Register-reference micro-operations by bit, in the order Mano lists them.
+REGISTER_OPERATIONS = (
+    (0x800, _cla),
+    (0x400, _cle),
+    (0x200, _cma),
+    (0x100, _cme),
+    (0x080, _cir),
+    (0x040, _cil),
+    (0x020, _inc),
+)
+REGISTER_SKIPS = (
+    (0x010, _spa),
+    (0x008, _sna),
+    (0x004, _sza),
+    (0x002, _sze),
+)
+HALT_BIT = 0x001
+
+MEMORY_REFERENCE_HANDLERS = (_and, _add, _lda, _sta, _bun, _bsa, _isz)
+
+
+def _register_reference(bits: int):
+    """Build the handler for one combination of register-reference bits."""
+    operations = tuple(op for bit, op in REGISTER_OPERATIONS if bits & bit)
+    skips = tuple(skip for bit, skip in REGISTER_SKIPS if bits & bit)
+    halt = bool(bits & HALT_BIT)
+
+    def execute(m: Machine, address: int) -> None:
+        for operation in operations:
+            operation(m)
+        for skip in skips:
+            if skip(m):
+                m.PC = (m.PC + 1) & ADDRESS_MASK
+                break
+        if halt:
+            m.S = 0
+
+    return execute
+
+
+def _inp(m: Machine) -> None:
+    m.AC = (m.AC & 0xFF00) | m.INPR
+    m.FGI = 0
+    if m.devices is not None:
+        m.devices.service(m)
+
+
+def _out(m: Machine) -> None:
+    m.OUTR = m.AC & CHARACTER_MASK
+    m.FGO = 0
+    if m.devices is not None:
+        m.devices.service(m)
+
+
+def _ski(m: Machine) -> bool:
+    if not m.FGI and m.devices is not None:
+        m.devices.wait_for_input(m)
+    return bool(m.FGI)
+
+
+def _sko(m: Machine) -> bool:
+    return bool(m.FGO)
+
+
+def _ion(m: Machine) -> None:
+    m.IEN = 1
+
+
+def _iof(m: Machine) -> None:
+    m.IEN = 0
+
+
+# Input-output instructions by bit; the word is 0xF000 plus these bits.
+IO_OPERATIONS = (
+    (0x800, _inp),
+    (0x400, _out),
+    (0x080, _ion),
+    (0x040, _iof),
+)
+IO_SKIPS = (
+    (0x200, _ski),
+    (0x100, _sko),
+)
+IO_BITS = 0xFC0
+
+
+def is_input_output(word: int) -> bool:
+    """Return True for the words of the input-output instructions (and their combinations)."""
+    return word >> 12 == 0xF and not word & ADDRESS_MASK & ~IO_BITS
+
+
+def _input_output(bits: int):
+    """Build the handler for one combination of input-output bits."""
+    operations = tuple(op for bit, op in IO_OPERATIONS if bits & bit)
+    skips = tuple(skip for bit, skip in IO_SKIPS if bits & bit)
+
+    def execute(m: Machine, address: int) -> None:
+        m.I = 1
+        for operation in operations:
+            operation(m)
+        for skip in skips:
+            if skip(m):
+                m.PC = (m.PC + 1) & ADDRESS_MASK
+                break
+
+    return execute
+
+
+def _unsupported(m: Machine, address: int) -> None:
+    raise MachineError(f"Unsupported instruction {m.IR:04X} at address {(m.PC - 1) & ADDRESS_MASK:03X}")
+
+
+_decode_table: Optional[List[tuple]] = None
+
+
+def decode_table() -> List[tuple]:
+    """Return the ``(handler, address, indirect)`` entry for every 16-bit word."""
+    global _decode_table
+    if _decode_table is None:
+        table: List[tuple] = []
+        for word in range(WORD_MASK + 1):
+            opcode = (word >> 12) & 7
+            indirect = word >> 15
+            address = word & ADDRESS_MASK
+            if opcode != 7:
+                table.append((MEMORY_REFERENCE_HANDLERS[opcode], address, indirect))
+            elif not indirect:
+                table.append((_register_reference(address), address, 0))
+            elif is_input_output(word):
+                table.append((_input_output(address), address, 0))
+            else:
+                table.append((_unsupported, address, 0))
+        _decode_table = table
+    return _decode_table
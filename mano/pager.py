@@ -0,0 +1,99 @@
+"""Random access to the lines of large text files.
+
+``LineIndex`` records the byte offset of every line start in one pass over the
+file, after which any window of lines is read with a single seek. The index
+can be refreshed cheaply when the file grows, which is what tail/follow modes
+rely on.
+"""
+import os
+from array import array
+from typing import List, Optional, Tuple
+
+
+READ_CHUNK_SIZE = 1 << 20
+
+
+class LineIndex:
+    """Byte offsets of the lines of one file."""
+
+    def __init__(self, file_path: str) -> None:
+        self.file_path = file_path
+        self.offsets = array("Q")
+        self._indexed = 0  # bytes covered by complete lines
+        self._size = 0
+        self._mtime = 0.0
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Index data appended since the last call; return True if anything changed.
+
+        A file that shrank or was rewritten in place is re-indexed from the
+        start.
+        """
+        stat = os.stat(self.file_path)
+        size = stat.st_size
+        if size == self._size and stat.st_mtime == self._mtime:
+            return False
+        self._mtime = stat.st_mtime
+        if size <= self._size:
+            self.offsets = array("Q")
+            self._indexed = 0
+        position = self._indexed
+        offsets = self.offsets
+        if len(offsets) and offsets[-1] >= position:
+            offsets.pop()  # the partial last line is indexed again below
+        with open(self.file_path, "rb") as file:
+            file.seek(position)
+            line_start = position
+            while True:
+                chunk = file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                find = chunk.find
+                index = find(b"\n")
+                base = position
+                while index != -1:
+                    offsets.append(line_start)
+                    line_start = base + index + 1
+                    index = find(b"\n", index + 1)
+                position += len(chunk)
+        self._indexed = line_start
+        if line_start < position:
+            offsets.append(line_start)
+        self._size = position
+        return True
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def read(self, start: int, count: int) -> List[str]:
+        """Return up to ``count`` lines beginning at zero-based line ``start``."""
+        total = len(self.offsets)
+        start = max(0, min(start, total))
+        end = min(total, start + max(0, count))
+        if start >= end:
+            return []
+        stop = self.offsets[end] if end < total else self._size
+        with open(self.file_path, "rb") as file:
+            file.seek(self.offsets[start])
+            data = file.read(stop - self.offsets[start])
+        return data.decode(errors="replace").splitlines()
+
+    def head(self, count: int) -> List[str]:
+        return self.read(0, count)
+
+    def tail(self, count: int) -> List[str]:
+        return self.read(len(self) - count, count)
+
+
+def parse_range(text: str) -> Tuple[int, Optional[int]]:
+    """Parse a one-based ``A:B`` (inclusive), ``A:`` or ``A`` line range."""
+    first, _, last = text.partition(":")
+    try:
+        start = int(first) if first else 1
+        end = int(last) if last else (None if _ else start)
+    except ValueError:
+        raise ValueError(f"Invalid line range {text!r}") from None
+    if start < 1 or (end is not None and end < start):
+        raise ValueError(f"Invalid line range {text!r}")
+    return start, end
@@ -0,0 +1,154 @@
+"""Streaming read -> translate -> write pipeline for the assembler.
+
+Every stage is a generator, so only one source line is held in memory at a
+time and output is written as soon as it is produced.
+"""
+import os
+import threading
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+
+MAX_REPORTED_ERRORS = 100
+WRITE_BUFFER_SIZE = 1 << 16
+PROGRESS_INTERVAL = 4096
+
+
+class Cancelled(Exception):
+    """Raised inside a pipeline whose ProgressMonitor was cancelled."""
+
+
+class ProgressMonitor:
+    """Progress reporting and cancellation for a pipeline on another thread.
+
+    ``read_lines`` calls ``update`` every PROGRESS_INTERVAL lines with the
+    characters read so far; ``callback`` receives the overall fraction done
+    across ``passes`` reads of the input.
+    """
+
+    def __init__(self, callback: Optional[Callable[[float], None]] = None, passes: int = 1) -> None:
+        self.callback = callback
+        self.passes = passes
+        self.current_pass = -1
+        self._cancel = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def start_pass(self) -> None:
+        self.current_pass = min(self.current_pass + 1, self.passes - 1)
+
+    def update(self, done: int, total: int) -> None:
+        """Report progress; raises Cancelled once ``cancel`` was called."""
+        if self._cancel.is_set():
+            raise Cancelled()
+        if self.callback is not None:
+            fraction = min(done / total, 1.0) if total else 1.0
+            self.callback((self.current_pass + fraction) / self.passes)
+
+
+class Emit(NamedTuple):
+    """One output line produced from one source line."""
+    lineno: int
+    text: str
+    ir: Optional[int] = None
+    ar: Optional[int] = None
+    address: Optional[int] = None
+
+
+class LineError(NamedTuple):
+    """A problem found on one source line."""
+    lineno: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"Line {self.lineno}: {self.message}"
+
+
+Record = Union[Emit, LineError]
+
+
+class PipelineResult:
+    """Counters and the first few errors of one pipeline run."""
+
+    def __init__(self, max_errors: int = MAX_REPORTED_ERRORS) -> None:
+        self.lines = 0
+        self.error_count = 0
+        self.errors: List[LineError] = []
+        self.max_errors = max_errors
+
+    @property
+    def ok(self) -> bool:
+        return self.error_count == 0
+
+    def add_error(self, error: LineError) -> None:
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(error)
+
+    def error_report(self) -> str:
+        """Return the collected errors as one message."""
+        report = "\n".join(f"Error: {error}" for error in self.errors)
+        hidden = self.error_count - len(self.errors)
+        if hidden:
+            report += f"\n... and {hidden} more errors"
+        return report
+
+
+def read_lines(file_path: str, monitor: Optional[ProgressMonitor] = None) -> Iterator[Tuple[int, str]]:
+    """Yield ``(line number, stripped text)`` for every non-blank line."""
+    with open(file_path, "r") as file:
+        if monitor is None:
+            for lineno, line in enumerate(file, 1):
+                text = line.strip()
+                if text:
+                    yield lineno, text
+            return
+        monitor.start_pass()
+        total = os.fstat(file.fileno()).st_size
+        done = 0
+        for lineno, line in enumerate(file, 1):
+            done += len(line)
+            if lineno % PROGRESS_INTERVAL == 0:
+                monitor.update(done, total)
+            text = line.strip()
+            if text:
+                yield lineno, text
+        monitor.update(total, total)
+
+
+def write_stream(
+    file_path: str,
+    records: Iterable[Record],
+    on_emit: Optional[Callable[[Emit], None]] = None,
+    max_errors: int = MAX_REPORTED_ERRORS,
+) -> PipelineResult:
+    """Write emitted lines to ``file_path`` as they arrive.
+
+    Output goes to a temporary file that replaces ``file_path`` only when no
+    line had an error, so a failed run leaves the previous output in place.
+    """
+    result = PipelineResult(max_errors)
+    temp_path = f"{file_path}.tmp"
+    try:
+        with open(temp_path, "w", buffering=WRITE_BUFFER_SIZE) as file:
+            write = file.write
+            for record in records:
+                result.lines += 1
+                if isinstance(record, LineError):
+                    result.add_error(record)
+                    continue
+                write(record.text + "\n")
+                if on_emit is not None:
+                    on_emit(record)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    if result.ok and result.lines:
+        os.replace(temp_path, file_path)
+    else:
+        os.remove(temp_path)
+    return result
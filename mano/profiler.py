@@ -0,0 +1,274 @@
+"""Execution profile of a guest program: where a Mano program spends its time.
+
+``Profile.run`` executes a machine like ``Machine.run`` and counts, in
+preallocated 4096-entry arrays, how often each address was executed, the
+clock cycles spent there, and for every branch how often it was taken.
+Skip instructions (``SPA``..``SZE``, ``SKI``, ``SKO``) and ``ISZ`` count as
+taken when they skip; ``BUN`` and ``BSA`` are always taken and also count an
+entry at their target.
+
+Cycle counts follow Mano's timing signals: every instruction spends T0-T2 on
+fetch and decode and T3 on the indirect fetch or on a register-reference or
+input-output instruction, which then ends. Memory-reference instructions
+continue from T4: ``STA`` and ``BUN`` end at T4, ``AND``, ``ADD``, ``LDA`` and
+``BSA`` at T5, ``ISZ`` at T6. The interrupt cycle takes RT0-RT2.
+
+Counts are mapped back to the assembly source with ``source_addresses``,
+which assembles the source again and records the address of every line.
+"""
+from array import array
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from mano.assembler import assemble_lines
+from mano.decoder import decode_table as text_table
+from mano.machine import ADDRESS_MASK, DEFAULT_STEP_LIMIT, MEMORY_SIZE, WORD_MASK, Machine, decode_table, is_input_output
+from mano.pipeline import Emit
+from mano.tables import ASSEMBLY_TO_MACHINE
+
+
+HOT_SPOT_ROWS = 20
+HEAT_WIDTH = 10
+
+# Clock cycles (T0 up to the last timing signal) by memory-reference opcode.
+MEMORY_REFERENCE_CYCLES = (6, 6, 6, 5, 5, 6, 7)  # AND ADD LDA STA BUN BSA ISZ
+REGISTER_REFERENCE_CYCLES = 4
+INPUT_OUTPUT_CYCLES = 4
+INTERRUPT_CYCLES = 3
+
+# Branch kinds by instruction word.
+NOT_A_BRANCH = 0
+SKIP = 1  # taken when the next instruction is skipped
+JUMP = 2  # BUN and BSA, always taken
+
+REGISTER_SKIP_BITS = 0x01E  # SPA SNA SZA SZE
+IO_SKIP_BITS = 0x300  # SKI SKO
+BUN_OPCODE = 4
+BSA_OPCODE = 5
+ISZ_OPCODE = 6
+
+HOT_SPOT_HEADERS = ["Address", "Word", "Instruction", "Count", "Share", "Cycles", "Taken", "Not taken", "Source"]
+LOOP_HEADERS = ["Loop", "Back edge", "Iterations", "Instructions", "Cycles", "Share"]
+LISTING_HEADERS = ["Line", "Address", "Count", "Cycles", "Taken", "Not taken", "Heat", "Source"]
+
+_tables: Optional[Tuple[bytes, bytes]] = None
+
+
+def timing_tables() -> Tuple[bytes, bytes]:
+    """Return the clock cycles and the branch kind of every 16-bit word."""
+    global _tables
+    if _tables is None:
+        cycles = bytearray(WORD_MASK + 1)
+        kinds = bytearray(WORD_MASK + 1)
+        for word in range(WORD_MASK + 1):
+            opcode = (word >> 12) & 7
+            if opcode != 7:
+                cycles[word] = MEMORY_REFERENCE_CYCLES[opcode]
+                if opcode == ISZ_OPCODE:
+                    kinds[word] = SKIP
+                elif opcode in (BUN_OPCODE, BSA_OPCODE):
+                    kinds[word] = JUMP
+            elif not word >> 15:
+                cycles[word] = REGISTER_REFERENCE_CYCLES
+                if word & REGISTER_SKIP_BITS:
+                    kinds[word] = SKIP
+            elif is_input_output(word):
+                cycles[word] = INPUT_OUTPUT_CYCLES
+                if word & IO_SKIP_BITS:
+                    kinds[word] = SKIP
+        _tables = bytes(cycles), bytes(kinds)
+    return _tables
+
+
+def heat_bar(value: int, peak: int, width: int = HEAT_WIDTH) -> str:
+    """Return a bar of up to ``width`` characters for ``value`` out of ``peak``."""
+    if not value or not peak:
+        return ""
+    return "#" * max(1, round(width * value / peak))
+
+
+def source_addresses(
+    open_lines: Callable[[], Iterable[Tuple[int, str]]],
+    assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE,
+) -> Dict[int, int]:
+    """Assemble a source and return the line number of the statement at each address.
+
+    Lines with errors are left out, so a listing can still be made of a
+    source that no longer assembles cleanly.
+    """
+    addresses = {}
+    for record in assemble_lines(open_lines, assembly_to_machine):
+        if isinstance(record, Emit) and record.address is not None:
+            addresses[record.address] = record.lineno
+    return addresses
+
+
+class Loop(NamedTuple):
+    start: int  # target of the back edge
+    end: int  # address of the BUN that jumps back
+    iterations: int
+    steps: int  # instructions executed from start to end
+    cycles: int
+
+
+class Profile:
+    """Per-address execution counts, cycles and branch outcomes of guest programs."""
+
+    def __init__(self) -> None:
+        self.counts = array("Q", bytes(8 * MEMORY_SIZE))
+        self.cycles = array("Q", bytes(8 * MEMORY_SIZE))
+        self.taken = array("Q", bytes(8 * MEMORY_SIZE))
+        self.not_taken = array("Q", bytes(8 * MEMORY_SIZE))
+        self.entries = array("Q", bytes(8 * MEMORY_SIZE))  # jumps arriving at each address
+        self.steps = 0
+        self.interrupts = 0
+
+    def reset(self) -> None:
+        for counter in (self.counts, self.cycles, self.taken, self.not_taken, self.entries):
+            counter[:] = array("Q", bytes(8 * MEMORY_SIZE))
+        self.steps = 0
+        self.interrupts = 0
+
+    @property
+    def total_cycles(self) -> int:
+        return sum(self.cycles) + INTERRUPT_CYCLES * self.interrupts
+
+    def run(self, machine: Machine, max_steps: int = DEFAULT_STEP_LIMIT) -> int:
+        """Execute like ``Machine.run`` while counting; return the steps executed."""
+        machine.discard_blocks()  # stores made here are not tracked for compiled blocks
+        memory = machine.memory
+        decode = decode_table()
+        timing, kinds = timing_tables()
+        counts, cycles, taken, not_taken, entries = self.counts, self.cycles, self.taken, self.not_taken, self.entries
+        executed = 0
+        machine.S = 1
+        try:
+            while machine.S and executed < max_steps:
+                if machine.R:
+                    machine.interrupt()
+                    self.interrupts += 1
+                enabled = machine.IEN
+                pc = machine.PC
+                ir = memory[pc]
+                handler, address, indirect = decode[ir]
+                machine.IR = ir
+                machine.I = indirect
+                following = machine.PC = (pc + 1) & ADDRESS_MASK
+                if indirect:
+                    address = memory[address] & ADDRESS_MASK
+                machine.AR = address
+                handler(machine, address)
+                executed += 1
+                counts[pc] += 1
+                cycles[pc] += timing[ir]
+                kind = kinds[ir]
+                if kind == SKIP:
+                    if machine.PC == following:
+                        not_taken[pc] += 1
+                    else:
+                        taken[pc] += 1
+                elif kind == JUMP:
+                    taken[pc] += 1
+                    entries[machine.PC] += 1
+                if enabled and machine.IEN and (machine.FGI or machine.FGO):
+                    machine.R = 1
+        finally:
+            machine.steps += executed
+            self.steps += executed
+        return executed
+
+    def hot_spots(
+        self,
+        memory: array,
+        limit: int = HOT_SPOT_ROWS,
+        lines: Optional[Dict[int, int]] = None,
+        texts: Optional[Dict[int, str]] = None,
+        assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE,
+    ) -> List[list]:
+        """Return the ``limit`` most expensive addresses as rows under ``HOT_SPOT_HEADERS``.
+
+        ``lines`` maps addresses to source line numbers (see
+        ``source_addresses``) and ``texts`` line numbers to source text.
+        """
+        total = self.total_cycles or 1
+        names = text_table(assembly_to_machine)
+        executed = [address for address in range(MEMORY_SIZE) if self.counts[address]]
+        executed.sort(key=lambda address: (-self.cycles[address], address))
+        rows = []
+        for address in executed[:limit]:
+            word = memory[address]
+            source = ""
+            if lines is not None and address in lines:
+                lineno = lines[address]
+                source = f"{lineno}: {texts[lineno]}" if texts is not None and lineno in texts else str(lineno)
+            rows.append([
+                f"{address:03X}",
+                f"{word:04X}",
+                names[word][0],
+                self.counts[address],
+                f"{100 * self.cycles[address] / total:.1f}%",
+                self.cycles[address],
+                *self._branches(address, word),
+                source,
+            ])
+        return rows
+
+    def _branches(self, address: int, word: int) -> Tuple[object, object]:
+        kind = timing_tables()[1][word]
+        if kind == SKIP:
+            return self.taken[address], self.not_taken[address]
+        if kind == JUMP:
+            return self.taken[address], ""
+        return "", ""
+
+    def loops(self, memory: array) -> List[Loop]:
+        """Return the loops closed by a direct backward ``BUN``, most expensive first."""
+        loops = []
+        for end in range(MEMORY_SIZE):
+            word = memory[end]
+            if not self.taken[end] or word >> 12 != BUN_OPCODE:
+                continue
+            start = word & ADDRESS_MASK
+            if start > end:
+                continue
+            loops.append(Loop(
+                start, end, self.taken[end], sum(self.counts[start:end + 1]), sum(self.cycles[start:end + 1])
+            ))
+        loops.sort(key=lambda loop: (-loop.cycles, loop.start))
+        return loops
+
+    def loop_rows(self, memory: array, limit: int = HOT_SPOT_ROWS) -> List[list]:
+        """Return the most expensive loops as rows under ``LOOP_HEADERS``."""
+        total = self.total_cycles or 1
+        return [
+            [f"{loop.start:03X}-{loop.end:03X}", f"{loop.end:03X}", loop.iterations, loop.steps, loop.cycles,
+             f"{100 * loop.cycles / total:.1f}%"]
+            for loop in self.loops(memory)[:limit]
+        ]
+
+    def listing(self, source: Iterable[Tuple[int, str]], lines: Dict[int, int], memory: array) -> List[list]:
+        """Annotate every source line with the counts at its address; rows under ``LISTING_HEADERS``."""
+        addresses = {lineno: address for address, lineno in lines.items()}
+        peak = max(self.cycles)
+        rows = []
+        for lineno, text in source:
+            address = addresses.get(lineno)
+            if address is None:
+                rows.append([lineno, "", "", "", "", "", "", text])
+                continue
+            rows.append([
+                lineno,
+                f"{address:03X}",
+                self.counts[address],
+                self.cycles[address],
+                *self._branches(address, memory[address]),
+                heat_bar(self.cycles[address], peak),
+                text,
+            ])
+        return rows
+
+    def summary(self) -> str:
+        """Return a one-line summary of the instructions and cycles counted."""
+        cycles = self.total_cycles
+        average = cycles / self.steps if self.steps else 0
+        interrupts = f", {self.interrupts} interrupts" if self.interrupts else ""
+        return f"{self.steps} instructions, {cycles} cycles ({average:.2f} per instruction){interrupts}"
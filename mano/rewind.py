@@ -0,0 +1,136 @@
+"""Step-wise execution that can step back, with compressed checkpoints.
+
+``Rewinder`` runs a ``Machine`` forward and saves a checkpoint every
+``interval`` steps: the registers plus the memory words that changed since
+the previous checkpoint, zlib-compressed. Every ``KEYFRAME_INTERVAL``-th
+checkpoint stores the whole memory instead, so restoring any checkpoint
+applies at most that many diffs. Stepping back or going to a step restores
+the nearest checkpoint at or before it and replays forward from there, which
+is deterministic as long as no devices are attached to the machine.
+"""
+import zlib
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from mano.machine import FLAG_NAMES, MEMORY_SIZE, REGISTER_NAMES, Machine
+from mano.pipeline import ProgressMonitor
+
+
+DEFAULT_INTERVAL = 1024
+KEYFRAME_INTERVAL = 64
+CHUNK_WORDS = 64  # memory is compared in chunks before looking at single words
+
+STATE_NAMES = REGISTER_NAMES + FLAG_NAMES
+
+
+class Checkpoint(NamedTuple):
+    step: int
+    registers: Tuple[int, ...]  # in STATE_NAMES order
+    keyframe: bool
+    data: bytes  # the whole memory, or (address, word) pairs of the changed words
+
+
+class Rewinder:
+    """A machine run that keeps checkpoints so it can be rewound."""
+
+    def __init__(self, machine: Machine, interval: int = DEFAULT_INTERVAL) -> None:
+        if interval < 1:
+            raise ValueError("Checkpoint interval must be at least 1")
+        self.machine = machine
+        self.interval = interval
+        self.checkpoints: List[Checkpoint] = []
+        self._steps = array("Q")
+        self._memory = array("H", machine.memory)  # memory at the last checkpoint
+        self.halted = False
+        self._checkpoint(keyframe=True)
+
+    @property
+    def step(self) -> int:
+        return self.machine.steps
+
+    def nbytes(self) -> int:
+        """Return the compressed size of all checkpoints."""
+        return sum(len(checkpoint.data) for checkpoint in self.checkpoints)
+
+    def _checkpoint(self, keyframe: bool = False) -> None:
+        machine = self.machine
+        if self._steps and machine.steps <= self._steps[-1]:
+            return  # already recorded on an earlier pass over these steps
+        current, last = machine.memory, self._memory
+        keyframe = keyframe or len(self.checkpoints) % KEYFRAME_INTERVAL == 0
+        if keyframe:
+            data = current.tobytes()
+        else:
+            changes = array("H")
+            for start in range(0, MEMORY_SIZE, CHUNK_WORDS):
+                end = start + CHUNK_WORDS
+                if current[start:end] != last[start:end]:
+                    for address in range(start, end):
+                        if current[address] != last[address]:
+                            changes.append(address)
+                            changes.append(current[address])
+            data = changes.tobytes()
+        registers = tuple(getattr(machine, name) for name in STATE_NAMES)
+        self.checkpoints.append(Checkpoint(machine.steps, registers, keyframe, zlib.compress(data)))
+        self._steps.append(machine.steps)
+        self._memory = array("H", current)
+
+    def _restore(self, index: int) -> None:
+        """Put the machine into the state of checkpoint ``index``."""
+        keyframe = index
+        while not self.checkpoints[keyframe].keyframe:
+            keyframe -= 1
+        memory = array("H")
+        memory.frombytes(zlib.decompress(self.checkpoints[keyframe].data))
+        for checkpoint in self.checkpoints[keyframe + 1:index + 1]:
+            changes = array("H")
+            changes.frombytes(zlib.decompress(checkpoint.data))
+            for position in range(0, len(changes), 2):
+                memory[changes[position]] = changes[position + 1]
+        machine = self.machine
+        checkpoint = self.checkpoints[index]
+        machine.memory[:] = memory
+        machine.discard_blocks()
+        for name, value in zip(STATE_NAMES, checkpoint.registers):
+            setattr(machine, name, value)
+        machine.steps = checkpoint.step
+        self.halted = index > 0 and machine.halted  # the first checkpoint is taken before the run
+
+    def forward(self, count: int = 1, monitor: Optional[ProgressMonitor] = None) -> int:
+        """Execute up to ``count`` steps, stopping at HLT; return the steps executed.
+
+        ``monitor`` is updated after every checkpoint interval, so a long run
+        can be cancelled (``Cancelled`` is raised) between two checkpoints.
+        """
+        machine = self.machine
+        executed = 0
+        while executed < count and not self.halted:
+            until_checkpoint = self.interval - machine.steps % self.interval
+            ran = machine.run_blocks(min(count - executed, until_checkpoint))
+            executed += ran
+            if machine.halted:
+                self.halted = True
+            if machine.steps % self.interval == 0 or self.halted:
+                self._checkpoint()
+            if not ran:
+                break
+            if monitor is not None:
+                monitor.update(executed, count)
+        return executed
+
+    def goto(self, step: int, monitor: Optional[ProgressMonitor] = None) -> int:
+        """Bring the machine to ``step`` (or to HLT, if that comes first); return the step reached."""
+        step = max(step, self._steps[0])
+        index = bisect_right(self._steps, step) - 1
+        if not self._steps[index] <= self.machine.steps <= step:
+            self._restore(index)
+        self.forward(step - self.machine.steps, monitor)
+        return self.machine.steps
+
+    def back(self, count: int = 1, monitor: Optional[ProgressMonitor] = None) -> int:
+        """Step back ``count`` steps; return the step reached."""
+        return self.goto(self.machine.steps - count, monitor)
+
+    def state(self) -> Dict[str, int]:
+        return self.machine.state()
@@ -0,0 +1,210 @@
+"""State shared by the CLI and GUI front ends.
+
+A ``Session`` owns the register file that conversions mirror emitted words
+into, the register log, the simulator and an optional build cache, and runs the
+conversions and programs on the standard work files. Front ends only turn the
+results into text, so there is a single hot path to optimize.
+"""
+from typing import TYPE_CHECKING, Callable, Dict, Optional
+
+from mano.cache import BuildCache, assemble_file
+from mano.decoder import disassemble_file
+from mano.machine import DEFAULT_STEP_LIMIT, Machine
+from mano.pipeline import Emit, PipelineResult, ProgressMonitor
+from mano.rewind import DEFAULT_INTERVAL, Rewinder
+from mano.tables import ASSEMBLY_TO_MACHINE
+from mano.trace_log import LOG_FULL, LOG_OFF, LOG_SUMMARY, RegisterLog, level_from_env
+
+if TYPE_CHECKING:
+    from mano.profiler import Profile
+
+
+ASSEMBLY_INPUT_FILE = "assembly_input.txt"
+MACHINE_OUTPUT_FILE = "machine_output.txt"
+MACHINE_INPUT_FILE = "machine_input.txt"
+ASSEMBLY_OUTPUT_FILE = "assembly_output.txt"
+LOG_FILE = "register_log.txt"
+WORK_FILES = (ASSEMBLY_INPUT_FILE, MACHINE_INPUT_FILE, MACHINE_OUTPUT_FILE, ASSEMBLY_OUTPUT_FILE)
+
+TRACE_REGISTERS = ("AR", "PC", "DR", "AC", "IR")
+RUN_SLICE = 100_000
+
+
+def register_recorder(registers: Dict[str, int], log: Optional[RegisterLog]) -> Callable[[Emit], None]:
+    """Return the ``on_emit`` callback that mirrors each word into ``registers`` and ``log``.
+
+    IR and AR are logged as updates at the full level and the PC increment at
+    the summary level; with logging off only the registers are updated.
+    """
+
+    def record_instruction(emit: Emit) -> None:
+        address = emit.address
+        if address is None:
+            return
+        ir, ar = emit.ir, emit.ar
+        if log is None or log.level == LOG_OFF:
+            if ir is not None:
+                registers["IR"] = ir
+            if ar is not None:
+                registers["AR"] = ar
+            registers["PC"] = (address + 1) & 0xFFF
+            return
+        record = log.record
+        if ir is not None:
+            registers["IR"] = ir
+            record(LOG_FULL, "UPDATE", "IR", ir, registers)
+        if ar is not None:
+            registers["AR"] = ar
+            record(LOG_FULL, "UPDATE", "AR", ar, registers)
+        pc = registers["PC"] = (address + 1) & 0xFFF
+        record(LOG_SUMMARY, "INCREMENT", "PC", pc, registers)
+
+    return record_instruction
+
+
+class Session:
+    """Registers, register log, simulator and build cache of one front end.
+
+    Interactive conversions reassemble every time unless a ``cache`` is
+    passed; the persistent cache is meant for batch runs.
+    """
+
+    def __init__(
+        self,
+        log_path: str = LOG_FILE,
+        log_level: Optional[int] = None,
+        assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE,
+        cache: Optional[BuildCache] = None,
+    ) -> None:
+        self.assembly_to_machine = assembly_to_machine
+        self.registers = dict.fromkeys(TRACE_REGISTERS, 0)
+        self.register_log = RegisterLog(log_path, level_from_env() if log_level is None else log_level)
+        self.machine = Machine()
+        self.build_cache = cache
+        self.record_instruction = register_recorder(self.registers, self.register_log)
+
+    def reset_files(self) -> None:
+        """Empty the work files and the register log."""
+        for file_path in WORK_FILES:
+            with open(file_path, "w") as file:
+                file.write("")
+        self.register_log.reset()
+
+    def log_register_operation(self, operation: str, register: str, value: int, level: int = LOG_FULL) -> None:
+        self.register_log.record(level, operation, register, value, self.registers)
+
+    def update_register(self, register: str, value: int) -> None:
+        """Set a register and log the update."""
+        self.registers[register] = value
+        self.log_register_operation("UPDATE", register, value)
+
+    def assemble(
+        self,
+        source_path: str = ASSEMBLY_INPUT_FILE,
+        target_path: str = MACHINE_OUTPUT_FILE,
+        monitor: Optional[ProgressMonitor] = None,
+        stats=None,
+        use_cache: bool = True,
+    ) -> PipelineResult:
+        """Assemble a source file, mirroring every word into the registers."""
+        return assemble_file(
+            source_path,
+            target_path,
+            self.assembly_to_machine,
+            self.build_cache if use_cache else None,
+            self.record_instruction,
+            monitor=monitor,
+            stats=stats,
+        )
+
+    def disassemble(
+        self,
+        source_path: str = MACHINE_INPUT_FILE,
+        target_path: str = ASSEMBLY_OUTPUT_FILE,
+        monitor: Optional[ProgressMonitor] = None,
+        stats=None,
+    ) -> PipelineResult:
+        """Disassemble a hex text file, mirroring every word into the registers."""
+        return disassemble_file(
+            source_path, target_path, self.assembly_to_machine, self.record_instruction, monitor=monitor, stats=stats
+        )
+
+    def run_program(
+        self,
+        image_path: str = MACHINE_OUTPUT_FILE,
+        max_steps: int = DEFAULT_STEP_LIMIT,
+        monitor: Optional[ProgressMonitor] = None,
+        devices=None,
+    ) -> int:
+        """Load and run an image on a fresh machine; return the instructions executed.
+
+        The program runs in slices so a monitor can report progress and cancel
+        it. ``devices`` is a ``mano.devices.DeviceBus`` for INP and OUT; the run
+        also ends when the program waits for input the bus does not have.
+        Afterwards the traced registers are updated from the machine.
+        """
+        self.machine = machine = Machine()
+        machine.load_file(image_path)
+        if devices is not None:
+            machine.attach_devices(devices)
+        executed = 0
+        while executed < max_steps:
+            executed += machine.run_blocks(min(RUN_SLICE, max_steps - executed))
+            if machine.halted:
+                break
+            if monitor is not None:
+                monitor.update(executed, max_steps)
+        self.sync_registers()
+        return executed
+
+    def profile_program(
+        self,
+        image_path: str = MACHINE_OUTPUT_FILE,
+        max_steps: int = DEFAULT_STEP_LIMIT,
+        monitor: Optional[ProgressMonitor] = None,
+        devices=None,
+    ) -> "Profile":
+        """Like ``run_program``, but count executions per address (see ``mano.profiler``)."""
+        from mano.profiler import Profile  # deferred: only needed when profiling
+
+        self.machine = machine = Machine()
+        machine.load_file(image_path)
+        if devices is not None:
+            machine.attach_devices(devices)
+        profile = Profile()
+        while profile.steps < max_steps:
+            profile.run(machine, min(RUN_SLICE, max_steps - profile.steps))
+            if machine.halted:
+                break
+            if monitor is not None:
+                monitor.update(profile.steps, max_steps)
+        self.sync_registers()
+        return profile
+
+    def run_with_devices(
+        self,
+        image_path: str = MACHINE_OUTPUT_FILE,
+        input_spec: Optional[str] = "-",
+        output_spec: Optional[str] = "-",
+        max_steps: int = DEFAULT_STEP_LIMIT,
+        devices=None,
+    ) -> int:
+        """Run an image with INP and OUT on streams such as stdin and stdout (see ``mano.devices``)."""
+        from mano.devices import run_on_streams  # deferred: asyncio is only needed here
+
+        self.machine = machine = Machine()
+        machine.load_file(image_path)
+        executed = run_on_streams(machine, input_spec, output_spec, max_steps, devices)
+        self.sync_registers()
+        return executed
+
+    def debug_program(self, image_path: str = MACHINE_OUTPUT_FILE, interval: int = DEFAULT_INTERVAL) -> Rewinder:
+        """Load an image on a fresh machine to step through it forward and back."""
+        self.machine = machine = Machine()
+        machine.load_file(image_path)
+        return Rewinder(machine, interval)
+
+    def sync_registers(self) -> None:
+        """Update and log the traced registers from the machine."""
+        for register in TRACE_REGISTERS:
+            self.update_register(register, getattr(self.machine, register))
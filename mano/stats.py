@@ -0,0 +1,197 @@
+"""Stage timers, counters and optional cProfile capture for conversions.
+
+Instrumentation is opt-in: every hook takes ``stats=None`` by default and the
+pipeline then runs exactly as before. With a ``Stats`` object, each stage's
+iterator or callback is wrapped so that the time spent inside it is measured
+with ``time.perf_counter``. Stages nest (the assembler pulls lines from the
+reader, the writer pulls records from the assembler), so every stage keeps its
+exclusive ("self") time with the time of nested stages subtracted.
+"""
+import json
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from mano.pipeline import Emit, PipelineResult
+
+
+PROFILE_ROWS = 20
+
+# Instruction classes counted from emitted words.
+MEMORY_REFERENCE = "memory-reference instructions"
+REGISTER_REFERENCE = "register-reference instructions"
+INPUT_OUTPUT = "input-output instructions"
+INDIRECT = "indirect instructions"
+DATA = "data words"
+DIRECTIVES = "directives"
+
+
+class Stats:
+    """Timings and counters of one conversion (or of several, merged)."""
+
+    def __init__(self, profile: bool = False) -> None:
+        self.stages: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.total = 0.0
+        self.profile_rows: List[list] = []
+        self._profiler = None
+        if profile:
+            import cProfile  # deferred: only needed when profiling
+
+            self._profiler = cProfile.Profile()
+        self._stack: List[list] = []
+        self._started = 0.0
+
+    def start(self) -> None:
+        """Start the wall clock (and the profiler, if enabled)."""
+        self._started = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.enable()
+
+    def stop(self) -> None:
+        """Stop the wall clock and collect the profile."""
+        if self._profiler is not None:
+            self._profiler.disable()
+            self.profile_rows = profile_rows(self._profiler)
+        self.total += time.perf_counter() - self._started
+
+    def _enter(self, stage: str) -> None:
+        self._stack.append([stage, time.perf_counter(), 0.0])
+
+    def _exit(self) -> None:
+        stage, started, nested = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed - nested
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the body of a ``with`` block as ``name``."""
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def timed(self, name: str, iterable: Iterable) -> Iterator:
+        """Yield from ``iterable``, timing each ``next()`` as stage ``name``."""
+        iterator = iter(iterable)
+        enter, leave = self._enter, self._exit
+        while True:
+            enter(name)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                leave()
+            yield item
+
+    def timed_call(self, name: str, function: Callable) -> Callable:
+        """Wrap ``function`` so every call is timed as stage ``name``."""
+        enter, leave = self._enter, self._exit
+
+        def call(*args, **kwargs):
+            enter(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                leave()
+
+        return call
+
+    def count(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def emit_hook(self, on_emit: Optional[Callable[[Emit], None]]) -> Callable[[Emit], None]:
+        """Count instruction classes and time ``on_emit`` (register logging) as "log"."""
+        counters = self.counters
+        log = self.timed_call("log", on_emit) if on_emit is not None else None
+
+        def hook(emit: Emit) -> None:
+            if emit.address is None:
+                name = DIRECTIVES
+            elif emit.ir is None:
+                name = DATA
+            elif emit.ir >> 12 == 0x7:
+                name = REGISTER_REFERENCE
+            elif emit.ir >> 12 == 0xF:
+                name = INPUT_OUTPUT
+            else:
+                name = MEMORY_REFERENCE
+                if emit.ir & 0x8000:
+                    counters[INDIRECT] = counters.get(INDIRECT, 0) + 1
+            counters[name] = counters.get(name, 0) + 1
+            if log is not None:
+                log(emit)
+
+        return hook
+
+    def add_result(self, result: PipelineResult) -> None:
+        """Count the lines and errors of a finished pipeline."""
+        self.count("lines", result.lines)
+        self.count("errors", result.error_count)
+
+    def merge(self, other: dict) -> None:
+        """Add the numbers of another ``to_dict()`` result to this one."""
+        self.total += other["total_seconds"]
+        for name, stage in other["stages"].items():
+            self.stages[name] = self.stages.get(name, 0.0) + stage["seconds"]
+            self.calls[name] = self.calls.get(name, 0) + stage["calls"]
+        for name, value in other["counters"].items():
+            self.count(name, value)
+        if other.get("profile"):
+            rows = {row[0]: row for row in self.profile_rows}
+            for function, calls, own, cumulative in other["profile"]:
+                row = rows.setdefault(function, [function, 0, 0.0, 0.0])
+                row[1] += calls
+                row[2] += own
+                row[3] += cumulative
+            self.profile_rows = sorted(rows.values(), key=lambda row: row[3], reverse=True)[:PROFILE_ROWS]
+
+    def to_dict(self) -> dict:
+        return {
+            "total_seconds": self.total,
+            "stages": {
+                name: {"seconds": seconds, "calls": self.calls.get(name, 0)}
+                for name, seconds in sorted(self.stages.items(), key=lambda item: item[1], reverse=True)
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "profile": self.profile_rows,
+        }
+
+    def write_json(self, file_path: str) -> None:
+        with open(file_path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    def stage_rows(self) -> List[list]:
+        """Rows of ``[stage, seconds, percent of total, calls]``, slowest first."""
+        total = self.total or sum(self.stages.values()) or 1e-9
+        rows = [
+            [name, f"{seconds:.4f}", f"{100 * seconds / total:.1f}%", self.calls.get(name, 0)]
+            for name, seconds in sorted(self.stages.items(), key=lambda item: item[1], reverse=True)
+        ]
+        other = self.total - sum(self.stages.values())
+        if self.total and other > 0:
+            rows.append(["other", f"{other:.4f}", f"{100 * other / total:.1f}%", ""])
+        rows.append(["total", f"{self.total:.4f}", "100.0%", ""])
+        return rows
+
+    def counter_rows(self) -> List[list]:
+        return [[name, value] for name, value in sorted(self.counters.items())]
+
+
+def profile_rows(profiler, limit: int = PROFILE_ROWS) -> List[list]:
+    """Return the top functions by cumulative time as ``[function, calls, tottime, cumtime]``."""
+    import pstats
+
+    data = pstats.Stats(profiler).stats
+    rows = [
+        [f"{pstats.func_std_string(function)}", calls, own, cumulative]
+        for function, (_, calls, own, cumulative, _) in data.items()
+    ]
+    rows.sort(key=lambda row: row[3], reverse=True)
+    return rows[:limit]
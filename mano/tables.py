@@ -0,0 +1,39 @@
+"""Instruction tables of the Mano Basic Computer.
+
+Memory-reference instructions map to their one-digit indirect opcode (8-E);
+the assembler and decoders keep only the low three bits (``& 7``), which give
+the direct opcode 0-6, and set bit 15 for ``I``. Register-reference and
+input-output instructions map to their full four-digit word.
+"""
+from typing import Dict
+
+
+ASSEMBLY_TO_MACHINE: Dict[str, str] = {
+    "AND": "8",
+    "ADD": "9",
+    "LDA": "A",
+    "STA": "B",
+    "BUN": "C",
+    "BSA": "D",
+    "ISZ": "E",
+    "CLA": "7800",
+    "CLE": "7400",
+    "CMA": "7200",
+    "CME": "7100",
+    "CIR": "7080",
+    "CIL": "7040",
+    "INC": "7020",
+    "SPA": "7010",
+    "SNA": "7008",
+    "SZA": "7004",
+    "SZE": "7002",
+    "HLT": "7001",
+    "INP": "F800",
+    "OUT": "F400",
+    "SKI": "F200",
+    "SKO": "F100",
+    "ION": "F080",
+    "IOF": "F040",
+}
+
+MACHINE_TO_ASSEMBLY: Dict[str, str] = {code: mnemonic for mnemonic, code in ASSEMBLY_TO_MACHINE.items()}
@@ -0,0 +1,150 @@
+"""Buffered, level-controlled JSON Lines sink for register operations."""
+import atexit
+import os
+import time
+from typing import Dict, Optional
+
+from mano.delta_trace import DeltaTrace
+
+
+LOG_OFF = 0
+LOG_SUMMARY = 1
+LOG_FULL = 2
+
+LOG_LEVELS = {
+    "off": LOG_OFF,
+    "summary": LOG_SUMMARY,
+    "full": LOG_FULL,
+}
+
+LOG_LEVEL_ENV = "MANO_LOG_LEVEL"
+DEFAULT_MAX_EVENTS = 4096
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_RETAIN_ROWS = 1 << 21
+FLUSH_CHECK_EVENTS = 64  # the flush clock is read once per this many events
+
+
+def parse_level(value) -> int:
+    """Turn a level name or number into one of the LOG_* constants."""
+    if isinstance(value, int):
+        if value not in LOG_LEVELS.values():
+            raise ValueError(f"Invalid log level {value}")
+        return value
+    name = str(value).strip().lower()
+    if name.isdigit():
+        return parse_level(int(name))
+    if name not in LOG_LEVELS:
+        raise ValueError(f"Invalid log level {value!r} (expected one of {', '.join(LOG_LEVELS)})")
+    return LOG_LEVELS[name]
+
+
+def level_name(level: int) -> str:
+    """Return the name of a LOG_* constant."""
+    for name, value in LOG_LEVELS.items():
+        if value == level:
+            return name
+    raise ValueError(f"Invalid log level {level}")
+
+
+def level_from_env(default: int = LOG_FULL) -> int:
+    """Read the log level from the MANO_LOG_LEVEL environment variable."""
+    value = os.environ.get(LOG_LEVEL_ENV)
+    if not value:
+        return default
+    try:
+        return parse_level(value)
+    except ValueError:
+        return default
+
+
+class RegisterLog:
+    """Collect register events in memory and append them to disk in bulk.
+
+    Events are kept in a columnar ``DeltaTrace`` and written as JSON Lines
+    once ``max_events`` are pending, once ``flush_interval`` seconds have
+    passed since the last write (checked every ``FLUSH_CHECK_EVENTS``
+    events), or at exit. Up to ``retain_rows`` rows stay
+    in memory after writing so ``registers_at`` can rebuild recent states.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        level: int = LOG_FULL,
+        max_events: int = DEFAULT_MAX_EVENTS,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        retain_rows: int = DEFAULT_RETAIN_ROWS,
+    ) -> None:
+        self.path = path
+        self.level = parse_level(level)
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        self.retain_rows = retain_rows
+        self.sequence = 0
+        self.bytes_written = 0
+        self.trace: Optional[DeltaTrace] = None
+        self._flushed_rows = 0
+        self._flushed_events = 0
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def set_level(self, level) -> None:
+        """Change the verbosity; pending events are kept."""
+        self.level = parse_level(level)
+
+    def record(self, level: int, operation: str, register: str, value: int, registers: Dict[str, int]) -> None:
+        """Buffer one event if ``level`` is enabled."""
+        if level > self.level or self.level == LOG_OFF:
+            return
+        trace = self.trace
+        if trace is None or trace.names != tuple(registers):
+            self.flush()
+            trace = self.trace = DeltaTrace(registers)
+            self._flushed_rows = self._flushed_events = 0
+        self.sequence += 1
+        trace.append(self.sequence, operation, register, value, registers)
+        pending = trace.events - self._flushed_events
+        if pending >= self.max_events or (
+            not pending % FLUSH_CHECK_EVENTS and time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Append all buffered events to the log file."""
+        self._last_flush = time.monotonic()
+        trace = self.trace
+        if trace is None or trace.events == self._flushed_events:
+            return
+        with open(self.path, "a") as log_file:
+            start = log_file.tell()
+            log_file.writelines(trace.json_lines(self._flushed_rows))
+            self.bytes_written += log_file.tell() - start
+        self._flushed_rows, self._flushed_events = len(trace), trace.events
+        if len(trace) > self.retain_rows:
+            trace.truncate()
+            self._flushed_rows = 0
+        trace.stamp()
+
+    def close(self) -> None:
+        """Write pending events and stop flushing this log at exit."""
+        self.flush()
+        atexit.unregister(self.flush)
+
+    def reset(self) -> None:
+        """Drop pending events and truncate the log file."""
+        self.trace = None
+        self._flushed_rows = self._flushed_events = 0
+        self.sequence = 0
+        with open(self.path, "w") as log_file:
+            log_file.write("")
+
+    def pending(self) -> int:
+        """Return the number of events waiting to be written."""
+        return self.trace.events - self._flushed_events if self.trace is not None else 0
+
+    def registers_at(self, step: int) -> Optional[Dict[str, int]]:
+        """Return the registers after event ``step``, if it is still held in memory."""
+        trace = self.trace
+        if trace is None or not len(trace) or step < trace.steps[0]:
+            return None
+        return trace.registers_at(step)
@@ -0,0 +1,278 @@
+"""Searchable register traces backed by a sidecar SQLite index.
+
+The JSON Lines register log stays the source of truth. ``TraceStore`` keeps an
+index next to it (``<log>.idx``) holding, for every event, its event number,
+register, value, the PC at that point and its one-minute timestamp bucket,
+keyed by the byte offset of the event in the log. The event number is the
+log's ``Step`` field: a per-log sequence number of register events (several
+per instruction), not an instruction count, and it restarts whenever another
+process appends to the same log. Queries select offsets from the index and
+read just those lines with a seek each. The index is brought up to date
+incrementally: only bytes appended since the last refresh are parsed, and a
+log that was truncated or rewritten is indexed again from scratch.
+"""
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from mano.pipeline import ProgressMonitor
+
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 3
+INSERT_BATCH = 10_000
+PROGRESS_INTERVAL = 4096
+FINGERPRINT_BYTES = 256
+BUCKET_LENGTH = len("YYYY-MM-DD HH:MM")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    offset INTEGER PRIMARY KEY,
+    sequence INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    register TEXT,
+    value INTEGER,
+    pc INTEGER,
+    bucket TEXT
+);
+"""
+
+META_SCHEMA = "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value);"
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS events_sequence ON events (sequence);
+CREATE INDEX IF NOT EXISTS events_register ON events (register, sequence);
+CREATE INDEX IF NOT EXISTS events_pc ON events (pc, sequence);
+CREATE INDEX IF NOT EXISTS events_bucket ON events (bucket, sequence);
+"""
+DROP_INDEXES = """
+DROP INDEX IF EXISTS events_sequence;
+DROP INDEX IF EXISTS events_register;
+DROP INDEX IF EXISTS events_pc;
+DROP INDEX IF EXISTS events_bucket;
+"""
+
+
+class TraceQuery:
+    """Filters for ``TraceStore.query``; unset fields match everything.
+
+    Event numbers (the log's ``Step`` field) are inclusive. ``since``/``until`` are timestamps as written in the
+    log ("YYYY-MM-DD HH:MM[:SS]") and match whole one-minute buckets.
+    """
+
+    def __init__(
+        self,
+        register: Optional[str] = None,
+        first_event: Optional[int] = None,
+        last_event: Optional[int] = None,
+        pc: Optional[int] = None,
+        value: Optional[int] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> None:
+        self.register = register.upper() if register else None
+        self.first_event = first_event
+        self.last_event = last_event
+        self.pc = pc
+        self.value = value
+        self.since = since
+        self.until = until
+
+    def where(self) -> Tuple[str, list]:
+        """Return the SQL condition and its parameters."""
+        clauses, parameters = [], []
+        for clause, parameter in (
+            ("register = ?", self.register),
+            ("sequence >= ?", self.first_event),
+            ("sequence <= ?", self.last_event),
+            ("pc = ?", self.pc),
+            ("value = ?", self.value),
+            ("bucket >= ?", self.since[:BUCKET_LENGTH] if self.since else None),
+            ("bucket <= ?", self.until[:BUCKET_LENGTH] if self.until else None),
+        ):
+            if parameter is not None:
+                clauses.append(clause)
+                parameters.append(parameter)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", parameters
+
+
+class TraceStore:
+    """A register log plus its sidecar index."""
+
+    def __init__(self, log_path: str, index_path: Optional[str] = None) -> None:
+        self.log_path = log_path
+        self.index_path = index_path or log_path + INDEX_SUFFIX
+        self.skipped = 0
+        import sqlite3  # deferred: only needed once a trace is searched
+
+        self._db = sqlite3.connect(self.index_path)
+        self._db.execute("PRAGMA synchronous = OFF")  # the index can always be rebuilt from the log
+        self._db.executescript(META_SCHEMA)
+        if self._meta("version") != INDEX_VERSION:
+            self._db.execute("DROP TABLE IF EXISTS events")  # an older layout is rebuilt from the log
+        self._db.executescript(SCHEMA + INDEXES)
+        if self._meta("version") != INDEX_VERSION:
+            self._clear()
+
+    def __enter__(self) -> "TraceStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _meta(self, key: str):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, values: Dict[str, object]) -> None:
+        self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", values.items())
+
+    def _clear(self) -> None:
+        with self._db:
+            self._db.execute("DELETE FROM events")
+            self._db.execute("DELETE FROM meta")
+            self._set_meta({"version": INDEX_VERSION, "indexed": 0, "fingerprint": ""})
+
+    def _fingerprint(self) -> str:
+        with open(self.log_path, "rb") as file:
+            return file.read(FINGERPRINT_BYTES).hex()
+
+    def refresh(self, monitor: Optional[ProgressMonitor] = None) -> int:
+        """Index events appended to the log since the last call; return how many."""
+        try:
+            size = os.path.getsize(self.log_path)
+            fingerprint = self._fingerprint()
+        except FileNotFoundError:
+            self._clear()
+            return 0
+        self.skipped = 0
+        indexed = self._meta("indexed") or 0
+        known = self._meta("fingerprint") or ""
+        if size < indexed or not fingerprint.startswith(known):
+            self._clear()
+            indexed = 0
+        if size == indexed:
+            return 0
+
+        if not indexed:
+            self._db.executescript(DROP_INDEXES)  # building them after a bulk load is much faster
+        added = 0
+        try:
+            with self._db, open(self.log_path, "rb") as file:
+                file.seek(indexed)
+                batch = []
+                for offset, length, event in self._events(file, indexed, size, monitor):
+                    batch.append(event_row(offset, length, event))
+                    if len(batch) >= INSERT_BATCH:
+                        added += self._insert(batch)
+                added += self._insert(batch)
+                self._set_meta({"indexed": self._indexed, "fingerprint": fingerprint})
+        finally:
+            self._db.executescript(INDEXES)
+        return added
+
+    def _insert(self, rows: List[tuple]) -> int:
+        self._db.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        count = len(rows)
+        rows.clear()
+        return count
+
+    def _events(self, file, position: int, size: int, monitor: Optional[ProgressMonitor]) -> Iterator[Tuple[int, int, dict]]:
+        """Yield complete, parseable events; a trailing partial line is left for later."""
+        self._indexed = position
+        loads = json.loads
+        for count, line in enumerate(file, 1):
+            if not line.endswith(b"\n"):
+                break
+            length = len(line)
+            try:
+                event = loads(line.decode())
+                int(event["Step"])
+            except (ValueError, KeyError, TypeError):
+                self.skipped += 1
+            else:
+                yield position, length, event
+            position += length
+            self._indexed = position
+            if monitor is not None and count % PROGRESS_INTERVAL == 0:
+                monitor.update(position, size)
+
+    def count(self, query: TraceQuery) -> int:
+        """Return the number of events matching ``query``."""
+        where, parameters = query.where()
+        return self._db.execute(f"SELECT COUNT(*) FROM events{where}", parameters).fetchone()[0]
+
+    def query(self, query: TraceQuery, limit: Optional[int] = None, offset: int = 0) -> List[dict]:
+        """Return matching events in log order, read from the log by offset."""
+        where, parameters = query.where()
+        sql = f"SELECT offset, length FROM events{where} ORDER BY offset"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            parameters += [limit, offset]
+        locations = self._db.execute(sql, parameters).fetchall()
+        if not locations:
+            return []
+        events = []
+        with open(self.log_path, "rb") as file:
+            for position, length in locations:
+                file.seek(position)
+                events.append(json.loads(file.read(length)))
+        return events
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+def event_row(offset: int, length: int, event: dict) -> tuple:
+    """Build the index row of one log event."""
+    registers = event.get("Registers") or {}
+    timestamp = event.get("Timestamp") or ""
+    return (
+        offset,
+        int(event["Step"]),
+        length,
+        event.get("Register"),
+        event.get("Value"),
+        registers.get("PC"),
+        timestamp[:BUCKET_LENGTH],
+    )
+
+
+def parse_event_range(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """Parse an inclusive ``A:B`` event number range where either end may be omitted."""
+    first, separator, last = text.partition(":")
+    try:
+        start = int(first.replace(",", "").replace("_", "")) if first else None
+        end = int(last.replace(",", "").replace("_", "")) if last else None
+    except ValueError:
+        raise ValueError(f"Invalid event range {text!r}") from None
+    if not separator:
+        end = start
+    if start is not None and end is not None and end < start:
+        raise ValueError(f"Invalid event range {text!r}")
+    return start, end
+
+
+EVENT_HEADERS = ["Event", "Timestamp", "Operation", "Register", "Value", "PC"]
+
+
+def _hex(value) -> str:
+    return f"{value:04X}" if isinstance(value, int) else str(value)
+
+
+def event_table(events: List[dict]) -> List[list]:
+    """Turn events into rows matching ``EVENT_HEADERS`` with values in hex."""
+    return [
+        [
+            event.get("Step"),
+            event.get("Timestamp"),
+            event.get("Operation"),
+            event.get("Register"),
+            _hex(event.get("Value")),
+            _hex((event.get("Registers") or {}).get("PC")),
+        ]
+        for event in events
+    ]
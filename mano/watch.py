@@ -0,0 +1,460 @@
+"""Watch an assembly source and reassemble only the lines that changed.
+
+``IncrementalAssembler`` keeps the state of both passes per source line: the
+parsed statement, the address it is stored at, its output word and its
+errors, plus the symbol table. ``update`` compares new source text with the
+last version by common prefix and suffix and then
+
+* parses only the lines in between,
+* moves the location counter on from the first changed line until it agrees
+  with the old addresses again (at the next ``ORG`` at the latest),
+* re-encodes the changed lines and every line that refers to a label whose
+  address changed.
+
+Every output line (``@100`` or ``2102``) has the same length, so the output
+file is patched in place when no output line was added or removed, and
+rewritten from the first moved line otherwise. As with a full conversion, the
+output file is left alone while the source has errors or produces no output.
+
+``SourceWatcher`` polls the source file's size and modification time and
+feeds every new version to the assembler. ``changed`` only looks at the file
+status, so a GUI can poll it on its own thread and reassemble elsewhere.
+"""
+import os
+import time
+from itertools import compress, count
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from mano.assembler import ADDRESS_MASK, MEMORY_SIZE, Assembler, SourceLine, parse_line, parse_number
+from mano.pipeline import MAX_REPORTED_ERRORS, LineError
+from mano.tables import ASSEMBLY_TO_MACHINE
+
+
+POLL_INTERVAL = 0.2
+COMPARE_CHUNK = 1 << 16  # characters compared at a time when looking for the changed region
+
+NONE, WORD, ORG, END = range(4)  # what a line does to the location counter
+
+FIT_ERROR = f"Program does not fit in {MEMORY_SIZE} words"
+RECORD_SIZE = 4 + len(os.linesep)  # "@100" or "2102" plus the newline text mode writes
+
+
+class Update(NamedTuple):
+    """What one call of ``IncrementalAssembler.update`` did."""
+    lines: int  # source lines that were parsed or encoded again
+    written: int  # output lines written to the target file
+    errors: List[LineError]
+    error_count: int
+    seconds: float
+    empty: bool = False  # the source produced no output, so the target was left alone
+
+    @property
+    def ok(self) -> bool:
+        return self.error_count == 0
+
+
+def _common_prefix(old: str, new: str) -> int:
+    """Return the length of the longest common prefix of two texts."""
+    limit = min(len(old), len(new))
+    start = 0
+    while start + COMPARE_CHUNK <= limit and old[start:start + COMPARE_CHUNK] == new[start:start + COMPARE_CHUNK]:
+        start += COMPARE_CHUNK
+    low, high = start, min(start + COMPARE_CHUNK, limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[start:middle] == new[start:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _common_suffix(old: str, new: str, limit: int) -> int:
+    """Return the length of the longest common suffix of two texts, at most ``limit``."""
+    old_size, new_size = len(old), len(new)
+    end = 0
+    while end + COMPARE_CHUNK <= limit and (
+        old[old_size - end - COMPARE_CHUNK:old_size - end] == new[new_size - end - COMPARE_CHUNK:new_size - end]
+    ):
+        end += COMPARE_CHUNK
+    low, high = end, min(end + COMPARE_CHUNK, limit)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if old[old_size - middle:old_size - end] == new[new_size - middle:new_size - end]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+class IncrementalAssembler:
+    """Both assembler passes over one source, kept up to date line by line."""
+
+    def __init__(self, target_path: str, assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE) -> None:
+        self.target_path = target_path
+        self.assembler = Assembler(assembly_to_machine)
+        self.symbols = self.assembler.symbols
+        self.source = ""  # the empty source has one blank line
+        self.texts: List[str] = [""]
+        self.parsed: List[Optional[SourceLine]] = [SourceLine(None, None, None, False)]
+        self.kinds: List[int] = [NONE]
+        self.origins: List[Optional[int]] = [None]
+        self.labels: List[Optional[str]] = [None]
+        self.operands: List[Optional[str]] = [None]  # operands of memory-reference instructions
+        self.locations: List[int] = [0]  # the location counter before each line
+        self.words: List[Optional[str]] = [None]  # output line of each statement, if any
+        self.pass_errors: List[Optional[str]] = [None]  # first-pass error of each line
+        self.encode_errors: List[Optional[str]] = [None]  # second-pass error of each line
+        self.definitions: Dict[str, List[int]] = {}  # label -> indexes of the lines defining it
+        self.duplicates: Set[str] = set()  # labels defined more than once before END
+        self.end = 1  # index of the END line, or the number of lines
+        self.ok = True
+        self._written = False  # whether the target file matches ``words``
+        self._count = 0  # output lines in the target file
+        self._region = (0, 0, 0)  # replaced lines of the last update and their old output count
+        self._end_moved: Optional[int] = None
+
+    # -- line <-> address map -------------------------------------------
+
+    def address(self, lineno: int) -> Optional[int]:
+        """Return the address the statement on ``lineno`` is stored at, if it emits a word."""
+        index = lineno - 1
+        if 0 <= index <= self.end and index < len(self.kinds) and self.kinds[index] == WORD:
+            location = self.locations[index]
+            return location if location < MEMORY_SIZE else None
+        return None
+
+    def lines_at(self, address: int) -> List[int]:
+        """Return the line numbers of every statement stored at ``address``."""
+        kinds, locations = self.kinds, self.locations
+        return [index + 1 for index in range(min(self.end + 1, len(kinds))) if kinds[index] == WORD and locations[index] == address]
+
+    # -- updating -------------------------------------------------------
+
+    def load(self, source: str) -> Update:
+        """Assemble ``source`` from scratch and write the whole target file."""
+        self.__init__(self.target_path, self.assembler.assembly_to_machine)
+        return self.update(source)
+
+    def update(self, source: str) -> Update:
+        """Bring the output up to date with the new ``source`` text."""
+        started = time.perf_counter()
+        old = self.source
+        if source == old:
+            return self._result(0, 0, started)
+        prefix = _common_prefix(old, source)
+        suffix = _common_suffix(old, source, min(len(old), len(source)) - prefix)
+        # Widen the changed characters to whole lines.
+        line_start = old.rfind("\n", 0, prefix) + 1
+        start = old.count("\n", 0, line_start)
+        old_end = old.find("\n", len(old) - suffix)
+        new_end = source.find("\n", len(source) - suffix)
+        old_stop = start + old.count("\n", line_start, len(old) if old_end < 0 else old_end) + 1
+        lines = source[line_start:len(source) if new_end < 0 else new_end].split("\n")
+        self.source = source
+        encode = self._replace(lines, start, old_stop)
+        written = self._write(encode)
+        return self._result(len(encode), written, started)
+
+    def _parse(self, index: int) -> None:
+        text = self.texts[index]
+        kind, origin, operand, error = NONE, None, None, None
+        try:
+            line = parse_line(text.strip())
+        except ValueError as e:
+            line, error = None, str(e)
+        else:
+            mnemonic = line.mnemonic
+            if mnemonic == "END":
+                kind = END
+            elif mnemonic == "ORG":
+                try:
+                    origin = parse_number(line.operand or "", 16, 0, ADDRESS_MASK)
+                    kind = ORG
+                except ValueError as e:
+                    error = str(e)
+            elif mnemonic is not None:
+                kind = WORD
+                if len(self.assembler.assembly_to_machine.get(mnemonic, "")) == 1:
+                    operand = line.operand
+        self.parsed[index] = line
+        self.kinds[index] = kind
+        self.origins[index] = origin
+        self.labels[index] = line.label if line is not None else None
+        self.operands[index] = operand
+        self.pass_errors[index] = error
+
+    def _replace(self, lines: List[str], start: int, old_stop: int) -> Set[int]:
+        """Replace lines ``start:old_stop`` by ``lines``; return the lines to encode."""
+        new_stop = start + len(lines)
+        shift = new_stop - old_stop
+        added = new_stop - start
+        affected = {label for label in self.labels[start:old_stop] if label}
+        old_end = self.end
+        if old_end >= old_stop:
+            old_end += shift
+        elif old_end >= start:
+            old_end = start  # the END line itself was replaced
+        self._region = (start, new_stop, self._output_count(self.words[start:min(old_stop, self.end + 1)]))
+
+        self.texts[start:old_stop] = lines
+        for values in (self.parsed, self.kinds, self.origins, self.labels, self.operands, self.pass_errors):
+            values[start:old_stop] = [None] * added
+        self.words[start:old_stop] = [None] * added
+        self.encode_errors[start:old_stop] = [None] * added
+        self.locations[start:old_stop] = [-1] * added  # never equal to a real location
+        for index in range(start, new_stop):
+            self._parse(index)
+
+        definitions = self.definitions
+        for label in affected:
+            definitions[label] = [index for index in definitions[label] if not start <= index < old_stop]
+        if shift:
+            for label, indexes in definitions.items():
+                if indexes and indexes[-1] >= old_stop:
+                    definitions[label] = [index + shift if index >= old_stop else index for index in indexes]
+        labels = self.labels
+        for index in range(start, new_stop):
+            label = labels[index]
+            if label:
+                indexes = definitions.setdefault(label, [])
+                indexes.append(index)
+                indexes.sort()
+                affected.add(label)
+
+        if old_end >= start:  # an END before the changed lines stays where it is
+            try:
+                self.end = self.kinds.index(END, start)
+            except ValueError:
+                self.end = len(self.texts)
+        encode = set(range(start, new_stop))
+        self._end_moved = None
+        if self.end != old_end:
+            low, high = sorted((old_end, self.end))
+            self._end_moved = low
+            affected.update(label for label in labels[low:high + 1] if label)
+            if self.end > old_end:
+                encode.update(range(old_end, min(self.end + 1, len(self.texts))))  # lines no longer cut off by END
+
+        encode.update(self._relocate(start, new_stop, affected))
+        changed = self._resolve(affected)
+        if changed:
+            encode.update(self._references(changed))
+        return {index for index in encode if index <= self.end}
+
+    def _relocate(self, start: int, new_stop: int, affected: Set[str]) -> List[int]:
+        """Recount addresses from ``start`` until they agree with the old ones again.
+
+        Adds the labels of every moved line to ``affected`` and returns the
+        lines that moved into or out of memory.
+        """
+        kinds, origins, labels, locations, pass_errors = self.kinds, self.origins, self.labels, self.locations, self.pass_errors
+        crossed = []
+        location = 0
+        if start:
+            previous = start - 1
+            location = locations[previous]
+            if kinds[previous] == ORG:
+                location = origins[previous]
+            elif kinds[previous] == WORD and location < MEMORY_SIZE:
+                location += 1
+        for index in range(start, len(kinds)):
+            old_location = locations[index]
+            if index >= new_stop and old_location == location:
+                break
+            locations[index] = location
+            if labels[index]:
+                affected.add(labels[index])
+            kind = kinds[index]
+            if kind == WORD:
+                fits = location < MEMORY_SIZE
+                if old_location >= 0 and fits != (old_location < MEMORY_SIZE):
+                    crossed.append(index)
+                pass_errors[index] = None if fits else FIT_ERROR
+                if fits:
+                    location += 1
+            elif kind == ORG:
+                location = origins[index]
+        return crossed
+
+    def _resolve(self, labels: Set[str]) -> Set[str]:
+        """Recompute the addresses of ``labels``; return those that changed."""
+        symbols, definitions, locations, end = self.symbols, self.definitions, self.locations, self.end
+        changed = set()
+        for label in labels:
+            indexes = definitions.get(label)
+            address = locations[indexes[0]] if indexes and indexes[0] <= end else None
+            if symbols.get(label) != address:
+                changed.add(label)
+                if address is None:
+                    del symbols[label]
+                else:
+                    symbols[label] = address
+            if indexes and len(indexes) > 1 and indexes[1] <= end:
+                self.duplicates.add(label)
+            else:
+                self.duplicates.discard(label)
+            if not indexes:
+                definitions.pop(label, None)
+        return changed
+
+    def _references(self, labels: Set[str]) -> List[int]:
+        """Return the lines whose operand is one of ``labels``."""
+        return list(compress(count(), map(labels.__contains__, self.operands)))
+
+    def _encode(self, index: int) -> None:
+        word = error = None
+        kind = self.kinds[index]
+        if kind == ORG:
+            word = f"@{self.origins[index]:03X}"
+        elif kind == WORD and self.locations[index] < MEMORY_SIZE:
+            try:
+                word = self.assembler.encode(index + 1, self.parsed[index], self.locations[index]).text
+            except ValueError as e:
+                error = str(e)
+        self.words[index] = word
+        self.encode_errors[index] = error
+
+    # -- output ---------------------------------------------------------
+
+    def _write(self, encode: Set[int]) -> int:
+        """Encode the lines in ``encode`` and bring the target file up to date."""
+        words = self.words
+        before = {index: words[index] for index in encode}
+        for index in encode:
+            self._encode(index)
+        if not self._check():
+            self._written = False
+            return 0
+        active = words[:self.end + 1]
+        if not self._output_count(active):
+            self._written = False
+            return 0
+        if not self._written or not self._target_intact():
+            return self._rewrite(active, 0)
+        start, stop, old_count = self._region
+        changed = [index for index in encode if not start <= index < stop and words[index] != before[index]]
+        changed += [index for index in range(start, min(stop, self.end + 1)) if words[index] is not None]
+        changed.sort()
+        # Output lines only keep their positions if none was added or removed before them.
+        moved = [index for index in changed if not start <= index < stop and (words[index] is None) != (before[index] is None)]
+        if self._output_count(active[start:stop]) != old_count:
+            moved.append(start)
+        if self._end_moved is not None:
+            moved.append(self._end_moved)
+        if moved:
+            return self._rewrite(active, min(moved + changed))
+        with open(self.target_path, "r+b") as file:
+            position = previous = 0
+            for index in changed:
+                position += self._output_count(active[previous:index])
+                previous = index
+                file.seek(position * RECORD_SIZE)
+                file.write((words[index] + os.linesep).encode())
+        return len(changed)
+
+    @staticmethod
+    def _output_count(words: List[Optional[str]]) -> int:
+        return len(words) - words.count(None)
+
+    def _target_intact(self) -> bool:
+        try:
+            return os.path.getsize(self.target_path) == self._count * RECORD_SIZE
+        except OSError:
+            return False
+
+    def _rewrite(self, active: List[Optional[str]], first: int) -> int:
+        """Rewrite the target file from the output line of source line ``first`` on."""
+        if not first:
+            mode, position = "wb", 0
+        else:
+            mode, position = "r+b", self._output_count(active[:first])
+        tail = os.linesep.join(filter(None, active[first:]))
+        if tail:
+            tail += os.linesep
+        with open(self.target_path, mode) as file:
+            file.seek(position * RECORD_SIZE)
+            file.write(tail.encode())
+            file.truncate()
+        written = len(tail) // RECORD_SIZE
+        self._count = position + written
+        self._written = True
+        return written
+
+    # -- results --------------------------------------------------------
+
+    def _check(self) -> bool:
+        end = self.end + 1
+        pass_errors, encode_errors = self.pass_errors[:end], self.encode_errors[:end]
+        self.ok = not self.duplicates and pass_errors.count(None) == len(pass_errors) == encode_errors.count(None)
+        return self.ok
+
+    def errors(self) -> List[LineError]:
+        """Return every error in the order a full assembly reports them."""
+        end = self.end
+        duplicates = {
+            index: label for label, indexes in self.definitions.items() for index in indexes[1:] if index <= end
+        }
+        first = [LineError(index + 1, f"Duplicate label {label}") for index, label in duplicates.items()]
+        # A line reports its duplicate label instead of any placement error.
+        first.extend(
+            LineError(index + 1, error) for index, error in enumerate(self.pass_errors[:end + 1])
+            if error and index not in duplicates
+        )
+        first.sort(key=lambda error: error.lineno)
+        second = [LineError(index + 1, error) for index, error in enumerate(self.encode_errors[:end + 1]) if error]
+        return first + second
+
+    def _result(self, lines: int, written: int, started: float, max_errors: int = MAX_REPORTED_ERRORS) -> Update:
+        errors = [] if self.ok else self.errors()
+        empty = self.ok and not self._output_count(self.words[:self.end + 1])
+        return Update(lines, written, errors[:max_errors], len(errors), time.perf_counter() - started, empty)
+
+
+class SourceWatcher:
+    """Reassemble ``source_path`` into ``target_path`` whenever it changes."""
+
+    def __init__(
+        self,
+        source_path: str,
+        target_path: str,
+        assembly_to_machine: Dict[str, str] = ASSEMBLY_TO_MACHINE,
+        interval: float = POLL_INTERVAL,
+    ) -> None:
+        self.source_path = source_path
+        self.interval = interval
+        self.assembler = IncrementalAssembler(target_path, assembly_to_machine)
+        self._signature = None
+
+    def _status(self) -> Optional[Tuple[int, int]]:
+        try:
+            status = os.stat(self.source_path)
+        except FileNotFoundError:
+            return None
+        return status.st_size, status.st_mtime_ns
+
+    def changed(self) -> bool:
+        """Return whether the source changed since it was last reassembled, without reading it."""
+        signature = self._status()
+        return signature is not None and signature != self._signature
+
+    def poll(self) -> Optional[Update]:
+        """Reassemble if the source changed since the last poll; return what was done."""
+        signature = self._status()
+        if signature is None or signature == self._signature:
+            return None
+        with open(self.source_path, "r") as file:
+            source = file.read()
+        first = self._signature is None
+        self._signature = signature
+        if first:
+            return self.assembler.load(source)
+        return self.assembler.update(source)
+
+    def watch(self, on_update, stop=None) -> None:
+        """Poll until ``stop()`` returns True, passing every ``Update`` to ``on_update``."""
+        while stop is None or not stop():
+            update = self.poll()
+            if update is not None:
+                on_update(update)
+            time.sleep(self.interval)
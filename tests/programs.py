@@ -0,0 +1,29 @@
+"""Random machine programs shared by the differential tests."""
+import random
+from typing import List
+
+REGISTER_BITS = (0x800, 0x400, 0x200, 0x100, 0x080, 0x040, 0x020, 0x010, 0x008, 0x004, 0x002)
+IO_BITS = (0x800, 0x400, 0x200, 0x100, 0x080, 0x040)
+HALT = 0x7001
+
+
+def random_words(rng: random.Random, size: int, io: bool = True) -> List[int]:
+    """Return ``size`` words of instructions and data whose addresses stay below ``size``.
+
+    Memory-reference operands point into the program itself, so stores often
+    overwrite instructions that already ran or are about to run.
+    """
+    words = []
+    for _ in range(size):
+        roll = rng.random()
+        if roll < 0.55:
+            words.append(rng.randrange(7) << 12 | rng.randrange(2) << 15 | rng.randrange(size))
+        elif roll < 0.8:
+            words.append(0x7000 | rng.choice(REGISTER_BITS))
+        elif roll < 0.85 and io:
+            words.append(0xF000 | rng.choice(IO_BITS))
+        elif roll < 0.88:
+            words.append(HALT)
+        else:
+            words.append(rng.randrange(0x10000) if io else rng.randrange(0x7000))
+    return words
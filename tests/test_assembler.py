@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from mano.assembler import Assembler, assemble_lines
+from mano.decoder import decode_words
+from mano.machine import Machine
+from mano.pipeline import Emit, LineError
+from mano.tables import ASSEMBLY_TO_MACHINE
+from programs import random_words
+
+
+def assemble(lines, assembler=None):
+    numbered = [(lineno, text.strip()) for lineno, text in enumerate(lines, 1) if text.strip()]
+    records = list(assemble_lines(lambda: numbered, ASSEMBLY_TO_MACHINE, assembler))
+    errors = [record for record in records if isinstance(record, LineError)]
+    words = [record.text for record in records if isinstance(record, Emit)]
+    return errors, words
+
+
+def test_textbook_program():
+    lines = [
+        "        ORG 100",
+        "LOP,    LDA PTR I   / load through the pointer",
+        "        ADD NUM",
+        "        STA SUM",
+        "        ISZ CTR",
+        "        BUN LOP",
+        "        HLT",
+        "PTR,    HEX 1F",
+        "NUM,    DEC -23",
+        "CTR,    DEC 65535",
+        "SUM,    HEX 0",
+        "        END",
+        "        garbage after END is never read",
+    ]
+    assembler = Assembler(ASSEMBLY_TO_MACHINE)
+    errors, words = assemble(lines, assembler)
+    assert errors == []
+    assert assembler.symbols == {"LOP": 0x100, "PTR": 0x106, "NUM": 0x107, "CTR": 0x108, "SUM": 0x109}
+    assert words == ["@100", "A106", "1107", "3109", "6108", "4100", "7001", "001F", "FFE9", "FFFF", "0000"]
+
+
+@pytest.mark.parametrize("line, message", [
+    ("1A, CLA", "Invalid label 1A"),
+    ("CLA 5", "CLA does not take an operand"),
+    ("LDA", "LDA needs an address operand"),
+    ("LDA NOWHERE", "Undefined symbol or invalid address NOWHERE"),
+    ("LDA 1000", "Undefined symbol or invalid address 1000"),
+    ("LDA 5 X", "Unexpected text after LDA: X"),
+    ("FOO", "Invalid instruction FOO"),
+    ("HEX", "HEX needs exactly one value"),
+    ("HEX 10000", "Invalid hexadecimal value 10000"),
+    ("DEC -32769", "Invalid decimal value -32769"),
+    ("ORG 1000", "Invalid hexadecimal value 1000"),
+])
+def test_errors_name_the_line(line, message):
+    errors, _ = assemble(["CLA", line, "HLT"])
+    assert errors == [LineError(2, message)]
+
+
+def test_duplicate_label_keeps_later_addresses():
+    assembler = Assembler(ASSEMBLY_TO_MACHINE)
+    errors, _ = assemble(["A, CLA", "A, INC", "B, HLT"], assembler)
+    assert errors == [LineError(2, "Duplicate label A")]
+    assert assembler.symbols == {"A": 0, "B": 2}
+
+
+def test_program_that_does_not_fit():
+    errors, words = assemble(["ORG FFF", "CLA", "INC", "HLT"])
+    assert errors == [LineError(3, "Program does not fit in 4096 words"), LineError(4, "Program does not fit in 4096 words")]
+    assert words == ["@FFF", "7800"]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_disassembled_words_assemble_back(seed):
+    rng = random.Random(seed)
+    words = random_words(rng, 256)
+    errors, texts = assemble(decode_words(words, ASSEMBLY_TO_MACHINE))
+    assert errors == []
+    assert [int(text, 16) for text in texts] == words
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_assembled_program_loads_into_memory(seed):
+    rng = random.Random(seed)
+    origin = rng.randrange(0x800)
+    words = random_words(rng, 128)
+    errors, texts = assemble([f"ORG {origin:X}", *decode_words(words, ASSEMBLY_TO_MACHINE), "END"])
+    assert errors == []
+    machine = Machine()
+    machine.load_lines(enumerate(texts, 1))
+    assert machine.memory[origin:origin + len(words)].tolist() == words
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from mano.batch import ASSEMBLE, DISASSEMBLE, expand_patterns, plan_tasks, run_batch
+from mano.cache import assemble_file
+from mano.image import read_image
+from mano.tables import ASSEMBLY_TO_MACHINE
+from mano.trace_log import LOG_FULL
+
+PROGRAMS = {
+    "add.asm": "ORG 100\nLDA A\nADD B\nSTA C\nHLT\nA, DEC 2\nB, DEC 3\nC, HEX 0\nEND\n",
+    "loop.asm": "LOP, ISZ CTR\nBUN LOP\nHLT\nCTR, DEC -5\nEND\n",
+    "broken.asm": "LDA NOWHERE\nFOO\nHLT\n",
+    "empty.asm": "/ nothing here\n",
+}
+
+
+@pytest.fixture
+def sources(tmp_path):
+    directory = tmp_path / "src"
+    directory.mkdir()
+    for name, text in PROGRAMS.items():
+        (directory / name).write_text(text)
+    return expand_patterns([str(directory / "*.asm")])
+
+
+def assembled(source, tmp_path):
+    target = str(tmp_path / "expected.txt")
+    result = assemble_file(source, target, ASSEMBLY_TO_MACHINE)
+    with open(target) as file:
+        return result, file.read()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch_matches_one_file_at_a_time(jobs, sources, tmp_path):
+    output = tmp_path / "out"
+    output.mkdir()
+    summary = run_batch(plan_tasks(ASSEMBLE, sources, str(output), ASSEMBLY_TO_MACHINE), jobs)
+    assert summary.files == 4 and summary.failed == 2
+    by_name = {os.path.basename(result.source): result for result in summary.results}
+    assert by_name["empty.asm"].errors == ["File is empty"]
+    assert by_name["broken.asm"].errors == ["Line 1: Undefined symbol or invalid address NOWHERE", "Line 2: Invalid instruction FOO"]
+    for name in ("add.asm", "loop.asm"):
+        result = by_name[name]
+        expected_result, expected = assembled(result.source, tmp_path)
+        assert result.ok and result.lines == expected_result.lines
+        with open(result.target) as file:
+            assert file.read() == expected
+    assert sorted(os.listdir(output)) == ["add.txt", "loop.txt"]
+
+
+@pytest.mark.parametrize("extension", [".bin", ".hex"])
+def test_batch_writes_images(extension, sources, tmp_path):
+    output = tmp_path / "out"
+    output.mkdir()
+    run_batch(plan_tasks(ASSEMBLE, sources, str(output), ASSEMBLY_TO_MACHINE, extension=extension), 1)
+    assert sorted(os.listdir(output)) == ["add" + extension, "loop" + extension]  # no temporary text files left
+    origin, words = read_image(str(output / ("add" + extension)))
+    assert origin == 0x100
+    assert words.tolist() == [0x2104, 0x1105, 0x3106, 0x7001, 2, 3, 0]
+
+
+def test_batch_disassembles(sources, tmp_path):
+    machine = tmp_path / "machine"
+    machine.mkdir()
+    run_batch(plan_tasks(ASSEMBLE, sources, str(machine), ASSEMBLY_TO_MACHINE), 1)
+    listings = tmp_path / "listings"
+    listings.mkdir()
+    summary = run_batch(plan_tasks(DISASSEMBLE, expand_patterns([str(machine / "*.txt")]), str(listings), ASSEMBLY_TO_MACHINE), 2)
+    assert summary.failed == 0 and summary.lines == 7 + 4
+    assert (listings / "loop.asm").read_text().split("\n")[:3] == ["ISZ 003", "BUN 000", "HLT"]
+
+
+def test_batch_logs_each_file(sources, tmp_path):
+    output = tmp_path / "out"
+    output.mkdir()
+    run_batch(plan_tasks(ASSEMBLE, sources, str(output), ASSEMBLY_TO_MACHINE, LOG_FULL), 2)
+    log = (output / "add.txt.log").read_text().splitlines()
+    assert len(log) == 3 * 3 + 2 + 3  # IR, AR and PC per memory-reference word, IR and PC for HLT, PC per data word
+    assert '"Step": 1,' in log[0]
+
+
+def test_plan_rejects_clashing_targets(tmp_path):
+    with pytest.raises(ValueError):
+        plan_tasks(ASSEMBLE, ["a/x.asm", "b/x.asm"], str(tmp_path), ASSEMBLY_TO_MACHINE)
+    with pytest.raises(ValueError):
+        plan_tasks(ASSEMBLE, [str(tmp_path / "x.txt")], None, ASSEMBLY_TO_MACHINE)
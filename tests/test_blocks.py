@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from mano.machine import Machine, MachineError
+from programs import random_words
+
+STEP_LIMIT = 3000
+
+
+def execute(words, engine, max_steps=STEP_LIMIT):
+    machine = Machine()
+    machine.load_words(words)
+    try:
+        executed, error = getattr(machine, engine)(max_steps), None
+    except MachineError as e:
+        executed, error = None, str(e)
+    return executed, error, machine.state(), machine.memory.tolist(), machine.steps
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_blocks_match_interpreter(seed):
+    words = random_words(random.Random(seed), 64)
+    assert execute(words, "run_blocks") == execute(words, "run")
+
+
+@pytest.mark.parametrize("max_steps", [1, 2, 3, 7, 50])
+def test_blocks_stop_on_the_same_step(max_steps):
+    words = random_words(random.Random(max_steps), 64, io=False)
+    assert execute(words, "run_blocks", max_steps) == execute(words, "run", max_steps)
+
+
+def test_store_into_the_running_block():
+    words = [
+        0x2005,  # LDA 005
+        0x3002,  # STA 002: replace the next instruction with HLT
+        0x7800,  # CLA, never executed
+        0x7001,  # HLT
+        0x0000,
+        0x7001,
+    ]
+    for engine in ("run", "run_blocks"):
+        executed, error, state, memory, _ = execute(words, engine)
+        assert error is None
+        assert (executed, state["PC"], state["AC"], memory[2]) == (3, 3, 0x7001, 0x7001)
+
+
+def test_store_into_a_cached_block():
+    words = [
+        0x7020,  # INC
+        0x6007,  # ISZ 007: counts up to zero, then skips
+        0x4004,  # BUN 004
+        0x7001,  # HLT
+        0x2008,  # LDA 008
+        0x3000,  # STA 000: replace the INC that starts the loop with CLE
+        0x4000,  # BUN 000
+        0xFFFC,  # counter
+        0x7400,  # CLE
+    ]
+    machine = Machine()
+    machine.load_words(words)
+    reference = execute(words, "run")
+    machine.run_blocks(STEP_LIMIT)
+    assert machine._blocks.invalidated
+    assert (machine.state(), machine.memory.tolist(), machine.steps) == reference[2:]
@@ -0,0 +1,98 @@
+import os
+import random
+
+from mano.assembler import assemble_lines
+from mano.cache import BuildCache, CacheEntry, assemble_file
+from mano.decoder import decode_words
+from mano.tables import ASSEMBLY_TO_MACHINE
+from programs import random_words
+
+
+def write_program(path, seed):
+    words = random_words(random.Random(seed), 200)
+    path.write_text("\n".join(["ORG 10", *decode_words(words, ASSEMBLY_TO_MACHINE), "END"]) + "\n")
+
+
+def build(source, target, cache):
+    emitted = []
+    result = assemble_file(str(source), str(target), ASSEMBLY_TO_MACHINE, cache, emitted.append)
+    return result, target.read_text() if target.exists() else None, emitted
+
+
+def test_hit_matches_fresh_assembly(tmp_path):
+    source = tmp_path / "program.asm"
+    write_program(source, 1)
+    cache = BuildCache(str(tmp_path / "cache"))
+    fresh = build(source, tmp_path / "fresh.txt", None)
+    miss = build(source, tmp_path / "miss.txt", cache)
+    hit = build(source, tmp_path / "hit.txt", cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    for result, text, emitted in (miss, hit):
+        assert result.ok and result.lines == fresh[0].lines
+        assert text == fresh[1]
+        assert emitted == fresh[2]
+
+
+def test_errors_are_cached_without_touching_the_output(tmp_path):
+    source = tmp_path / "program.asm"
+    source.write_text("CLA\nLDA NOWHERE\n")
+    target = tmp_path / "out.txt"
+    target.write_text("previous\n")
+    cache = BuildCache(str(tmp_path / "cache"))
+    first, _, _ = build(source, target, cache)
+    second, text, _ = build(source, target, cache)
+    assert cache.hits == 1
+    assert second.errors == first.errors and second.error_count == first.error_count == 1
+    assert text == "previous\n"
+
+
+def test_key_follows_contents_and_opcode_table(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    source = tmp_path / "program.asm"
+    source.write_text("CLA\n")
+    key = cache.key(str(source), ASSEMBLY_TO_MACHINE)
+    os.utime(source, (0, 0))
+    assert cache.key(str(source), ASSEMBLY_TO_MACHINE) == key
+    assert cache.key(str(source), {**ASSEMBLY_TO_MACHINE, "CLA": "7400"}) != key
+    source.write_text("CLE\n")
+    assert cache.key(str(source), ASSEMBLY_TO_MACHINE) != key
+
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    source = tmp_path / "program.asm"
+    write_program(source, 2)
+    cache = BuildCache(str(tmp_path / "cache"))
+    build(source, tmp_path / "first.txt", cache)
+    key = cache.key(str(source), ASSEMBLY_TO_MACHINE)
+    with open(cache._path(key), "wb") as file:
+        file.write(b"not zlib")
+    result, text, _ = build(source, tmp_path / "second.txt", cache)
+    assert cache.hits == 0 and result.ok
+    assert text == (tmp_path / "first.txt").read_text()
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = BuildCache(str(tmp_path / "cache"))
+    entry = CacheEntry([[1, "7800", 0x7800, None, 0]], {}, [], 0, 1)
+    size = len(entry.to_bytes())
+    cache.max_bytes = 3 * size
+    keys = [f"{index:064x}" for index in range(4)]
+    for when, key in enumerate(keys[:3]):
+        cache.put(key, entry)
+        os.utime(cache._path(key), (when, when))
+    assert cache.get(keys[0]) is not None  # now the most recently used
+    cache.put(keys[3], entry)
+    assert cache.size() == 3 * size
+    assert [cache.get(key) is not None for key in keys] == [True, False, True, True]
+
+
+def test_entry_keeps_symbols_and_addresses(tmp_path):
+    source = tmp_path / "program.asm"
+    source.write_text("ORG 20\nLOP, INC\nBUN LOP\nEND\n")
+    cache = BuildCache(str(tmp_path / "cache"))
+    build(source, tmp_path / "out.txt", cache)
+    entry = cache.get(cache.key(str(source), ASSEMBLY_TO_MACHINE))
+    assert entry.symbols == {"LOP": 0x20}
+    assert entry.addresses() == {2: 0x20, 3: 0x21}
+    numbered = list(enumerate(source.read_text().splitlines(), 1))
+    assert entry.emits() == list(assemble_lines(lambda: numbered, ASSEMBLY_TO_MACHINE))
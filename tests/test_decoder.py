@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from mano import decoder
+from mano.decoder import decode_lines, decode_table, decode_words, disassemble_file, disassemble_image, parse_words
+from mano.image import ImageError, read_text
+from mano.machine import Machine, MachineError
+from mano.pipeline import Emit, LineError
+from mano.tables import ASSEMBLY_TO_MACHINE, MACHINE_TO_ASSEMBLY
+from programs import random_words
+
+BAD_WORDS = ("0x1F", "+1F0", "1_F0", " 1F0", "12345", "1F", "G000")
+BAD_ORIGINS = ("@0x10", "@+10", "@1_0", "@1000", "@")
+
+
+def reference_decode(word):
+    """Decode one word straight from the opcode table, the way the table is meant to."""
+    code = f"{word:04X}"
+    if code in MACHINE_TO_ASSEMBLY:
+        return MACHINE_TO_ASSEMBLY[code]
+    opcode = (word >> 12) & 7
+    if opcode == 7:
+        return f"HEX {code}"
+    mnemonic = MACHINE_TO_ASSEMBLY[f"{opcode | 8:X}"]
+    return f"{mnemonic} {word & 0xFFF:03X}" + (" I" if word & 0x8000 else "")
+
+
+def test_table_matches_reference_for_every_word():
+    table = decode_table(ASSEMBLY_TO_MACHINE)
+    assert [entry[0] for entry in table] == [reference_decode(word) for word in range(0x10000)]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_decode_words_matches_table(use_numpy, monkeypatch):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(decoder, "_numpy", None)
+    words = random_words(random.Random(3), 2000)
+    assert decode_words(words, ASSEMBLY_TO_MACHINE) == [reference_decode(word) for word in words]
+
+
+def test_decode_lines_tracks_origins():
+    lines = list(enumerate(["@100", "7800", "A106", "@20", "0000"], 1))
+    assert list(decode_lines(lines, ASSEMBLY_TO_MACHINE)) == [
+        Emit(1, "ORG 100"),
+        Emit(2, "CLA", 0x7800, None, 0x100),
+        Emit(3, "LDA 106 I", 0xA106, 0x106, 0x101),
+        Emit(4, "ORG 020"),
+        Emit(5, "AND 000", 0x0000, 0x000, 0x20),
+    ]
+
+
+@pytest.mark.parametrize("text", BAD_WORDS)
+def test_every_reader_rejects_a_malformed_word(text, tmp_path):
+    assert list(decode_lines([(2, text)], ASSEMBLY_TO_MACHINE)) == [LineError(2, f"Invalid machine code {text}")]
+    with pytest.raises(ValueError):
+        parse_words(["7800", text])
+    with pytest.raises(MachineError):
+        Machine().load_lines([(1, text)])
+    path = tmp_path / "words.txt"
+    path.write_text(f"7800\n{text}\n")
+    if text.strip() != text:
+        return  # read_lines strips the line, so the word itself is fine there
+    with pytest.raises(ImageError):
+        read_text(str(path))
+
+
+@pytest.mark.parametrize("text", BAD_ORIGINS)
+def test_every_reader_rejects_a_malformed_origin(text, tmp_path):
+    assert list(decode_lines([(1, text)], ASSEMBLY_TO_MACHINE)) == [LineError(1, f"Invalid origin {text}")]
+    with pytest.raises(MachineError):
+        Machine().load_lines([(1, text)])
+    path = tmp_path / "words.txt"
+    path.write_text(f"{text}\n7800\n")
+    with pytest.raises(ImageError):
+        read_text(str(path))
+    with pytest.raises(ValueError):
+        disassemble_image(str(path), str(tmp_path / "out.asm"), ASSEMBLY_TO_MACHINE)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_disassembly_matches_streaming(seed, tmp_path):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(rng.randrange(1, 4)):
+        lines.append(f"@{rng.randrange(0x1000):03X}")
+        lines.extend(f"{word:04X}" for word in random_words(rng, rng.randrange(1, 200)))
+    source = tmp_path / "machine_input.txt"
+    source.write_text("\n".join(lines) + "\n")
+    streamed, batched = tmp_path / "streamed.asm", tmp_path / "batched.asm"
+    result = disassemble_file(str(source), str(streamed), ASSEMBLY_TO_MACHINE)
+    assert result.ok
+    count = disassemble_image(str(source), str(batched), ASSEMBLY_TO_MACHINE)
+    assert count == len(lines) - sum(line.startswith("@") for line in lines)
+    assert batched.read_text() == streamed.read_text()
@@ -0,0 +1,118 @@
+import json
+import random
+import time
+
+import pytest
+
+from mano.delta_trace import DeltaTrace
+from mano.trace_log import LOG_FULL, LOG_SUMMARY, RegisterLog
+
+NAMES = ("AR", "PC", "DR", "AC", "IR")
+NOW = 1_700_000_000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(time, "time", lambda: NOW)
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(NOW))
+
+
+def random_events(rng, count):
+    """Yield (operation, register, value, registers) with some registers changing silently."""
+    registers = dict.fromkeys(NAMES, 0)
+    for _ in range(count):
+        if rng.random() < 0.2:
+            registers[rng.choice(NAMES)] = rng.randrange(0x10000)
+        register = rng.choice(NAMES)
+        registers[register] = value = rng.randrange(0x10000)
+        yield rng.choice(("UPDATE", "INCREMENT", "CLEAR")), register, value, registers
+
+
+def reference_line(step, timestamp, operation, register, value, registers):
+    event = {
+        "Step": step, "Timestamp": timestamp, "Operation": operation,
+        "Register": register, "Value": value, "Registers": dict(registers),
+    }
+    return json.dumps(event) + "\n"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_json_lines_match_json_dumps(seed, clock):
+    rng = random.Random(seed)
+    trace = DeltaTrace(NAMES, checkpoint_interval=7)
+    expected, starts = [], []
+    for step, (operation, register, value, registers) in enumerate(random_events(rng, 300), 1):
+        starts.append(len(trace))
+        trace.append(step, operation, register, value, registers)
+        expected.append(reference_line(step, clock, operation, register, value, registers))
+    assert trace.events == 300
+    assert list(trace.json_lines()) == expected
+    for _ in range(10):
+        start = rng.randrange(len(starts))
+        stop = rng.randrange(start, len(starts))
+        assert list(trace.json_lines(starts[start], starts[stop])) == expected[start:stop]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_registers_at_matches_replay(seed):
+    rng = random.Random(seed)
+    trace = DeltaTrace(NAMES, checkpoint_interval=5)
+    history = []
+    for step, (operation, register, value, registers) in enumerate(random_events(rng, 200), 1):
+        trace.append(step, operation, register, value, registers)
+        history.append(dict(registers))
+    for step in range(1, 201):
+        assert trace.registers_at(step) == history[step - 1]
+
+
+def test_stamp_applies_from_the_next_event(clock):
+    trace = DeltaTrace(NAMES)
+    registers = dict.fromkeys(NAMES, 0)
+    trace.append(1, "UPDATE", "AC", 0, registers)
+    trace.stamp(NOW + 60)
+    trace.append(2, "UPDATE", "AC", 0, registers)
+    later = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(NOW + 60))
+    assert [json.loads(line)["Timestamp"] for line in trace.json_lines()] == [clock, later]
+
+
+def test_truncate_keeps_the_register_file(clock):
+    trace = DeltaTrace(NAMES)
+    registers = dict.fromkeys(NAMES, 0)
+    registers["PC"] = 5
+    trace.append(1, "UPDATE", "PC", 5, registers)
+    trace.truncate()
+    assert len(trace) == 0
+    registers["AC"] = 9
+    trace.append(2, "UPDATE", "AC", 9, registers)
+    assert list(trace.json_lines()) == [reference_line(2, clock, "UPDATE", "AC", 9, registers)]
+
+
+def test_unknown_register_is_rejected():
+    with pytest.raises(ValueError):
+        DeltaTrace(NAMES).append(1, "UPDATE", "XR", 0, dict.fromkeys(NAMES, 0))
+
+
+@pytest.mark.parametrize("max_events, retain_rows", [(1, 1 << 21), (7, 10), (4096, 1 << 21)])
+def test_register_log_writes_every_event_once(max_events, retain_rows, tmp_path, clock):
+    path = tmp_path / "register_log.txt"
+    log = RegisterLog(str(path), LOG_FULL, max_events=max_events, retain_rows=retain_rows)
+    expected = []
+    for step, (operation, register, value, registers) in enumerate(random_events(random.Random(4), 250), 1):
+        log.record(LOG_FULL, operation, register, value, registers)
+        expected.append(reference_line(step, clock, operation, register, value, registers))
+        if step == 100 and retain_rows > 1000:
+            assert log.registers_at(step) == registers
+    log.close()
+    assert log.pending() == 0
+    assert path.read_text().splitlines(keepends=True) == expected
+    assert log.bytes_written == path.stat().st_size
+
+
+def test_register_log_levels(tmp_path):
+    path = tmp_path / "register_log.txt"
+    log = RegisterLog(str(path), LOG_SUMMARY)
+    registers = dict.fromkeys(NAMES, 0)
+    log.record(LOG_FULL, "UPDATE", "AC", 1, registers)
+    log.record(LOG_SUMMARY, "INCREMENT", "PC", 1, registers)
+    log.close()
+    assert [json.loads(line)["Operation"] for line in path.read_text().splitlines()] == ["INCREMENT"]
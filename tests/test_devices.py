@@ -0,0 +1,24 @@
+from mano.assembler import assemble_lines
+from mano.devices import image_uses_devices
+from mano.pipeline import read_lines, write_stream
+from mano.tables import ASSEMBLY_TO_MACHINE
+
+
+def assemble(tmp_path, name, source):
+    source_path, image_path = tmp_path / f"{name}.asm", tmp_path / f"{name}.txt"
+    source_path.write_text(source)
+    write_stream(str(image_path), assemble_lines(lambda: read_lines(str(source_path)), ASSEMBLY_TO_MACHINE))
+    return str(source_path), str(image_path)
+
+
+def test_input_output_data_words_do_not_count(tmp_path):
+    source, image = assemble(tmp_path, "data", "ORG 100\nLDA X\nHLT\nX, HEX F800\nEND\n")
+    assert not image_uses_devices(image, source)
+    assert image_uses_devices(image)  # without the source every F800 word counts
+
+
+def test_input_output_instructions_count(tmp_path):
+    source, image = assemble(tmp_path, "echo", "ORG 100\nSKI\nBUN 100\nINP\nHLT\nEND\n")
+    other, _ = assemble(tmp_path, "data", "ORG 100\nLDA X\nHLT\nX, HEX F800\nEND\n")
+    assert image_uses_devices(image, source)
+    assert image_uses_devices(image, other)  # a source that does not match the image is not trusted
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from mano.image import (
+    HEADER, MAGIC, MEMORY_SIZE, VERSION, BinaryImage, ImageError, convert_image, read_image, read_intel_hex,
+    write_binary, write_image,
+)
+from mano.machine import Machine, MachineError
+
+EXTENSIONS = (".bin", ".hex", ".txt")
+
+
+def random_image(rng):
+    origin = rng.randrange(MEMORY_SIZE)
+    count = rng.randrange(1, MEMORY_SIZE - origin + 1)
+    return origin, [rng.randrange(0x10000) for _ in range(count)]
+
+
+@pytest.mark.parametrize("extension", EXTENSIONS)
+@pytest.mark.parametrize("seed", range(5))
+def test_round_trip(extension, seed, tmp_path):
+    origin, words = random_image(random.Random(seed))
+    path = str(tmp_path / f"program{extension}")
+    write_image(path, words, origin)
+    read_origin, read_words = read_image(path)
+    assert (read_origin, read_words.tolist()) == (origin, words)
+    machine = Machine()
+    assert machine.load_image(path) == len(words)
+    assert machine.PC == origin
+    assert machine.memory[origin:origin + len(words)].tolist() == words
+
+
+@pytest.mark.parametrize("source", EXTENSIONS)
+@pytest.mark.parametrize("target", EXTENSIONS)
+def test_convert_between_formats(source, target, tmp_path):
+    origin, words = 0x100, [0x0000, 0x7800, 0xFFFF, 0x0000]
+    source_path, target_path = str(tmp_path / f"in{source}"), str(tmp_path / f"out{target}")
+    write_image(source_path, words, origin)
+    assert convert_image(source_path, target_path) == len(words)
+    read_origin, read_words = read_image(target_path)
+    assert (read_origin, read_words.tolist()) == (origin, words)
+
+
+def test_binary_image_is_released_on_close(tmp_path):
+    path = str(tmp_path / "program.bin")
+    write_binary(path, [1, 2, 3], 0x10)
+    with BinaryImage(path) as image:
+        assert list(image.words) == [1, 2, 3]
+        assert image.origin == 0x10 and len(image) == 3
+    assert len(image) == 0
+
+
+def test_binary_image_must_fit(tmp_path):
+    with pytest.raises(ImageError):
+        write_binary(str(tmp_path / "big.bin"), [0] * 2, MEMORY_SIZE - 1)
+    write_binary(str(tmp_path / "full.bin"), [0] * MEMORY_SIZE)
+
+
+@pytest.mark.parametrize("data, message", [
+    (b"MAN", "too short"),
+    (HEADER.pack(b"ELF!", VERSION, 0, 0), "not a Mano binary image"),
+    (HEADER.pack(MAGIC, VERSION + 1, 0, 0), "not a Mano binary image"),
+    (HEADER.pack(MAGIC, VERSION, 0, 3) + bytes(4), "invalid word count 3"),
+    (HEADER.pack(MAGIC, VERSION, 0, 1) + bytes(4), "invalid word count 1"),
+    (HEADER.pack(MAGIC, VERSION, MEMORY_SIZE - 1, 2) + bytes(4), "invalid word count 2"),
+])
+def test_malformed_binary_image(data, message, tmp_path):
+    path = tmp_path / "bad.bin"
+    path.write_bytes(data)
+    with pytest.raises(ImageError, match=message):
+        BinaryImage(str(path))
+    with pytest.raises(MachineError, match=message):
+        Machine().load_image(str(path))
+
+
+@pytest.mark.parametrize("line, message", [
+    ("02000000007886", "Invalid Intel HEX record"),
+    (":0200000000787F", "Bad Intel HEX length or checksum"),
+    (":03000000007886", "Bad Intel HEX length or checksum"),
+    (":02200000007866", "Address 2000 is outside memory"),
+])
+def test_malformed_intel_hex(line, message, tmp_path):
+    path = tmp_path / "bad.hex"
+    path.write_text(f":020002000100FB\n{line}\n:00000001FF\n")
+    with pytest.raises(ImageError, match=message):
+        read_intel_hex(str(path))
+
+
+def test_intel_hex_gaps_are_zero_filled(tmp_path):
+    path = tmp_path / "gaps.hex"
+    path.write_text(":02000000007886\n:02000600017087\n:00000001FF\n")
+    origin, words = read_intel_hex(str(path))
+    assert (origin, words.tolist()) == (0, [0x7800, 0, 0, 0x7001])
@@ -0,0 +1,127 @@
+import random
+
+import pytest
+
+from mano.assembler import assemble_lines
+from mano.linker import DEFAULT_ORIGIN, LinkError, ObjectAssembler, assemble_module, build, link
+from mano.pipeline import Emit, LineError
+from mano.tables import ASSEMBLY_TO_MACHINE
+
+MEMORY_REFERENCE = ("AND", "ADD", "LDA", "STA", "BUN", "BSA", "ISZ")
+REGISTER_REFERENCE = ("CLA", "CLE", "CMA", "CME", "CIR", "CIL", "INC", "SPA", "SNA", "SZA", "SZE", "HLT")
+
+
+def random_modules(rng, count):
+    """Return the statements of ``count`` modules and the EXTERN/ENTRY lines of each.
+
+    Labels are unique across modules, so the statements of all modules
+    concatenated form an equivalent single program.
+    """
+    sizes = [rng.randrange(1, 40) for _ in range(count)]
+    labels = [{position: f"M{index}L{position}" for position in range(size) if rng.random() < 0.3} for index, size in enumerate(sizes)]
+    exports = [[name for name in module.values() if rng.random() < 0.5] for module in labels]
+    statements, directives = [], []
+    for index, size in enumerate(sizes):
+        others = [name for other, names in enumerate(exports) if other != index for name in names]
+        externs = set()
+        lines = []
+        for position in range(size):
+            label = labels[index].get(position)
+            prefix = f"{label + ',':<8}" if label else " " * 8
+            roll = rng.random()
+            if roll < 0.6:
+                choices = ["local", "hex"] + (["extern"] if others else [])
+                kind = rng.choice(choices)
+                if kind == "local" and labels[index]:
+                    operand = rng.choice(list(labels[index].values()))
+                elif kind == "extern":
+                    operand = rng.choice(others)
+                    externs.add(operand)
+                else:
+                    operand = f"{rng.randrange(0x1000):03X}"
+                text = f"{rng.choice(MEMORY_REFERENCE)} {operand}" + rng.choice(("", " I"))
+            elif roll < 0.85:
+                text = rng.choice(REGISTER_REFERENCE)
+            else:
+                text = f"DEC {rng.randrange(-32768, 32768)}" if rng.random() < 0.5 else f"HEX {rng.randrange(0x10000):X}"
+            lines.append(prefix + text)
+        statements.append(lines)
+        directives.append([f"        EXTERN {name}" for name in sorted(externs)] + [f"        ENTRY {name}" for name in exports[index]])
+    return statements, directives
+
+
+def write_modules(directory, statements, directives):
+    paths = []
+    for index, (lines, header) in enumerate(zip(statements, directives)):
+        path = directory / f"module{index}.asm"
+        path.write_text("\n".join(header + lines + ["        END"]) + "\n")
+        paths.append(str(path))
+    return paths
+
+
+def concatenated(statements, origin=DEFAULT_ORIGIN):
+    """Assemble all modules as one program; return its words from ``origin`` on."""
+    source = [f"        ORG {origin:03X}"] + [line for lines in statements for line in lines] + ["        END"]
+    numbered = list(enumerate(source, 1))
+    words = {}
+    for record in assemble_lines(lambda: numbered, ASSEMBLY_TO_MACHINE):
+        assert not isinstance(record, LineError), record
+        if isinstance(record, Emit) and record.address is not None:
+            words[record.address] = int(record.text, 16)
+    return [words[address] for address in range(origin, origin + len(words))]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_link_matches_concatenated_source(seed, tmp_path):
+    rng = random.Random(seed)
+    statements, directives = random_modules(rng, rng.randrange(1, 6))
+    modules = []
+    for path in write_modules(tmp_path, statements, directives):
+        module, errors = assemble_module(path)
+        assert not errors
+        modules.append(module)
+    image = link(modules)
+    assert image.words.tolist() == concatenated(statements)
+
+
+def test_rebuild_after_edit_matches_concatenated_source(tmp_path):
+    rng = random.Random(7)
+    statements, directives = random_modules(rng, 4)
+    paths = write_modules(tmp_path, statements, directives)
+    target, objects = tmp_path / "linked.txt", tmp_path / "obj"
+    summary = build(paths, str(target), str(objects), jobs=1)
+    assert summary.ok and summary.assembled == 4
+    assert summary.image.words.tolist() == concatenated(statements)
+
+    statements[2].insert(0, "        CMA")  # moves every later module by one word
+    write_modules(tmp_path, statements, directives)
+    summary = build(paths, str(target), str(objects), jobs=1)
+    assert summary.ok
+    assert [result.assembled for result in summary.results] == [False, False, True, False]
+    assert summary.image.words.tolist() == concatenated(statements)
+
+
+def test_undefined_external_symbol(tmp_path):
+    path = tmp_path / "main.asm"
+    path.write_text("        EXTERN SUB\n        BSA SUB\n        HLT\n        END\n")
+    module, errors = assemble_module(str(path))
+    assert not errors
+    with pytest.raises(LinkError, match="Undefined external symbol SUB"):
+        link([module])
+
+
+def test_duplicate_label_keeps_later_addresses(tmp_path):
+    path = tmp_path / "module.asm"
+    path.write_text("A,      CLA\nA,      INC\nB,      HLT\n        END\n")
+    module, errors = assemble_module(str(path))
+    assert module is None
+    assert errors == [LineError(2, "Duplicate label A")]
+    assembler = ObjectAssembler(ASSEMBLY_TO_MACHINE)
+    list(assembler.first_pass(enumerate(["A, CLA", "A, INC", "B, HLT", "END"], 1)))
+    assert assembler.symbols == {"A": 0, "B": 2}
+
+
+def test_duplicate_label_past_memory_reports_one_error(tmp_path):
+    path = tmp_path / "module.asm"
+    path.write_text("        ORG FFF\nA,      HLT\nA,      CLA\n        END\n")
+    assert assemble_module(str(path))[1] == [LineError(3, "Duplicate label A")]
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from mano.machine import Machine
+from programs import random_words
+
+np = pytest.importorskip("numpy")
+from mano.lockstep import LockstepMachine  # noqa: E402
+
+PROGRAM_WORDS = 64
+STEP_LIMIT = 2000
+COMPARED = ("AC", "DR", "AR", "PC", "IR", "E", "I", "S")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_lockstep_matches_interpreter(seed):
+    rng = random.Random(seed)
+    programs = [random_words(rng, PROGRAM_WORDS, io=False) for _ in range(100)]
+    runs = LockstepMachine(len(programs))
+    for index, words in enumerate(programs):
+        runs.memory[index, :PROGRAM_WORDS] = words
+    runs.run(STEP_LIMIT)
+    for index, words in enumerate(programs):
+        machine = Machine()
+        machine.load_words(words)
+        if runs.failed[index]:
+            # Stopped at an input-output or unsupported word, which the interpreter reaches on the same step.
+            machine.run(int(runs.steps[index]))
+            assert machine.memory[machine.PC] >> 12 == 0xF
+            continue
+        machine.run(STEP_LIMIT)
+        state, expected = runs.state(index), machine.state()
+        assert {name: state[name] for name in COMPARED} == {name: expected[name] for name in COMPARED}
+        assert runs.memory[index].tolist() == machine.memory.tolist()
+        assert runs.steps[index] == machine.steps
+
+
+def test_instances_of_one_program_diverge_on_their_inputs():
+    words = [
+        0x2010,  # LDA 010
+        0x7008,  # SNA
+        0x7001,  # HLT: non-negative inputs stop here
+        0x7200,  # CMA
+        0x7020,  # INC
+        0x3011,  # STA 011
+        0x7001,  # HLT
+    ]
+    inputs = [5, 0xFFFB, 0, 0x8000]
+    runs = LockstepMachine(len(inputs))
+    runs.load_words(words)
+    runs.memory[:, 0x10] = inputs
+    runs.run(100)
+    for index, value in enumerate(inputs):
+        machine = Machine()
+        machine.load_words(words)
+        machine.memory[0x10] = value
+        machine.run(100)
+        assert runs.machine(index).state() == machine.state()
+        assert runs.values(0x11)[index] == machine.memory[0x11]
@@ -0,0 +1,91 @@
+import random
+
+import pytest
+
+from mano.machine import Machine
+from mano.pipeline import Cancelled, ProgressMonitor
+from mano.rewind import Rewinder
+from programs import random_words
+
+PROGRAM_WORDS = 64
+
+
+def machine_for(words):
+    machine = Machine()
+    machine.load_words(words)
+    return machine
+
+
+def straight(words, steps):
+    """Run a fresh machine for ``steps`` steps without any checkpoints."""
+    machine = machine_for(words)
+    machine.run(steps)
+    return machine
+
+
+def assert_same(machine, expected):
+    # S only says whether ``run`` was left running, and the first checkpoint is taken before any run.
+    assert machine.steps == expected.steps
+    assert {**machine.state(), "S": 0} == {**expected.state(), "S": 0}
+    assert machine.memory.tolist() == expected.memory.tolist()
+
+
+@pytest.mark.parametrize("interval", [1, 3, 16])
+@pytest.mark.parametrize("seed", range(6))
+def test_back_and_goto_match_straight_execution(seed, interval):
+    rng = random.Random(seed)
+    words = random_words(rng, PROGRAM_WORDS, io=False)
+    rewinder = Rewinder(machine_for(words), interval)
+    for _ in range(40):
+        roll = rng.random()
+        if roll < 0.4:
+            rewinder.forward(rng.randrange(1, 60))
+        elif roll < 0.7:
+            rewinder.back(rng.randrange(1, 60))
+        else:
+            rewinder.goto(rng.randrange(400))
+        expected = straight(words, rewinder.step)
+        assert_same(rewinder.machine, expected)
+        assert rewinder.halted == (expected.halted and expected.steps > 0)
+
+
+def test_back_past_the_start_stops_at_step_zero():
+    words = random_words(random.Random(1), PROGRAM_WORDS, io=False)
+    rewinder = Rewinder(machine_for(words), 4)
+    rewinder.forward(10)
+    assert rewinder.back(100) == 0
+    assert_same(rewinder.machine, machine_for(words))
+
+
+def test_halt_stops_forward_until_rewound():
+    words = [0x7020, 0x7020, 0x7001]  # INC, INC, HLT
+    rewinder = Rewinder(machine_for(words), 2)
+    assert rewinder.forward(10) == 3
+    assert rewinder.halted and rewinder.forward(5) == 0
+    assert rewinder.back(2) == 1
+    assert not rewinder.halted and rewinder.machine.AC == 1
+    assert rewinder.goto(100) == 3 and rewinder.halted
+
+
+def test_cancelled_run_leaves_a_consistent_machine():
+    words = [0x7020, 0x4000]  # INC, BUN 0: never halts
+    rewinder = Rewinder(machine_for(words), 10)
+    monitor = ProgressMonitor()
+    monitor.cancel()
+    with pytest.raises(Cancelled):
+        rewinder.forward(10_000, monitor)
+    assert rewinder.step == 10
+    assert_same(rewinder.machine, straight(words, 10))
+    assert rewinder.back(3) == 7
+    assert_same(rewinder.machine, straight(words, 7))
+    assert rewinder.forward(20) == 20
+    assert_same(rewinder.machine, straight(words, 27))
+
+
+def test_checkpoints_are_kept_once_per_interval():
+    words = [0x7020, 0x4000]
+    rewinder = Rewinder(machine_for(words), 8)
+    rewinder.forward(100)
+    rewinder.back(50)
+    rewinder.forward(50)
+    assert [checkpoint.step for checkpoint in rewinder.checkpoints] == list(range(0, 100, 8))
@@ -0,0 +1,125 @@
+import json
+import random
+
+import pytest
+
+from mano.trace_log import RegisterLog
+from mano.trace_store import TraceQuery, TraceStore, parse_event_range
+
+NAMES = ("AR", "PC", "DR", "AC", "IR")
+
+
+def write_log(path, rng, events, log=None):
+    log = log or RegisterLog(str(path))
+    registers = dict.fromkeys(NAMES, 0)
+    for _ in range(events):
+        register = rng.choice(NAMES)
+        registers[register] = value = rng.randrange(16)
+        log.record(2, rng.choice(("UPDATE", "INCREMENT")), register, value, registers)
+    log.flush()
+    return log
+
+
+def scan(path, query):
+    """Filter the log line by line, the slow way the index replaces."""
+    matches = []
+    with open(path) as file:
+        for line in file:
+            event = json.loads(line)
+            if query.register is not None and event["Register"] != query.register:
+                continue
+            if query.first_event is not None and event["Step"] < query.first_event:
+                continue
+            if query.last_event is not None and event["Step"] > query.last_event:
+                continue
+            if query.pc is not None and event["Registers"]["PC"] != query.pc:
+                continue
+            if query.value is not None and event["Value"] != query.value:
+                continue
+            matches.append(event)
+    return matches
+
+
+def random_query(rng):
+    first = rng.choice((None, rng.randrange(300)))
+    return TraceQuery(
+        rng.choice((None, "ac", "PC")),
+        first,
+        rng.choice((None, (first or 0) + rng.randrange(300))),
+        rng.choice((None, rng.randrange(16))),
+        rng.choice((None, rng.randrange(16))),
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_queries_match_a_scan(seed, tmp_path):
+    rng = random.Random(seed)
+    path = tmp_path / "register_log.txt"
+    log = write_log(path, rng, 500)
+    with TraceStore(str(path)) as store:
+        assert store.refresh() == 500
+        for _ in range(20):
+            query = random_query(rng)
+            expected = scan(path, query)
+            assert store.count(query) == len(expected)
+            assert store.query(query) == expected
+            assert store.query(query, limit=5, offset=3) == expected[3:8]
+        write_log(path, rng, 200, log)  # appended events are indexed on the next refresh
+        assert store.refresh() == 200
+        query = random_query(rng)
+        assert store.query(query) == scan(path, query)
+
+
+def test_rewritten_log_is_indexed_again(tmp_path):
+    rng = random.Random(7)
+    path = tmp_path / "register_log.txt"
+    log = write_log(path, rng, 100)
+    with TraceStore(str(path)) as store:
+        store.refresh()
+        log.reset()
+        write_log(path, rng, 150, log)
+        assert store.refresh() == 150
+        assert len(store) == 150
+        assert store.query(TraceQuery()) == scan(path, TraceQuery())
+
+
+def test_event_numbers_repeat_across_appending_processes(tmp_path):
+    path = tmp_path / "register_log.txt"
+    write_log(path, random.Random(1), 10)
+    write_log(path, random.Random(2), 10)  # a second log object starts counting at 1 again
+    with TraceStore(str(path)) as store:
+        store.refresh()
+        events = store.query(TraceQuery(first_event=1, last_event=1))
+        assert [event["Step"] for event in events] == [1, 1]
+        assert events == [event for event in scan(path, TraceQuery()) if event["Step"] == 1]
+
+
+def test_partial_and_broken_lines(tmp_path):
+    path = tmp_path / "register_log.txt"
+    write_log(path, random.Random(3), 5)
+    with open(path, "a") as file:
+        file.write("not json\n")
+        file.write('{"Step": 99, "Register": "AC"')  # still being written
+    with TraceStore(str(path)) as store:
+        assert store.refresh() == 5
+        assert store.skipped == 1
+        with open(path, "a") as file:
+            file.write(', "Value": 1, "Registers": {"PC": 2}}\n')
+        assert store.refresh() == 1
+        assert store.query(TraceQuery(pc=2, first_event=99))[0]["Value"] == 1
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("5", (5, 5)),
+    ("5:", (5, None)),
+    (":5", (None, 5)),
+    ("1_000:2,000", (1000, 2000)),
+])
+def test_parse_event_range(text, expected):
+    assert parse_event_range(text) == expected
+
+
+@pytest.mark.parametrize("text", ["x", "5:3", "1:2:3"])
+def test_parse_event_range_rejects(text):
+    with pytest.raises(ValueError):
+        parse_event_range(text)
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+from mano.assembler import assemble_lines
+from mano.pipeline import Emit, LineError
+from mano.tables import ASSEMBLY_TO_MACHINE
+from mano.watch import IncrementalAssembler
+
+LABELS = ("A", "B", "C", "D")
+
+
+def random_line(rng):
+    label = f"{rng.choice(LABELS)}, " if rng.random() < 0.3 else ""
+    roll = rng.random()
+    if roll < 0.05:
+        return label + "END"
+    if roll < 0.12:
+        return label + "ORG " + rng.choice(("0", "100", "FFD", "FFF", "XYZ"))
+    if roll < 0.4:
+        operand = rng.choice(LABELS + ("1F", "ZZ"))
+        return label + f"{rng.choice(('LDA', 'ADD', 'STA', 'BUN'))} {operand}" + rng.choice(("", " I"))
+    if roll < 0.6:
+        return label + rng.choice(("CLA", "INC", "HLT", "BAD"))
+    if roll < 0.75:
+        return label + rng.choice(("DEC -3", "HEX 1F", "HEX", "DEC 99999"))
+    if roll < 0.8:
+        return "A B C D,"
+    return rng.choice(("", "/ comment"))
+
+
+def full_assembly(lines):
+    numbered = [(lineno, text.strip()) for lineno, text in enumerate(lines, 1) if text.strip()]
+    records = list(assemble_lines(lambda: numbered, ASSEMBLY_TO_MACHINE))
+    errors = [record for record in records if isinstance(record, LineError)]
+    words = [record.text for record in records if isinstance(record, Emit)]
+    return errors, words
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_incremental_matches_full_assembly(seed, tmp_path):
+    rng = random.Random(seed)
+    target = tmp_path / "machine_output.txt"
+    assembler = IncrementalAssembler(str(target))
+    lines = [random_line(rng) for _ in range(rng.randrange(1, 30))]
+    assembler.load("\n".join(lines))
+    for _ in range(30):
+        start = rng.randrange(len(lines) + 1)
+        stop = min(len(lines), start + rng.randrange(3))
+        lines[start:stop] = [random_line(rng) for _ in range(rng.randrange(3))]
+        assembler.update("\n".join(lines))
+        errors, words = full_assembly(lines)
+        assert assembler.errors() == errors
+        if not errors and words:
+            assert target.read_text().split() == words
+
+
+def test_duplicate_label_past_memory_reports_one_error(tmp_path):
+    lines = ["ORG FFF", "A, HLT", "A, CLA", "END"]
+    assembler = IncrementalAssembler(str(tmp_path / "machine_output.txt"))
+    update = assembler.load("\n".join(lines))
+    assert update.errors == full_assembly(lines)[0] == [LineError(3, "Duplicate label A")]
+
+
+def test_emptied_source_leaves_output_alone(tmp_path):
+    target = tmp_path / "machine_output.txt"
+    assembler = IncrementalAssembler(str(target))
+    assembler.load("ORG 100\nCLA\nHLT\nEND")
+    before = target.read_text()
+    update = assembler.update("/ nothing left")
+    assert update.ok and update.empty and update.written == 0
+    assert target.read_text() == before
+    update = assembler.update("INC\nEND")
+    assert not update.empty
+    assert target.read_text().split() == full_assembly(["INC", "END"])[1]